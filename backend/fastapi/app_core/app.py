@@ -3,6 +3,7 @@ from fastapi.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import get_settings
+from ..taskup_backend.db import BufferedWritesMiddleware
 from .routers import auth, tasks, offers, messages, payments, disputes, admin, health
 
 
@@ -10,6 +11,7 @@ def create_app() -> FastAPI:
     settings = get_settings()
     app = FastAPI(title=settings.app_name, version="0.1.0", docs_url="/api/docs", openapi_url="/api/openapi.json")
 
+    app.add_middleware(BufferedWritesMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_allow_origins,
@@ -24,6 +24,7 @@ class Settings(BaseSettings):
     database_url: str | None = os.getenv("DATABASE_URL")
     jwt_secret: str = os.getenv("JWT_SECRET", "dev-secret-change-me")
     sentry_dsn: str | None = os.getenv("SENTRY_DSN")
+    data_backend: str = os.getenv("TASKUP_DATA_BACKEND", "postgrest")
 
     class Config:
         case_sensitive = False
@@ -1,24 +1,33 @@
+import asyncio
 import os
 from typing import Dict, Any, List
 import httpx
-from . import db
+from ..taskup_backend import db
 
 EXPO_PUSH_API_URL = os.getenv("EXPO_PUSH_API_URL")
 EMAIL_PROVIDER_API_KEY = os.getenv("EMAIL_PROVIDER_API_KEY")
+EXPO_BATCH_SIZE = 100
 
 
-def send_push(device_tokens: List[str], title: str, body: str, data: Dict[str, Any] | None = None):
+async def send_push(device_tokens: List[str], title: str, body: str, data: Dict[str, Any] | None = None):
     if not EXPO_PUSH_API_URL or not device_tokens:
         return {"sent": 0}
-    sent = 0
-    for token in device_tokens:
-        payload = {"to": token, "title": title, "body": body, "data": data or {}}
+    # Expo takes up to 100 messages per request; batches go out concurrently.
+    messages = [{"to": token, "title": title, "body": body, "data": data or {}} for token in device_tokens]
+    batches = [messages[i : i + EXPO_BATCH_SIZE] for i in range(0, len(messages), EXPO_BATCH_SIZE)]
+
+    async def _post(client: httpx.AsyncClient, batch: List[Dict[str, Any]]) -> int:
         try:
-            httpx.post(EXPO_PUSH_API_URL, json=payload, timeout=5.0)
-            sent += 1
+            resp = await client.post(EXPO_PUSH_API_URL, json=batch)
+            resp.raise_for_status()
+            return len(batch)
         except Exception as e:
             print(f"[notify] push error: {e}")
-    return {"sent": sent}
+            return 0
+
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        sent = await asyncio.gather(*(_post(client, batch) for batch in batches))
+    return {"sent": sum(sent)}
 
 
 def send_email(to_email: str, subject: str, body: str):
@@ -0,0 +1,19 @@
+from fastapi import Depends
+
+from ..taskup_backend.repositories import build_repositories
+from .config import get_settings
+from .security import get_current_user
+
+
+def get_repositories(user=Depends(get_current_user)):
+    """FastAPI dependency: repositories for the configured data backend, scoped to the caller (RLS on PostgREST, the same rules in SQL otherwise)."""
+    backend = get_settings().data_backend
+    if backend != "sqlalchemy":
+        yield build_repositories(backend, jwt=user.get("token"))
+        return
+    from ..taskup_backend.database import SessionLocal
+
+    if SessionLocal is None:
+        raise RuntimeError("DATABASE_URL not configured for the sqlalchemy data backend")
+    with SessionLocal() as session:
+        yield build_repositories(backend, session=session, user=user, supabase_columns=True)
@@ -4,7 +4,7 @@ from typing import Dict
 from ..models import RegisterRequest, LoginRequest, User
 from ..security import hash_password, verify_password, create_token
 from ..rate_limit import check
-from .. import db
+from ...taskup_backend import db
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -16,13 +16,13 @@ async def register(request: Request, payload: RegisterRequest):
     ip = request.client.host
     check(ip, "register")
     email = payload.email.lower()
-    existing = db.get_user_by_email(email)
+    existing = await db.aio.get_user_by_email(email)
     if existing:
         raise HTTPException(status_code=409, detail="Email already in use")
 
     user_id = str(uuid4())
     hashed = hash_password(payload.password)
-    db_user = db.create_user_profile(
+    db_user = await db.aio.create_user_profile(
         {
             "id": user_id,
             "email": email,
@@ -51,7 +51,7 @@ async def login(request: Request, payload: LoginRequest):
     ip = request.client.host
     check(ip, "login")
     email = payload.email.lower()
-    db_user = db.get_user_by_email(email)
+    db_user = await db.aio.get_user_by_email(email)
     if not db_user or not verify_password(payload.password, db_user.get("hashed_password", "")):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     if db_user.get("is_blocked"):
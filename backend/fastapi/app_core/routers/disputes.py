@@ -3,7 +3,7 @@ from uuid import uuid4
 from typing import List
 from ..models import Dispute, DisputeCreate, DisputeResolve
 from ..security import get_current_user, require_roles
-from .. import db
+from ...taskup_backend import db
 
 
 router = APIRouter(prefix="/disputes", tags=["disputes"])
@@ -18,13 +18,13 @@ def _normalize(raw: dict) -> dict:
 
 @router.get("", response_model=List[Dispute])
 async def list_disputes(user=Depends(get_current_user)):
-    disputes = db.list_disputes_for_user(user.get("id"), user.get("role", "client"), jwt=user.get("token"))
+    disputes = await db.aio.list_disputes_for_user(user.get("id"), user.get("role", "client"), jwt=user.get("token"))
     return [Dispute(**_normalize(d)) for d in disputes]
 
 
 @router.post("", response_model=Dispute)
 async def open_dispute(payload: DisputeCreate, user=Depends(get_current_user)):
-    dispute = db.open_dispute(
+    dispute = await db.aio.open_dispute(
         {
             "task_id": payload.task_id,
             "payment_id": payload.payment_id,
@@ -56,7 +56,7 @@ async def resolve_dispute(dispute_id: str, payload: DisputeResolve, user=Depends
         if payload.resolution == "refund"
         else "dismissed"
     )
-    dispute = db.update_dispute(dispute_id, {"status": status}, jwt=user.get("token"))
+    dispute = await db.aio.update_dispute(dispute_id, {"status": status}, jwt=user.get("token"))
     if dispute:
         db.log_admin_action(user.get("id"), f"dispute_{payload.resolution}", "dispute", dispute_id, {"note": payload.note})
         return {"ok": True, "dispute": dispute}
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from uuid import uuid4
-from typing import List
+from typing import List, Optional
 from ..models import Message, MessageCreate
 from ..security import get_current_user
 from ..rate_limit import check
-from .. import db
+from ...taskup_backend import db
+from ..repositories import get_repositories
 from ..notifications import send_in_app_notification
 
 
@@ -19,8 +20,14 @@ def _normalize(raw: dict) -> dict:
 
 
 @router.get("", response_model=List[Message])
-async def list_messages(task_id: str, user=Depends(get_current_user)):
-    messages = db.list_messages(task_id, jwt=user.get("token"))
+async def list_messages(
+    task_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    user=Depends(get_current_user),
+    repos=Depends(get_repositories),
+):
+    messages = await db.run_sync(repos.messages.list, {"task_id": task_id}, order_by="created_at", limit=limit, offset=offset)
     return [Message(**_normalize(m)) for m in messages]
 
 
@@ -29,7 +36,7 @@ async def create_message(payload: MessageCreate, user=Depends(get_current_user))
     check(user.get("id"), "message", limit=300, window_seconds=300)
     if payload.sender_id != user.get("id"):
         raise HTTPException(status_code=403, detail="Sender mismatch")
-    saved = db.create_message(
+    saved = await db.aio.create_message(
         {
             "task_id": payload.task_id,
             "sender_id": payload.sender_id,
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from uuid import uuid4
-from typing import List
+from typing import List, Optional
 from ..models import Offer, OfferCreate
 from ..security import get_current_user, require_roles
 from ..rate_limit import check
-from .. import db
+from ...taskup_backend import db
+from ..repositories import get_repositories
 from ..notifications import send_in_app_notification
 
 
@@ -19,18 +20,26 @@ def _normalize_offer(raw: dict) -> dict:
 
 
 @router.get("", response_model=List[Offer])
-async def list_offers(task_id: str | None = None, user=Depends(get_current_user)):
+async def list_offers(
+    task_id: str | None = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    user=Depends(get_current_user),
+    repos=Depends(get_repositories),
+):
     if task_id:
-        data = db.list_offers_for_task(task_id, jwt=user.get("token"))
+        data = await db.run_sync(repos.offers.list, {"task_id": task_id}, order_by="created_at", desc=True, limit=limit, offset=offset)
     else:
-        data = db.list_offers_for_user(user["id"], user.get("role", "client"), jwt=user.get("token"))
+        data = await db.aio.list_offers_for_user(
+            user["id"], user.get("role", "client"), jwt=user.get("token"), limit=limit or 100, offset=offset
+        )
     return [Offer(**_normalize_offer(o)) for o in data]
 
 
 @router.post("", response_model=Offer)
 async def create_offer(payload: OfferCreate, user=Depends(require_roles("tasker", "admin"))):
     check(user.get("id"), "offer_create", limit=120, window_seconds=600)
-    supa = db.create_offer(
+    supa = await db.aio.create_offer(
         {
             "task_id": payload.task_id,
             "tasker_id": user["id"],
@@ -58,7 +67,7 @@ async def create_offer(payload: OfferCreate, user=Depends(require_roles("tasker"
 
 @router.post("/{offer_id}/status")
 async def set_offer_status(offer_id: str, status: str, user=Depends(get_current_user)):
-    updated = db.set_offer_status(offer_id, status, jwt=user.get("token"))
+    updated = await db.aio.set_offer_status(offer_id, status, jwt=user.get("token"))
     if updated:
         return {"ok": True, "offer": updated}
     raise HTTPException(status_code=404, detail="Offer not found")
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from uuid import uuid4
-from typing import List
+from typing import List, Optional
 from ..models import Payment, PaymentCreate
 from ..security import get_current_user, require_roles
-from .. import db
+from ...taskup_backend import db
+from ..repositories import get_repositories
 import stripe
 import os
 
@@ -27,8 +28,13 @@ def _transfer_destination_for_task(task_id: str) -> str:
 
 
 @router.get("", response_model=List[Payment])
-async def list_payments(user=Depends(get_current_user)):
-    data = db.select("payments", {}, jwt=user.get("token"))
+async def list_payments(
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    user=Depends(get_current_user),
+    repos=Depends(get_repositories),
+):
+    data = await db.run_sync(repos.payments.list, order_by="created_at", desc=True, limit=limit, offset=offset)
     return [Payment(**_normalize(p)) for p in data]
 
 
@@ -50,7 +56,7 @@ async def create_payment(payload: PaymentCreate, user=Depends(get_current_user))
     except Exception as e:
         print(f"[payments] Stripe intent error: {e}")
 
-    supa = db.create_payment(
+    supa = await db.aio.create_payment(
         {
             "task_id": payload.task_id,
             "offer_id": payload.offer_id,
@@ -81,7 +87,7 @@ async def create_payment(payload: PaymentCreate, user=Depends(get_current_user))
 
 @router.post("/{payment_id}/release")
 async def release_payment(payment_id: str, user=Depends(require_roles("admin", "client"))):
-    payment = db.get_payment(payment_id, jwt=user.get("token"))
+    payment = await db.aio.get_payment(payment_id, jwt=user.get("token"))
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     transfer_id = None
@@ -96,7 +102,7 @@ async def release_payment(payment_id: str, user=Depends(require_roles("admin", "
             transfer_id = transfer["id"]
         except Exception as e:
             print(f"[payments] Stripe transfer error: {e}")
-    updated = db.update_payment(payment_id, {"status": "payment_released", "transfer_id": transfer_id}, jwt=user.get("token"))
+    updated = await db.aio.update_payment(payment_id, {"status": "payment_released", "transfer_id": transfer_id}, jwt=user.get("token"))
     if updated:
         return {"ok": True, "payment": updated}
     for idx, p in enumerate(_payments):
@@ -108,7 +114,7 @@ async def release_payment(payment_id: str, user=Depends(require_roles("admin", "
 
 @router.post("/{payment_id}/refund")
 async def refund_payment(payment_id: str, user=Depends(require_roles("admin", "support", "client"))):
-    payment = db.get_payment(payment_id, jwt=user.get("token"))
+    payment = await db.aio.get_payment(payment_id, jwt=user.get("token"))
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
     refund_id = None
@@ -118,7 +124,7 @@ async def refund_payment(payment_id: str, user=Depends(require_roles("admin", "s
             refund_id = refund["id"]
         except Exception as e:
             print(f"[payments] Stripe refund error: {e}")
-    updated = db.update_payment(payment_id, {"status": "refunded", "refund_id": refund_id}, jwt=user.get("token"))
+    updated = await db.aio.update_payment(payment_id, {"status": "refunded", "refund_id": refund_id}, jwt=user.get("token"))
     if updated:
         return {"ok": True, "payment": updated}
     for idx, p in enumerate(_payments):
@@ -150,7 +156,7 @@ async def stripe_webhook(request: Request):
     if not intent_id:
         return {"received": True}
 
-    payments = db.select("payments", {"payment_intent_id": intent_id})
+    payments = await db.aio.select("payments", {"payment_intent_id": intent_id}, limit=1)
     if payments:
         payment = payments[0]
         status = payment.get("status")
@@ -170,5 +176,5 @@ async def stripe_webhook(request: Request):
             update_payload["transfer_id"] = data.get("id")
         if status:
             update_payload["status"] = status
-            db.update_payment(payment["id"], update_payload)
+            await db.aio.update_payment(payment["id"], update_payload)
     return {"received": True}
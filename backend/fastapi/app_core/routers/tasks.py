@@ -1,10 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from uuid import uuid4
 from typing import List
 from ..models import Task, TaskCreate, AcceptOffer
 from ..security import get_current_user, require_roles
 from ..rate_limit import check
-from .. import db
+from ...taskup_backend import db
+from ..repositories import get_repositories
 from ..notifications import send_in_app_notification
 import os
 import stripe
@@ -22,14 +23,20 @@ def _normalize_task(raw: dict) -> dict:
 
 
 @router.get("", response_model=List[Task])
-async def list_tasks(user=Depends(get_current_user)):
-    supabase_tasks = db.list_tasks_for_user(user["id"], user.get("role", "client"), jwt=user.get("token"))
+async def list_tasks(
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    user=Depends(get_current_user),
+):
+    supabase_tasks = await db.aio.list_tasks_for_user(
+        user["id"], user.get("role", "client"), jwt=user.get("token"), limit=limit, offset=offset
+    )
     return [Task(**_normalize_task(t)) for t in supabase_tasks]
 
 
 @router.get("/{task_id}", response_model=Task)
-async def get_task(task_id: str, user=Depends(get_current_user)):
-    task = db.get_task(task_id, jwt=user.get("token"))
+async def get_task(task_id: str, user=Depends(get_current_user), repos=Depends(get_repositories)):
+    task = await db.run_sync(repos.tasks.get, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     if user.get("role") != "admin" and task.get("client_id") not in (None, user.get("id")) and user.get("role") != "tasker":
@@ -40,7 +47,7 @@ async def get_task(task_id: str, user=Depends(get_current_user)):
 @router.post("", response_model=Task)
 async def create_task(payload: TaskCreate, user=Depends(get_current_user)):
     check(user.get("id"), "task_create", limit=60, window_seconds=300)
-    created = db.create_task(
+    created = await db.aio.create_task(
         {
             "client_id": user["id"],
             "title": payload.title,
@@ -74,14 +81,14 @@ async def create_task(payload: TaskCreate, user=Depends(get_current_user)):
 
 @router.post("/{task_id}/accept-offer")
 async def accept_offer(task_id: str, payload: AcceptOffer, user=Depends(require_roles("client", "admin"))):
-    task = db.get_task(task_id, jwt=user.get("token"))
+    task = await db.aio.get_task(task_id, jwt=user.get("token"))
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     if user.get("role") != "admin" and task.get("client_id") != user.get("id"):
         raise HTTPException(status_code=403, detail="Only the client can accept offers")
 
     offer = None
-    offers = db.list_offers_for_task(task_id, jwt=user.get("token"))
+    offers = await db.aio.list_offers_for_task(task_id, jwt=user.get("token"))
     for o in offers:
         if o.get("id") == payload.offer_id:
             offer = o
@@ -89,8 +96,8 @@ async def accept_offer(task_id: str, payload: AcceptOffer, user=Depends(require_
     if not offer:
         raise HTTPException(status_code=404, detail="Offer not found")
 
-    db.set_offer_status(payload.offer_id, "accepted", jwt=user.get("token"))
-    db.update_task_status(task_id, "offer_accepted", jwt=user.get("token"))
+    await db.aio.set_offer_status(payload.offer_id, "accepted", jwt=user.get("token"))
+    await db.aio.update_task_status(task_id, "offer_accepted", jwt=user.get("token"))
     send_in_app_notification(user.get("id"), "offer_accepted", {"task_id": task_id, "offer_id": payload.offer_id})
 
     intent_id = None
@@ -109,7 +116,7 @@ async def accept_offer(task_id: str, payload: AcceptOffer, user=Depends(require_
         except Exception as e:
             print(f"[tasks] accept_offer Stripe error: {e}")
 
-    payment = db.create_payment(
+    payment = await db.aio.create_payment(
         {
             "task_id": task_id,
             "offer_id": payload.offer_id,
@@ -126,27 +133,27 @@ async def accept_offer(task_id: str, payload: AcceptOffer, user=Depends(require_
 
 @router.post("/{task_id}/mark-done")
 async def mark_done(task_id: str, user=Depends(require_roles("tasker", "admin"))):
-    task = db.get_task(task_id, jwt=user.get("token"))
+    task = await db.aio.get_task(task_id, jwt=user.get("token"))
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    offers = db.list_offers_for_task(task_id, jwt=user.get("token"))
+    offers = await db.aio.list_offers_for_task(task_id, jwt=user.get("token"))
     for o in offers:
         if o.get("tasker_id") == user.get("id"):
-            db.set_offer_status(o["id"], "accepted", jwt=user.get("token"))
-    db.update_task_status(task_id, "awaiting_client_confirmation", jwt=user.get("token"))
+            await db.aio.set_offer_status(o["id"], "accepted", jwt=user.get("token"))
+    await db.aio.update_task_status(task_id, "awaiting_client_confirmation", jwt=user.get("token"))
     send_in_app_notification(task.get("client_id"), "task_marked_done", {"task_id": task_id})
     return {"ok": True, "status": "awaiting_client_confirmation"}
 
 
 @router.post("/{task_id}/confirm-received")
 async def confirm_received(task_id: str, user=Depends(require_roles("client", "admin"))):
-    task = db.get_task(task_id, jwt=user.get("token"))
+    task = await db.aio.get_task(task_id, jwt=user.get("token"))
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     if user.get("role") != "admin" and task.get("client_id") != user.get("id"):
         raise HTTPException(status_code=403, detail="Only the client can confirm delivery")
-    db.update_task_status(task_id, "completed", jwt=user.get("token"))
-    payments = db.select("payments", {"task_id": task_id}, jwt=user.get("token"))
+    await db.aio.update_task_status(task_id, "completed", jwt=user.get("token"))
+    payments = await db.aio.select("payments", {"task_id": task_id}, jwt=user.get("token"), limit=1)
     transfer_id = None
     if payments:
         payment = payments[0]
@@ -163,22 +170,22 @@ async def confirm_received(task_id: str, user=Depends(require_roles("client", "a
                 transfer_id = transfer["id"]
             except Exception as e:
                 print(f"[tasks] confirm_received transfer error: {e}")
-        db.update_payment(payment["id"], {"status": "payment_released", "transfer_id": transfer_id}, jwt=user.get("token"))
+        await db.aio.update_payment(payment["id"], {"status": "payment_released", "transfer_id": transfer_id}, jwt=user.get("token"))
     send_in_app_notification(task.get("client_id"), "payment_released", {"task_id": task_id})
     return {"ok": True, "status": "completed", "payment_status": "payment_released", "transfer_id": transfer_id}
 
 
 @router.post("/{task_id}/dispute")
 async def dispute_task(task_id: str, reason: str, user=Depends(get_current_user)):
-    task = db.get_task(task_id, jwt=user.get("token"))
+    task = await db.aio.get_task(task_id, jwt=user.get("token"))
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     payment = None
-    payments = db.select("payments", {"task_id": task_id}, jwt=user.get("token"))
+    payments = await db.aio.select("payments", {"task_id": task_id}, jwt=user.get("token"), limit=1)
     if payments:
         payment = payments[0]
-    db.update_task_status(task_id, "disputed", jwt=user.get("token"))
-    dispute = db.open_dispute(
+    await db.aio.update_task_status(task_id, "disputed", jwt=user.get("token"))
+    dispute = await db.aio.open_dispute(
         {
             "task_id": task_id,
             "payment_id": payment.get("id") if payment else None,
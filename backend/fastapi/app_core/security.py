@@ -4,7 +4,7 @@ from typing import Optional
 
 import jwt
 from fastapi import Depends, HTTPException, status, Header
-from . import db
+from ..taskup_backend import db
 from passlib.hash import bcrypt
 
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret-change-me")
@@ -41,7 +41,7 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
     token = authorization.split(" ", 1)[1]
     payload = decode_token(token)
     user_id = payload.get("sub") or payload.get("user_id")
-    profile = db.get_user_by_id(user_id)
+    profile = await db.aio.get_user_by_id(user_id)
     if not profile:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     # Normalize keys for downstream code
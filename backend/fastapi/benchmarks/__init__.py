@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for the TaskUp backend.
+
+Run from backend/fastapi, e.g.:
+  python -m benchmarks.bench_middleware
+"""
@@ -0,0 +1,362 @@
+"""
+Load test for the core marketplace flows, driven in-process through the ASGI app.
+
+Seeds a background dataset, then runs each scenario as a phase of requests
+against the real create_app() stack (middleware, auth, DB):
+
+  register, login, create_task, list_tasks, create_offer, accept_offer,
+  send_message, list_messages, webhook_burst
+
+and reports p50/p95/p99 latency, throughput and DB statements per request
+(taken from request.state.query_stats, so concurrent requests don't mix).
+Write the result as a JSON baseline and check later runs with
+benchmarks.compare.
+
+Usage (from backend/fastapi):
+  python -m benchmarks.bench_flows --iterations 200 --output benchmarks/baselines/sqlite.json
+  python -m benchmarks.bench_flows --database-url postgresql+psycopg://localhost/taskup_bench --reset
+
+The target database is dropped and recreated; --reset is required for any
+--database-url so a real database is never wiped by accident.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import create_engine, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from taskup_backend.app import create_app
+from taskup_backend.database import get_db
+from taskup_backend.models import Base, Payment, Wallet
+
+from .datagen import generate
+
+SCENARIOS = (
+    "register",
+    "login",
+    "create_task",
+    "list_tasks",
+    "create_offer",
+    "accept_offer",
+    "send_message",
+    "list_messages",
+    "webhook_burst",
+)
+PASSWORD = "bench-pass-123"
+
+
+class QueryCapture:
+    """Outermost ASGI wrapper: keeps each request's DB statement count by correlation id."""
+
+    def __init__(self, app):
+        self.app = app
+        self.counts: Dict[str, int] = {}
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+        state = scope.get("state") or {}
+        stats = state.get("query_stats")
+        if stats is not None and state.get("correlation_id"):
+            self.counts[state["correlation_id"]] = stats.count
+
+
+@dataclass
+class BenchEnv:
+    engine: Engine
+    app: QueryCapture
+    session_factory: sessionmaker
+    url: str
+
+
+def build_env(database_url: Optional[str] = None, log_level: str = "ERROR") -> BenchEnv:
+    """Fresh schema plus an app wired to it (SQLite temp file when no URL is given)."""
+    if database_url is None:
+        fd, path = tempfile.mkstemp(prefix="taskup-bench-", suffix=".db")
+        os.close(fd)
+        database_url = f"sqlite:///{path}"
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, connect_args=connect_args)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    app = create_app()
+    logging.getLogger("taskup").setLevel(log_level)
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return BenchEnv(engine=engine, app=QueryCapture(app), session_factory=session_factory, url=database_url)
+
+
+def seed_background(env: BenchEnv, users: int, seed: int = 1) -> Dict[str, int]:
+    """Background rows (benchmarks.datagen) so list/lookup queries don't run against empty tables."""
+    return generate(env.engine, users=users, seed=seed)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+class Recorder:
+    def __init__(self):
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.queries: Dict[str, List[int]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.wall: Dict[str, float] = defaultdict(float)
+
+    def add(self, name: str, elapsed: float, queries: int, status_code: int) -> None:
+        self.timings[name].append(elapsed)
+        self.queries[name].append(queries)
+        if status_code >= 400:
+            self.errors[name] += 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for name in SCENARIOS:
+            timings = sorted(self.timings.get(name, []))
+            if not timings:
+                continue
+            queries = self.queries[name]
+            out[name] = {
+                "requests": len(timings),
+                "errors": self.errors[name],
+                "mean_ms": round(statistics.fmean(timings) * 1000, 3),
+                "p50_ms": round(_percentile(timings, 0.50) * 1000, 3),
+                "p95_ms": round(_percentile(timings, 0.95) * 1000, 3),
+                "p99_ms": round(_percentile(timings, 0.99) * 1000, 3),
+                "throughput_rps": round(len(timings) / self.wall[name], 1) if self.wall[name] else 0.0,
+                "queries_per_request": round(statistics.fmean(queries), 2),
+                "queries_max": max(queries),
+            }
+        return out
+
+
+class Driver:
+    def __init__(self, env: BenchEnv, client: httpx.AsyncClient, recorder: Recorder):
+        self.env = env
+        self.client = client
+        self.recorder = recorder
+
+    async def call(self, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        resp = await self.client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+        queries = self.env.app.counts.pop(resp.headers.get("x-correlation-id", ""), 0)
+        self.recorder.add(name, elapsed, queries, resp.status_code)
+        return resp
+
+    async def phase(self, name: str, calls: List[Callable[[], Awaitable[Any]]], concurrency: int) -> List[Any]:
+        sem = asyncio.Semaphore(concurrency)
+
+        async def run(call):
+            async with sem:
+                return await call()
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run(c) for c in calls))
+        self.recorder.wall[name] += time.perf_counter() - start
+        return list(results)
+
+
+def _ip(i: int) -> str:
+    return f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+def _bearer(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def run_flows(env: BenchEnv, iterations: int, concurrency: int = 1, burst_concurrency: int = 8) -> Dict[str, Dict[str, Any]]:
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=env.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        d = Driver(env, client, recorder)
+        idx = range(iterations)
+
+        def register(i: int, role: str):
+            body = {"email": f"bench-{role}-{i}@example.com", "password": PASSWORD, "role": role}
+            return lambda: d.call("register", "POST", "/api/auth/register", json=body, headers={"X-Forwarded-For": _ip(i)})
+
+        registered = await d.phase("register", [register(i, r) for i in idx for r in ("client", "tasker")], concurrency)
+        clients = [r.json()["user"]["id"] for r in registered[0::2]]
+        taskers = [r.json()["access_token"] for r in registered[1::2]]
+        tasker_ids = [r.json()["user"]["id"] for r in registered[1::2]]
+
+        logins = await d.phase(
+            "login",
+            [
+                (lambda i=i: d.call("login", "POST", "/api/auth/login", json={"email": f"bench-client-{i}@example.com", "password": PASSWORD}, headers={"X-Forwarded-For": _ip(i)}))
+                for i in idx
+            ],
+            concurrency,
+        )
+        client_tokens = [r.json()["access_token"] for r in logins]
+
+        with env.session_factory() as db:
+            db.execute(update(Wallet).where(Wallet.user_id.in_(clients)).values(available_balance=10**9))
+            db.commit()
+
+        tasks = await d.phase(
+            "create_task",
+            [
+                (lambda i=i: d.call(
+                    "create_task",
+                    "POST",
+                    "/api/tasks",
+                    json={"title": f"Bench task {i}", "description": "Load test", "category": "handyman", "location": "Oslo", "budget_min": 5000, "budget_max": 5000, "currency": "NOK"},
+                    headers=_bearer(client_tokens[i]),
+                ))
+                for i in idx
+            ],
+            concurrency,
+        )
+        task_ids = [r.json()["id"] for r in tasks]
+
+        await d.phase("list_tasks", [(lambda i=i: d.call("list_tasks", "GET", "/api/tasks", headers=_bearer(client_tokens[i]))) for i in idx], concurrency)
+
+        offers = await d.phase(
+            "create_offer",
+            [
+                (lambda i=i: d.call("create_offer", "POST", "/api/offers", json={"task_id": task_ids[i], "amount_cents": 5000, "currency": "NOK", "message": "Can do"}, headers=_bearer(taskers[i])))
+                for i in idx
+            ],
+            concurrency,
+        )
+        offer_ids = [r.json()["id"] for r in offers]
+
+        await d.phase(
+            "accept_offer",
+            [
+                (lambda i=i: d.call("accept_offer", "POST", f"/api/tasks/{task_ids[i]}/accept-offer", json={"offer_id": offer_ids[i]}, headers=_bearer(client_tokens[i])))
+                for i in idx
+            ],
+            concurrency,
+        )
+
+        await d.phase(
+            "send_message",
+            [
+                (lambda i=i: d.call(
+                    "send_message",
+                    "POST",
+                    "/api/messages",
+                    json={"task_id": task_ids[i], "sender_id": clients[i], "recipient_id": tasker_ids[i], "body": "When can you start?"},
+                    headers=_bearer(client_tokens[i]),
+                ))
+                for i in idx
+            ],
+            concurrency,
+        )
+        await d.phase(
+            "list_messages",
+            [(lambda i=i: d.call("list_messages", "GET", "/api/messages", params={"task_id": task_ids[i]}, headers=_bearer(taskers[i]))) for i in idx],
+            concurrency,
+        )
+
+        with env.session_factory() as db:
+            payment_ids = [pid for (pid,) in db.query(Payment.id).filter(Payment.task_id.in_(task_ids))]
+            for pid in payment_ids:
+                db.execute(update(Payment).where(Payment.id == pid).values(stripe_payment_intent_id=f"pi_bench_{pid}"))
+            db.commit()
+
+        def webhook(pid: str, event_type: str):
+            event = {"type": event_type, "data": {"object": {"id": f"pi_bench_{pid}", "payment_intent": f"pi_bench_{pid}"}}}
+            return lambda: d.call("webhook_burst", "POST", "/api/payments/webhooks/stripe", content=json.dumps(event))
+
+        await d.phase(
+            "webhook_burst",
+            [webhook(pid, t) for pid in payment_ids for t in ("payment_intent.succeeded", "transfer.created")],
+            burst_concurrency,
+        )
+    return recorder.summary()
+
+
+def run(
+    iterations: int = 100,
+    database_url: Optional[str] = None,
+    seed_users: int = 1000,
+    concurrency: int = 1,
+    burst_concurrency: int = 8,
+    seed: int = 1,
+    log_level: str = "ERROR",
+) -> Dict[str, Any]:
+    env = build_env(database_url, log_level)
+    seeded = seed_background(env, seed_users, seed=seed) if seed_users else {}
+    scenarios = asyncio.run(run_flows(env, iterations, concurrency, burst_concurrency))
+    env.engine.dispose()
+    return {
+        "meta": {
+            "database": env.engine.dialect.name,
+            "iterations": iterations,
+            "concurrency": concurrency,
+            "burst_concurrency": burst_concurrency,
+            "seeded_rows": seeded,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "scenarios": scenarios,
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    meta = result["meta"]
+    print(f"database={meta['database']} iterations={meta['iterations']} concurrency={meta['concurrency']}")
+    print(f"{'scenario':<15} {'n':>6} {'err':>4} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'rps':>8} {'q/req':>7}")
+    for name, r in result["scenarios"].items():
+        print(
+            f"{name:<15} {r['requests']:>6} {r['errors']:>4} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+            f"{r['throughput_rps']:>8.1f} {r['queries_per_request']:>7.2f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100, help="flow repetitions (users/tasks created per phase)")
+    parser.add_argument("--database-url", help="SQLAlchemy URL; defaults to a temporary SQLite file")
+    parser.add_argument("--reset", action="store_true", help="allow dropping and recreating the schema at --database-url")
+    parser.add_argument("--seed-users", type=int, default=1000, help="background users (benchmarks.datagen) to seed before the run (0 to skip)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--burst-concurrency", type=int, default=8)
+    parser.add_argument("--log-level", default="ERROR", help="taskup logger level during the run")
+    parser.add_argument("--output", help="write the JSON result here (e.g. benchmarks/baselines/sqlite.json)")
+    args = parser.parse_args(argv)
+    if args.database_url and not args.reset:
+        parser.error("--database-url drops and recreates every table; pass --reset to confirm")
+
+    result = run(args.iterations, args.database_url, args.seed_users, args.concurrency, args.burst_concurrency, args.seed, args.log_level)
+    print_report(result)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as fh:
+            json.dump(result, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+        print(f"wrote {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
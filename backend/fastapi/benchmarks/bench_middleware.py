@@ -0,0 +1,119 @@
+"""
+Before/after benchmark for the correlation-id middleware stack.
+
+Compares, on a trivial endpoint so the middleware cost dominates:
+  - bare:   no middleware at all (floor)
+  - legacy: BaseHTTPMiddleware subclass + @app.middleware("http") access log
+            (the stack create_app used before CorrelationIdMiddleware)
+  - asgi:   taskup_backend.middleware.CorrelationIdMiddleware
+
+Usage (from backend/fastapi):
+  python -m benchmarks.bench_middleware --requests 5000
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from taskup_backend.errors import correlation_id_from_request
+from taskup_backend.middleware import CorrelationIdMiddleware
+
+logger = logging.getLogger("taskup")
+
+
+def _base_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping(request: Request):
+        return {"ok": True, "cid": getattr(request.state, "correlation_id", None)}
+
+    return app
+
+
+def build_bare_app() -> FastAPI:
+    return _base_app()
+
+
+def build_legacy_app() -> FastAPI:
+    app = _base_app()
+
+    class LegacyCorrelationIdMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            correlation_id_from_request(request)
+            return await call_next(request)
+
+    app.add_middleware(LegacyCorrelationIdMiddleware)
+
+    @app.middleware("http")
+    async def add_correlation_header(request: Request, call_next):
+        cid = correlation_id_from_request(request)
+        response = await call_next(request)
+        response.headers["X-Correlation-Id"] = cid
+        logger.info(
+            "request",
+            extra={"correlation_id": cid, "method": request.method, "path": request.url.path, "status_code": response.status_code},
+        )
+        return response
+
+    return app
+
+
+def build_asgi_app() -> FastAPI:
+    app = _base_app()
+    app.add_middleware(CorrelationIdMiddleware)
+    return app
+
+
+async def _drive(app: FastAPI, requests: int, warmup: int) -> list[float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(warmup):
+            await client.get("/ping")
+        timings: list[float] = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            resp = await client.get("/ping", headers={"X-Request-Nonce": uuid.uuid4().hex})
+            timings.append(time.perf_counter() - start)
+            assert resp.status_code == 200
+    return timings
+
+
+def _summary(timings: list[float]) -> dict:
+    ordered = sorted(timings)
+    n = len(ordered)
+    return {
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "p50_us": ordered[n // 2] * 1e6,
+        "p99_us": ordered[min(n - 1, int(n * 0.99))] * 1e6,
+    }
+
+
+def run(requests: int = 5000, warmup: int = 200) -> dict:
+    results = {}
+    for name, factory in (("bare", build_bare_app), ("legacy", build_legacy_app), ("asgi", build_asgi_app)):
+        results[name] = _summary(asyncio.run(_drive(factory(), requests, warmup)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    args = parser.parse_args()
+
+    results = run(args.requests, args.warmup)
+    floor = results["bare"]["mean_us"]
+    print(f"{'stack':<8} {'mean_us':>10} {'p50_us':>10} {'p99_us':>10} {'overhead_us':>12}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['mean_us']:>10.1f} {r['p50_us']:>10.1f} {r['p99_us']:>10.1f} {r['mean_us'] - floor:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Before/after benchmark for list-endpoint serialization (GET /api/tasks shape).
+
+  - legacy: ORM rows -> TaskOut(**dict) per row -> FastAPI response_model
+            validation (the path list_tasks used before taskup_backend.serializers)
+  - fast:   column projection tuples -> dicts -> ORJSONResponse
+
+Both run through FastAPI + httpx.ASGITransport against the same SQLite data so
+the difference is the query/serialization path only.
+
+Usage (from backend/fastapi):
+  python -m benchmarks.bench_serializers --rows 1000 10000 --requests 30
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from taskup_backend.models import Base, Task, TaskStatus, User, UserRole
+from taskup_backend.routers.tasks import TASK_LIST_FIELDS, _serialize_task
+from taskup_backend.schemas import TaskOut
+from taskup_backend.serializers import json_response
+
+
+def build_app(rows: int) -> FastAPI:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    now = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": "u1", "email": "bench@example.com", "hashed_password": "x", "role": UserRole.client}])
+        conn.execute(
+            insert(Task),
+            [
+                {
+                    "id": f"t{i}",
+                    "client_id": "u1",
+                    "title": f"Task {i}",
+                    "description": "Benchmark task with a realistic description length",
+                    "category": "cleaning",
+                    "location": "Oslo",
+                    "latitude": 59.91,
+                    "longitude": 10.75,
+                    "budget_min": 50000,
+                    "budget_max": 75000,
+                    "currency": "NOK",
+                    "status": TaskStatus.open,
+                    "created_at": now + timedelta(seconds=i),
+                }
+                for i in range(rows)
+            ],
+        )
+    SessionLocal = sessionmaker(bind=engine)
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/legacy", response_model=List[TaskOut])
+    async def legacy(db: Session = Depends(get_db)):
+        tasks = db.query(Task).order_by(Task.created_at.desc()).all()
+        return [_serialize_task(t) for t in tasks]
+
+    @app.get("/fast", response_model=List[TaskOut])
+    async def fast(db: Session = Depends(get_db)):
+        return json_response(TASK_LIST_FIELDS.rows(TASK_LIST_FIELDS.query(db).order_by(Task.created_at.desc())))
+
+    return app
+
+
+async def _drive(app: FastAPI, path: str, requests: int, warmup: int) -> List[float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(warmup):
+            await client.get(path)
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            resp = await client.get(path)
+            timings.append(time.perf_counter() - start)
+            assert resp.status_code == 200
+    return timings
+
+
+def run(rows_list: List[int], requests: int = 30, warmup: int = 3) -> dict:
+    results = {}
+    for rows in rows_list:
+        app = build_app(rows)
+        for path in ("/legacy", "/fast"):
+            timings = sorted(asyncio.run(_drive(app, path, requests, warmup)))
+            results[(rows, path.strip("/"))] = {
+                "mean_ms": statistics.fmean(timings) * 1000,
+                "p50_ms": timings[len(timings) // 2] * 1000,
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.requests, args.warmup)
+    print(f"{'rows':>7} {'path':<7} {'mean_ms':>9} {'p50_ms':>9} {'speedup':>8}")
+    for rows in args.rows:
+        legacy = results[(rows, "legacy")]["mean_ms"]
+        for path in ("legacy", "fast"):
+            r = results[(rows, path)]
+            print(f"{rows:>7} {path:<7} {r['mean_ms']:>9.2f} {r['p50_ms']:>9.2f} {legacy / r['mean_ms']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Flag regressions between a baseline and a new benchmarks.bench_flows run.
+
+A scenario regresses when its p95 (or p99) latency grows by more than
+--max-regression (relative) *and* --min-delta-ms (absolute, to ignore noise
+on sub-millisecond endpoints), or when its queries per request go up at all.
+Exits 1 if anything regressed, so it can gate CI.
+
+Usage (from backend/fastapi):
+  python -m benchmarks.bench_flows --output /tmp/current.json
+  python -m benchmarks.compare benchmarks/baselines/sqlite.json /tmp/current.json
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+LATENCY_KEYS = ("p95_ms", "p99_ms")
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], max_regression: float = 0.25, min_delta_ms: float = 2.0) -> List[str]:
+    """Human-readable regression lines (empty when the run is within bounds)."""
+    problems = []
+    base_scenarios = baseline.get("scenarios", {})
+    for name, cur in current.get("scenarios", {}).items():
+        base = base_scenarios.get(name)
+        if base is None:
+            continue
+        for key in LATENCY_KEYS:
+            delta = cur[key] - base[key]
+            if delta > min_delta_ms and base[key] and delta / base[key] > max_regression:
+                problems.append(f"{name}: {key} {base[key]:.2f} -> {cur[key]:.2f} ms (+{delta / base[key]:.0%})")
+        if cur["queries_per_request"] > base["queries_per_request"]:
+            problems.append(f"{name}: queries/request {base['queries_per_request']} -> {cur['queries_per_request']}")
+        if cur.get("errors", 0) > base.get("errors", 0):
+            problems.append(f"{name}: errors {base.get('errors', 0)} -> {cur['errors']}")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed relative latency growth (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore latency growth smaller than this")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    with open(args.current) as fh:
+        current = json.load(fh)
+    if baseline.get("meta", {}).get("database") != current.get("meta", {}).get("database"):
+        print("warning: comparing runs against different databases", file=sys.stderr)
+
+    problems = compare(baseline, current, args.max_regression, args.min_delta_ms)
+    for line in problems:
+        print(f"REGRESSION {line}")
+    if not problems:
+        print("no regressions")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""
+Deterministic synthetic data for scale testing (benchmarks, index checks).
+
+Rows follow the shapes production data has rather than uniform noise:
+  - tasks per client, offers per task, message thread length and wallet
+    transaction history length are power-law (Pareto) distributed, so a few
+    heavy users/tasks dominate like they do in a real marketplace;
+  - task coordinates are clustered around Norwegian cities with gaussian
+    spread, weighted by rough population.
+
+The same (users, seed) always yields the same rows. Rows are streamed in
+batches through Core insert() executemany, or COPY FROM STDIN on Postgres
+(psycopg 3 or psycopg2), never ORM add(), so 10M rows stay in bounded memory.
+
+Usage (from backend/fastapi):
+  python -m benchmarks.datagen --size 10k                        # temp SQLite file
+  python -m benchmarks.datagen --size 1m --database-url postgresql+psycopg://localhost/taskup_bench --reset
+"""
+import argparse
+import csv
+import enum
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import Table, create_engine, insert
+from sqlalchemy.engine import Connection, Engine
+
+from taskup_backend.models import (
+    Base,
+    Message,
+    Offer,
+    OfferStatus,
+    Task,
+    TaskStatus,
+    Transaction,
+    TransactionStatus,
+    TransactionType,
+    User,
+    UserRole,
+    Wallet,
+)
+from taskup_backend.security import hash_password
+
+# Approximate total rows -> users (each user averages ~10 rows across all tables).
+SIZES = {"10k": 1_000, "100k": 10_000, "1m": 100_000, "10m": 1_000_000}
+PASSWORD = "synthetic-pass-123"
+TASKER_SHARE = 0.3
+BATCH_SIZE = 5_000
+
+# (lat, lng, weight, spread in degrees)
+CITIES = (
+    (59.9139, 10.7522, 0.45, 0.08),  # Oslo
+    (60.3913, 5.3221, 0.18, 0.05),  # Bergen
+    (63.4305, 10.3951, 0.13, 0.05),  # Trondheim
+    (58.9690, 5.7331, 0.12, 0.05),  # Stavanger
+    (69.6492, 18.9553, 0.05, 0.04),  # Tromsø
+    (65.0, 13.0, 0.07, 3.0),  # rural spread
+)
+CATEGORIES = ("cleaning", "handyman", "moving", "gardening", "assembly", "delivery", "painting", "it_help")
+EPOCH = datetime(2024, 1, 1)
+
+
+def _power_law(rng: random.Random, alpha: float, cap: int, minimum: int = 0) -> int:
+    """Pareto-distributed integer in [minimum, cap]; smaller alpha -> heavier tail."""
+    return min(cap, minimum + int(rng.paretovariate(alpha)) - 1)
+
+
+def _geo(rng: random.Random) -> tuple:
+    lat, lng, _, spread = rng.choices(CITIES, weights=[c[2] for c in CITIES])[0]
+    return round(rng.gauss(lat, spread), 6), round(rng.gauss(lng, spread * 2), 6)
+
+
+def _ts(rng: random.Random, days: int = 365) -> datetime:
+    return EPOCH + timedelta(seconds=rng.randrange(days * 86400))
+
+
+class Generator:
+    """Yields row dicts per table for `users` users; deterministic for a given seed."""
+
+    def __init__(self, users: int, seed: int = 1):
+        self.users = users
+        self.seed = seed
+        self.taskers = max(1, int(users * TASKER_SHARE)) if users > 1 else 0
+        self.hashed_password = hash_password(PASSWORD)
+
+    def _user_id(self, i: int) -> str:
+        return f"syn-u{i}"
+
+    def _is_tasker(self, i: int) -> bool:
+        return i < self.taskers
+
+    def users_and_wallets(self) -> Iterator[tuple]:
+        rng = random.Random(f"{self.seed}:users")
+        for i in range(self.users):
+            created = _ts(rng)
+            uid = self._user_id(i)
+            yield "users", {
+                "id": uid,
+                "email": f"syn-{i}@example.com",
+                "hashed_password": self.hashed_password,
+                "full_name": f"Synthetic User {i}",
+                "role": UserRole.tasker if self._is_tasker(i) else UserRole.client,
+                "language": rng.choice(("nb", "nb", "en")),
+                "created_at": created,
+                "updated_at": created,
+                "risk_score": round(rng.random() * 0.2, 3),
+            }
+            yield "wallets", {
+                "id": f"syn-w{i}",
+                "user_id": uid,
+                "available_balance": rng.randrange(0, 500_000, 100),
+                "escrow_balance": 0,
+                "currency": "NOK",
+                "updated_at": created,
+            }
+
+    def activity(self) -> Iterator[tuple]:
+        """Tasks, offers, message threads and wallet transactions (all FK targets already exist)."""
+        rng = random.Random(f"{self.seed}:activity")
+        for i in range(self.taskers, self.users):
+            client_id = self._user_id(i)
+            for t in range(_power_law(rng, 1.3, cap=200)):
+                yield from self._task(rng, client_id, f"syn-t{i}-{t}")
+        for i in range(self.users):
+            yield from self._transactions(rng, i)
+
+    def _task(self, rng: random.Random, client_id: str, task_id: str) -> Iterator[tuple]:
+        created = _ts(rng)
+        lat, lng = _geo(rng)
+        budget = rng.randrange(200, 5000, 50) * 100
+        offers = _power_law(rng, 1.5, cap=min(50, self.taskers), minimum=0) if self.taskers else 0
+        taskers = rng.sample(range(self.taskers), offers) if offers else []
+        accepted = taskers[0] if taskers and rng.random() < 0.4 else None
+        status = TaskStatus.open
+        if accepted is not None:
+            status = rng.choices(
+                (TaskStatus.assigned, TaskStatus.in_progress, TaskStatus.completed, TaskStatus.disputed),
+                weights=(3, 2, 6, 0.3),
+            )[0]
+        elif rng.random() < 0.1:
+            status = TaskStatus.cancelled
+        yield "tasks", {
+            "id": task_id,
+            "client_id": client_id,
+            "assigned_tasker_id": self._user_id(accepted) if accepted is not None else None,
+            "title": f"{rng.choice(CATEGORIES).replace('_', ' ').title()} job {task_id}",
+            "description": "Synthetic task",
+            "category": rng.choice(CATEGORIES),
+            "location": "Norway",
+            "latitude": lat,
+            "longitude": lng,
+            "budget_min": budget,
+            "budget_max": budget + rng.randrange(0, 2000, 100) * 100,
+            "currency": "NOK",
+            "status": status,
+            "created_at": created,
+        }
+        for n, tasker in enumerate(taskers):
+            offer_status = OfferStatus.pending
+            if accepted is not None:
+                offer_status = OfferStatus.accepted if tasker == accepted else OfferStatus.rejected
+            offered = created + timedelta(minutes=rng.randrange(1, 72 * 60))
+            yield "offers", {
+                "id": f"{task_id}-o{n}",
+                "task_id": task_id,
+                "tasker_id": self._user_id(tasker),
+                "amount": budget,
+                "currency": "NOK",
+                "message": "Synthetic offer",
+                "status": offer_status,
+                "created_at": offered,
+                "updated_at": offered,
+            }
+        if accepted is not None:
+            tasker_id = self._user_id(accepted)
+            sent = created
+            for m in range(_power_law(rng, 1.1, cap=500)):
+                sent += timedelta(minutes=rng.randrange(1, 600))
+                sender, receiver = (client_id, tasker_id) if m % 2 == 0 else (tasker_id, client_id)
+                yield "messages", {
+                    "id": f"{task_id}-m{m}",
+                    "task_id": task_id,
+                    "sender_id": sender,
+                    "receiver_id": receiver,
+                    "content": "Synthetic message",
+                    "created_at": sent,
+                    "is_read": rng.random() < 0.8,
+                }
+
+    def _transactions(self, rng: random.Random, i: int) -> Iterator[tuple]:
+        tasker = self._is_tasker(i)
+        types = (TransactionType.release, TransactionType.payout) if tasker else (TransactionType.topup, TransactionType.escrow_hold, TransactionType.refund)
+        weights = (3, 1) if tasker else (3, 3, 0.3)
+        for n in range(_power_law(rng, 1.2, cap=1000)):
+            tx_type = rng.choices(types, weights=weights)[0]
+            yield "transactions", {
+                "id": f"syn-tx{i}-{n}",
+                "wallet_id": f"syn-w{i}",
+                "type": tx_type,
+                "amount": rng.randrange(200, 5000, 50) * 100,
+                "currency": "NOK",
+                "status": TransactionStatus.failed if rng.random() < 0.02 else TransactionStatus.succeeded,
+                "meta": None,
+                "created_at": _ts(rng),
+            }
+
+
+def _batched(rows: Iterable[tuple], batch_size: int) -> Iterator[tuple]:
+    """
+    Group a (table, row) stream into (table, [rows]) batches. When one table's
+    batch fills, every pending batch is flushed in first-seen order (parents
+    before children) so FK targets are always written first.
+    """
+    pending: Dict[str, List[dict]] = {}
+    for table, row in rows:
+        batch = pending.setdefault(table, [])
+        batch.append(row)
+        if len(batch) >= batch_size:
+            for name, rows_ in pending.items():
+                if rows_:
+                    yield name, rows_
+            pending = {name: [] for name in pending}
+    for table, batch in pending.items():
+        if batch:
+            yield table, batch
+
+
+def _copy_value(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, enum.Enum):
+        return value.name  # SQLAlchemy Enum columns store member names
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _copy_rows(conn: Connection, table: Table, rows: List[dict]) -> None:
+    """COPY FROM STDIN through the raw DBAPI connection (psycopg 3 or psycopg2)."""
+    columns = list(rows[0].keys())
+    sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN"
+    dbapi_conn = conn.connection.driver_connection
+    cursor = dbapi_conn.cursor()
+    if hasattr(cursor, "copy"):  # psycopg 3
+        with cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row([_copy_value(row[c]) for c in columns])
+        return
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["\\N" if (v := _copy_value(row[c])) is None else v for c in columns])
+    buf.seek(0)
+    cursor.copy_expert(f"{sql} WITH (FORMAT csv, NULL '\\N')", buf)
+
+
+def _writer(conn: Connection, use_copy: bool) -> Callable[[Table, List[dict]], None]:
+    if use_copy:
+        return lambda table, rows: _copy_rows(conn, table, rows)
+    return lambda table, rows: conn.execute(insert(table), rows)
+
+
+def generate(
+    engine: Engine,
+    users: int,
+    seed: int = 1,
+    batch_size: int = BATCH_SIZE,
+    use_copy: Optional[bool] = None,
+    progress: Optional[Callable[[Dict[str, int]], None]] = None,
+) -> Dict[str, int]:
+    """
+    Insert synthetic rows for `users` users into an existing schema; returns
+    row counts per table. COPY is used on Postgres unless use_copy=False.
+    """
+    if use_copy is None:
+        use_copy = engine.dialect.name == "postgresql"
+    gen = Generator(users, seed)
+    tables = {t.name: t for t in (User.__table__, Wallet.__table__, Task.__table__, Offer.__table__, Message.__table__, Transaction.__table__)}
+    counts: Dict[str, int] = {name: 0 for name in tables}
+    with engine.begin() as conn:
+        write = _writer(conn, use_copy)
+        # Users/wallets first so every FK target exists before tasks and offers reference them.
+        for stream in (gen.users_and_wallets(), gen.activity()):
+            for table_name, batch in _batched(stream, batch_size):
+                write(tables[table_name], batch)
+                counts[table_name] += len(batch)
+                if progress:
+                    progress(counts)
+    return counts
+
+
+def size_to_users(size: str) -> int:
+    """'10k' / '1m' / '10m' preset (approximate total rows) or a plain user count."""
+    key = size.lower()
+    if key in SIZES:
+        return SIZES[key]
+    return int(key)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="10k", help=f"preset ({', '.join(SIZES)}) or a user count")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", help="SQLAlchemy URL; defaults to a temporary SQLite file")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate the schema first (required with --database-url)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--no-copy", action="store_true", help="use executemany inserts on Postgres too")
+    args = parser.parse_args(argv)
+    if args.database_url and not args.reset:
+        parser.error("--database-url drops and recreates every table; pass --reset to confirm")
+
+    url = args.database_url
+    if url is None:
+        fd, path = tempfile.mkstemp(prefix="taskup-synthetic-", suffix=".db")
+        os.close(fd)
+        url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    start = time.perf_counter()
+    last = [start]
+
+    def progress(counts: Dict[str, int]) -> None:
+        now = time.perf_counter()
+        if now - last[0] >= 5:
+            last[0] = now
+            print(f"  {sum(counts.values()):,} rows ({now - start:.0f}s)", file=sys.stderr)
+
+    counts = generate(engine, size_to_users(args.size), args.seed, args.batch_size, False if args.no_copy else None, progress)
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    for name, n in counts.items():
+        print(f"{name:<14} {n:>12,}")
+    print(f"{'total':<14} {total:>12,}  in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s) -> {url}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,8 @@ from sqlalchemy.orm import Session
 from .models import AdminLog
 
 
-def log_admin_action(db: Session, admin_id: str, action: str, entity: str, entity_id: Optional[str], metadata: Optional[Dict[str, Any]] = None):
+def add_admin_action(db: Session, admin_id: str, action: str, entity: str, entity_id: Optional[str], metadata: Optional[Dict[str, Any]] = None) -> AdminLog:
+    """Stage an audit row without committing."""
     log = AdminLog(
         id=str(uuid4()),
         admin_id=admin_id,
@@ -17,4 +18,9 @@ def log_admin_action(db: Session, admin_id: str, action: str, entity: str, entit
         created_at=datetime.utcnow(),
     )
     db.add(log)
+    return log
+
+
+def log_admin_action(db: Session, admin_id: str, action: str, entity: str, entity_id: Optional[str], metadata: Optional[Dict[str, Any]] = None):
+    add_admin_action(db, admin_id, action, entity, entity_id, metadata)
     db.commit()
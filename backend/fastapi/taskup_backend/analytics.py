@@ -0,0 +1,227 @@
+"""
+Daily analytics rollups.
+
+run_rollup() rebuilds whole days in analytics_daily / analytics_daily_currency
+from the raw tasks, offers, disputes and payments rows. It is incremental by
+a `created_at` watermark: each run only scans rows created on or after
+`watermark - lookback_days` (floored to midnight UTC), so the cost follows new
+rows, not table size. The lookback re-aggregates recent days to pick up late
+changes (offers accepted, payments refunded, first offers arriving after the
+task's day). Changes older than the lookback are not reflected until a
+backfill (`--full`).
+
+Day buckets are by the row's own created_at, except time-to-first-offer,
+which is credited to the day the task was posted. Rates are derived at read
+time (daily_report) so multi-day ranges aggregate correctly.
+
+Admin endpoints read only the rollup tables. Schedule the job from cron:
+  python -m taskup_backend.analytics            # incremental
+  python -m taskup_backend.analytics --full     # rebuild everything
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .models import (
+    AnalyticsDaily,
+    AnalyticsDailyCurrency,
+    AnalyticsWatermark,
+    Dispute,
+    Offer,
+    OfferStatus,
+    Payment,
+    PaymentStatus,
+    Task,
+)
+
+WATERMARK_NAME = "daily_rollup"
+
+
+def _as_date(value: Any) -> date:
+    # func.date() returns a string on SQLite and a date on Postgres
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _window_start(watermark: Optional[datetime], lookback_days: int) -> Optional[datetime]:
+    if watermark is None:
+        return None
+    return datetime.combine((watermark - timedelta(days=lookback_days)).date(), time.min)
+
+
+def _since(query, column, start: Optional[datetime]):
+    return query.filter(column >= start) if start is not None else query
+
+
+def _aggregate(db: Session, start: Optional[datetime]) -> tuple:
+    daily: Dict[date, Dict[str, Any]] = defaultdict(
+        lambda: {
+            "tasks_posted": 0,
+            "tasks_with_offers": 0,
+            "first_offer_seconds_total": 0.0,
+            "offers_made": 0,
+            "offers_accepted": 0,
+            "disputes_opened": 0,
+        }
+    )
+    currency: Dict[tuple, Dict[str, int]] = defaultdict(lambda: {"payments": 0, "gmv": 0, "refunds": 0, "refunded_amount": 0})
+    latest: List[datetime] = []
+
+    day = func.date(Task.created_at)
+    for d, n, newest in _since(db.query(day, func.count(), func.max(Task.created_at)), Task.created_at, start).group_by(day):
+        daily[_as_date(d)]["tasks_posted"] = n
+        latest.append(newest)
+
+    first_offer = (
+        _since(db.query(Task.created_at, func.min(Offer.created_at)).join(Offer, Offer.task_id == Task.id), Task.created_at, start)
+        .group_by(Task.id, Task.created_at)
+    )
+    for posted_at, first_at in first_offer:
+        row = daily[posted_at.date()]
+        row["tasks_with_offers"] += 1
+        row["first_offer_seconds_total"] += max((first_at - posted_at).total_seconds(), 0.0)
+
+    day = func.date(Offer.created_at)
+    accepted = func.sum(case((Offer.status == OfferStatus.accepted, 1), else_=0))
+    for d, n, n_accepted, newest in _since(db.query(day, func.count(), accepted, func.max(Offer.created_at)), Offer.created_at, start).group_by(day):
+        daily[_as_date(d)].update(offers_made=n, offers_accepted=int(n_accepted or 0))
+        latest.append(newest)
+
+    day = func.date(Dispute.created_at)
+    for d, n, newest in _since(db.query(day, func.count(), func.max(Dispute.created_at)), Dispute.created_at, start).group_by(day):
+        daily[_as_date(d)]["disputes_opened"] = n
+        latest.append(newest)
+
+    # GMV: gross amount of every payment that was captured (everything but failed); refunds reported separately.
+    day = func.date(Payment.created_at)
+    captured = Payment.status != PaymentStatus.failed
+    refunded = Payment.status == PaymentStatus.refunded
+    payments = db.query(
+        day,
+        Payment.currency,
+        func.sum(case((captured, 1), else_=0)),
+        func.sum(case((captured, Payment.amount), else_=0)),
+        func.sum(case((refunded, 1), else_=0)),
+        func.sum(case((refunded, Payment.amount), else_=0)),
+        func.max(Payment.created_at),
+    )
+    for d, cur, n, gmv, n_refunds, refund_total, newest in _since(payments, Payment.created_at, start).group_by(day, Payment.currency):
+        currency[(_as_date(d), cur or "NOK")] = {
+            "payments": int(n or 0),
+            "gmv": int(gmv or 0),
+            "refunds": int(n_refunds or 0),
+            "refunded_amount": int(refund_total or 0),
+        }
+        latest.append(newest)
+
+    return daily, currency, max((t for t in latest if t is not None), default=None)
+
+
+def run_rollup(db: Session, lookback_days: Optional[int] = None, full: bool = False) -> Dict[str, Any]:
+    """Re-aggregate every day since `watermark - lookback_days` (or all days when `full`) in one transaction."""
+    lookback_days = get_settings().analytics_lookback_days if lookback_days is None else lookback_days
+    mark = db.get(AnalyticsWatermark, WATERMARK_NAME)
+    start = None if full or mark is None else _window_start(mark.watermark, lookback_days)
+    daily, currency, newest = _aggregate(db, start)
+
+    for model in (AnalyticsDaily, AnalyticsDailyCurrency):
+        _since(db.query(model), model.day, start.date() if start else None).delete(synchronize_session=False)
+    db.add_all(AnalyticsDaily(day=d, **values) for d, values in daily.items())
+    db.add_all(AnalyticsDailyCurrency(day=d, currency=cur, **values) for (d, cur), values in currency.items())
+
+    if mark is None:
+        mark = AnalyticsWatermark(name=WATERMARK_NAME)
+        db.add(mark)
+    if newest is not None and (mark.watermark is None or newest > mark.watermark):
+        mark.watermark = newest
+    mark.updated_at = datetime.utcnow()
+    db.commit()
+    return {
+        "from": start.date().isoformat() if start else None,
+        "days": len(daily),
+        "currency_rows": len(currency),
+        "watermark": mark.watermark.isoformat() if mark.watermark else None,
+    }
+
+
+def _ratio(numerator: float, denominator: float) -> Optional[float]:
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def _metrics(row: Dict[str, Any], gmv: Dict[str, int], payments: int, refunds: int) -> Dict[str, Any]:
+    return {
+        "tasks_posted": row["tasks_posted"],
+        "offers_made": row["offers_made"],
+        "offers_per_task": _ratio(row["offers_made"], row["tasks_posted"]),
+        "accept_rate": _ratio(row["offers_accepted"], row["offers_made"]),
+        "avg_time_to_first_offer_seconds": _ratio(row["first_offer_seconds_total"], row["tasks_with_offers"]),
+        "gmv_by_currency": gmv,
+        "payments": payments,
+        "refund_rate": _ratio(refunds, payments),
+        "disputes_opened": row["disputes_opened"],
+        "dispute_rate": _ratio(row["disputes_opened"], payments),
+    }
+
+
+def daily_report(db: Session, date_from: date, date_to: date) -> Dict[str, Any]:
+    """Per-day and whole-range metrics for [date_from, date_to], read from the rollup tables only."""
+    fields = ("tasks_posted", "tasks_with_offers", "first_offer_seconds_total", "offers_made", "offers_accepted", "disputes_opened")
+    days: Dict[date, Dict[str, Any]] = {}
+    for row in db.query(AnalyticsDaily).filter(AnalyticsDaily.day >= date_from, AnalyticsDaily.day <= date_to):
+        days[row.day] = {f: getattr(row, f) or 0 for f in fields}
+    money: Dict[date, List[AnalyticsDailyCurrency]] = defaultdict(list)
+    for row in db.query(AnalyticsDailyCurrency).filter(AnalyticsDailyCurrency.day >= date_from, AnalyticsDailyCurrency.day <= date_to):
+        money[row.day].append(row)
+        days.setdefault(row.day, dict.fromkeys(fields, 0))
+
+    totals = dict.fromkeys(fields, 0)
+    total_gmv: Dict[str, int] = defaultdict(int)
+    total_payments = total_refunds = 0
+    out = []
+    for d in sorted(days):
+        rows = money.get(d, [])
+        gmv = {r.currency: r.gmv for r in rows}
+        payments, refunds = sum(r.payments for r in rows), sum(r.refunds for r in rows)
+        out.append({"day": d.isoformat(), **_metrics(days[d], gmv, payments, refunds)})
+        for f in fields:
+            totals[f] += days[d][f]
+        for cur, amount in gmv.items():
+            total_gmv[cur] += amount
+        total_payments += payments
+        total_refunds += refunds
+
+    mark = db.get(AnalyticsWatermark, WATERMARK_NAME)
+    return {
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "days": out,
+        "totals": _metrics(totals, dict(total_gmv), total_payments, total_refunds),
+        "watermark": mark.watermark.isoformat() if mark and mark.watermark else None,
+        "rolled_up_at": mark.updated_at.isoformat() if mark and mark.updated_at else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Roll up daily analytics (run from cron).")
+    parser.add_argument("--lookback-days", type=int, default=None, help="defaults to TASKUP_ANALYTICS_LOOKBACK_DAYS")
+    parser.add_argument("--full", action="store_true", help="rebuild every day instead of the watermark window")
+    args = parser.parse_args()
+
+    from .database import SessionLocal
+
+    if SessionLocal is None:
+        raise SystemExit("DATABASE_URL not configured")
+    with SessionLocal() as db:
+        print(run_rollup(db, lookback_days=args.lookback_days, full=args.full))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,12 @@ from fastapi import FastAPI, Request
 from fastapi.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 from fastapi import HTTPException
 import logging
 
 from .config import get_settings
-from .routers import auth, tasks, offers, messages, payments, disputes, admin, health, notifications, notifications_admin, config
+from .routers import auth, tasks, offers, messages, payments, disputes, admin, health, notifications, notifications_admin, config, metrics
 from .errors import (
     TaskUpError,
     error_response_from_taskup_error,
@@ -16,6 +15,13 @@ from .errors import (
     internal_error,
     correlation_id_from_request,
 )
+from .middleware import CorrelationIdMiddleware
+from .read_routing import ReadYourWritesMiddleware
+from .idempotency import IdempotencyMiddleware
+from .logging_utils import configure_logging
+from .metrics import start_snapshot_writer
+from .query_stats import install_query_hooks
+from .dashboard import install_dashboard_hooks
 from . import sentry_utils  # noqa: F401
 
 logger = logging.getLogger("taskup")
@@ -23,8 +29,20 @@ logger = logging.getLogger("taskup")
 
 def create_app() -> FastAPI:
     settings = get_settings()
+    configure_logging(settings.log_level, settings.log_queue_size)
+    start_snapshot_writer()
+    install_query_hooks()
+    install_dashboard_hooks()
     app = FastAPI(title=settings.app_name, version="0.1.0", docs_url="/api/docs", openapi_url="/api/openapi.json")
 
+    # Replays retried writes that carry an Idempotency-Key instead of running them twice.
+    # Added before CORS so replays and its own errors still get CORS headers.
+    app.add_middleware(
+        IdempotencyMiddleware,
+        ttl_seconds=settings.idempotency_ttl_seconds,
+        lease_seconds=settings.idempotency_lease_seconds,
+    )
+
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_allow_origins,
@@ -34,13 +52,17 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    class CorrelationIdMiddleware(BaseHTTPMiddleware):
-        async def dispatch(self, request: Request, call_next):
-            correlation_id_from_request(request)
-            response = await call_next(request)
-            return response
+    if settings.database_replica_url:
+        # Pin writers to the primary for the replication-lag window (database.get_read_db).
+        app.add_middleware(ReadYourWritesMiddleware, window=settings.read_your_writes_seconds)
 
-    app.add_middleware(CorrelationIdMiddleware)
+    # Outermost layer: correlation id, X-Correlation-Id header, timing, query accounting and access log.
+    app.add_middleware(
+        CorrelationIdMiddleware,
+        query_budget=settings.query_budget_per_request,
+        profile_token=settings.profile_token,
+        profile_dir=settings.profile_dir,
+    )
 
     @app.exception_handler(TaskUpError)
     async def taskup_error_handler(request: Request, exc: TaskUpError):
@@ -75,22 +97,6 @@ def create_app() -> FastAPI:
         err = internal_error()
         return error_response_from_taskup_error(err, cid)
 
-    @app.middleware("http")
-    async def add_correlation_header(request: Request, call_next):
-        cid = correlation_id_from_request(request)
-        response = await call_next(request)
-        response.headers["X-Correlation-Id"] = cid
-        logger.info(
-            "request",
-            extra={
-                "correlation_id": cid,
-                "method": request.method,
-                "path": request.url.path,
-                "status_code": response.status_code,
-            },
-        )
-        return response
-
     api_prefix = settings.api_prefix
     # Primary API namespace
     app.include_router(health.router, prefix=api_prefix)
@@ -106,6 +112,8 @@ def create_app() -> FastAPI:
     app.include_router(config.router, prefix=api_prefix)
     # Compatibility (supports /auth/* alongside /api/auth/*)
     app.include_router(auth.router, prefix="/auth")
+    # Prometheus scrape endpoint (unprefixed)
+    app.include_router(metrics.router)
 
     @app.get("/docs", include_in_schema=False)
     async def docs_redirect():
@@ -0,0 +1,52 @@
+"""
+Optimistic concurrency for Task, Offer, Payment and Wallet.
+
+Those models carry a `version` column (mapper `version_id_col`), so every ORM
+UPDATE is `... WHERE id = ? AND version = ?` and bumps the version. When a
+concurrent request committed first, the UPDATE matches no row and the flush
+raises StaleDataError instead of overwriting the other write.
+
+`with_retry` runs a read-check-write unit again on a fresh read: the state
+checks in the unit then see the winner's write and fail cleanly (e.g. the task
+is no longer open), or the unit succeeds against the new balances. After
+TASKUP_CONCURRENCY_RETRIES failed attempts the caller gets a retryable 409.
+
+A unit must re-read everything it checks and must not have external side
+effects before its last commit (Stripe calls made there use idempotency keys).
+"""
+from typing import Callable, Optional, TypeVar
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from .config import get_settings
+from .errors import TaskUpError, conflict_error
+from .metrics import STALE_WRITES
+
+T = TypeVar("T")
+
+
+def concurrent_update_error() -> TaskUpError:
+    err = conflict_error("CONCURRENT_UPDATE", "The resource was changed by another request; please retry")
+    err.retryable = True
+    return err
+
+
+def with_retry(db: Session, unit: Callable[[], T], retries: Optional[int] = None) -> T:
+    """Run `unit` (which commits), retrying it on a version conflict up to `retries` times."""
+    retries = get_settings().concurrency_retries if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            result = unit()
+        except StaleDataError:
+            # Rollback expires every loaded row, so the next attempt re-reads current versions.
+            db.rollback()
+            if attempt == retries:
+                STALE_WRITES.labels(outcome="gave_up").inc()
+                raise concurrent_update_error()
+            STALE_WRITES.labels(outcome="retried").inc()
+            continue
+        if attempt:
+            STALE_WRITES.labels(outcome="resolved").inc()
+        return result
+    raise concurrent_update_error()
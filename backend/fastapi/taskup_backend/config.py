@@ -1,4 +1,5 @@
 import os
+import tempfile
 from functools import lru_cache
 from typing import List
 from pydantic import AnyUrl
@@ -22,9 +23,24 @@ class Settings(BaseSettings):
     supabase_url: str | None = os.getenv("SUPABASE_URL")
     supabase_service_role_key: str | None = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
     database_url: str | None = os.getenv("DATABASE_URL")
+    database_replica_url: str | None = os.getenv("DATABASE_REPLICA_URL")
+    data_backend: str = os.getenv("TASKUP_DATA_BACKEND", "sqlalchemy")
+    read_your_writes_seconds: float = float(os.getenv("TASKUP_READ_YOUR_WRITES_SECONDS", "5"))
     jwt_secret: str = os.getenv("JWT_SECRET", "dev-secret-change-me")
     sentry_dsn: str | None = os.getenv("SENTRY_DSN")
     environment: str = os.getenv("TASKUP_ENV", "development")
+    log_level: str = os.getenv("TASKUP_LOG_LEVEL", "INFO")
+    log_queue_size: int = int(os.getenv("TASKUP_LOG_QUEUE_SIZE", "10000"))
+    metrics_token: str | None = os.getenv("TASKUP_METRICS_TOKEN")
+    query_budget_per_request: int = int(os.getenv("TASKUP_QUERY_BUDGET", "25"))
+    profile_token: str | None = os.getenv("TASKUP_PROFILE_TOKEN")
+    profile_dir: str = os.getenv("TASKUP_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "taskup-profiles"))
+    dashboard_max_age_seconds: float = float(os.getenv("TASKUP_DASHBOARD_MAX_AGE", "60"))
+    analytics_lookback_days: int = int(os.getenv("TASKUP_ANALYTICS_LOOKBACK_DAYS", "3"))
+    user_summary_ttl_seconds: float = float(os.getenv("TASKUP_USER_SUMMARY_TTL", "30"))
+    idempotency_ttl_seconds: float = float(os.getenv("TASKUP_IDEMPOTENCY_TTL", str(24 * 3600)))
+    idempotency_lease_seconds: float = float(os.getenv("TASKUP_IDEMPOTENCY_LEASE", "60"))
+    concurrency_retries: int = int(os.getenv("TASKUP_CONCURRENCY_RETRIES", "3"))
 
     class Config:
         case_sensitive = False
@@ -0,0 +1,197 @@
+"""
+Admin dashboard counters served from an in-process cache.
+
+A full refresh runs grouped aggregates (count per status, new rows per day,
+payment amount per status) at most once per `max_age` seconds. Between
+refreshes the cache is maintained incrementally: Session after_flush hooks
+record inserts, deletes and status changes of tracked models, and the deltas
+are applied on after_commit (discarded on rollback), so the dashboard follows
+the create/transition paths without re-counting.
+
+Core UPDATEs bypass the hooks, so the code issuing them reports its own
+changes with `record_change()` (or `invalidate_on_commit()` when the previous
+status isn't known). Writes from other workers are not seen at all; the
+staleness bound is what guarantees they show up.
+"""
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from .models import Dispute, Offer, Payment, Task, User
+
+# model -> (dashboard key, status-like attribute)
+TRACKED = {
+    User: ("users", "role"),
+    Task: ("tasks", "status"),
+    Offer: ("offers", "status"),
+    Dispute: ("disputes", "status"),
+    Payment: ("payments", "status"),
+}
+DAILY_WINDOW_DAYS = 30
+_DELTAS_KEY = "taskup_dashboard_deltas"
+_STALE_KEY = "taskup_dashboard_stale"
+
+# (table, old status or None, new status or None, day, amount)
+Delta = Tuple[str, Optional[str], Optional[str], Optional[str], int]
+
+
+def _key(value: Any) -> str:
+    return getattr(value, "value", None) or str(value)
+
+
+def _day(value: Any) -> Optional[str]:
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)[:10] if value else None
+
+
+class DashboardCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self.by_status: Dict[str, Counter] = {}
+        self.daily: Dict[str, Counter] = {}
+        self.payment_amounts: Counter = Counter()
+        self.refreshed_at: Optional[float] = None
+        self.as_of: Optional[datetime] = None
+
+    def refresh(self, db: Session) -> None:
+        since = datetime.utcnow() - timedelta(days=DAILY_WINDOW_DAYS)
+        by_status: Dict[str, Counter] = {}
+        daily: Dict[str, Counter] = {}
+        amounts: Counter = Counter()
+        for model, (name, attr) in TRACKED.items():
+            column = getattr(model, attr)
+            if model is Payment:
+                rows = db.query(column, func.count(), func.coalesce(func.sum(Payment.amount), 0)).group_by(column).all()
+                amounts = Counter({_key(status): int(total) for status, _, total in rows})
+                by_status[name] = Counter({_key(status): n for status, n, _ in rows})
+            else:
+                by_status[name] = Counter({_key(status): n for status, n in db.query(column, func.count()).group_by(column)})
+            day = func.date(model.created_at)
+            daily[name] = Counter({_day(d): n for d, n in db.query(day, func.count()).filter(model.created_at >= since).group_by(day)})
+        with self._lock:
+            self.by_status, self.daily, self.payment_amounts = by_status, daily, amounts
+            self.refreshed_at = time.monotonic()
+            self.as_of = datetime.utcnow()
+
+    def apply(self, deltas: List[Delta]) -> None:
+        with self._lock:
+            if self.refreshed_at is None:
+                return
+            for name, old, new, day, amount in deltas:
+                counts = self.by_status.setdefault(name, Counter())
+                if old is not None:
+                    counts[old] -= 1
+                    if name == "payments":
+                        self.payment_amounts[old] -= amount
+                if new is not None:
+                    counts[new] += 1
+                    if name == "payments":
+                        self.payment_amounts[new] += amount
+                if old is None and day:
+                    self.daily.setdefault(name, Counter())[day] += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.refreshed_at = None
+
+    def get(self, db: Session, max_age: float, force: bool = False) -> Dict[str, Any]:
+        stale = self.refreshed_at is None or force or time.monotonic() - self.refreshed_at > max_age
+        if stale:
+            # One refresh at a time; others keep serving the previous snapshot if there is one.
+            if self._refreshing.acquire(blocking=self.refreshed_at is None or force):
+                try:
+                    self.refresh(db)
+                finally:
+                    self._refreshing.release()
+        return self.snapshot()
+
+    def snapshot(self) -> Dict[str, Any]:
+        cutoff = (datetime.utcnow() - timedelta(days=DAILY_WINDOW_DAYS)).date().isoformat()
+        with self._lock:
+            by_status = {name: {k: v for k, v in counts.items() if v} for name, counts in self.by_status.items()}
+            daily = {name: {d: n for d, n in sorted(days.items()) if d >= cutoff} for name, days in self.daily.items()}
+            data: Dict[str, Any] = {name: sum(counts.values()) for name, counts in by_status.items()}
+            data.update(
+                {
+                    "by_status": by_status,
+                    "daily": daily,
+                    "gmv": self.payment_amounts.get("payment_released", 0),
+                    "escrowed_amount": self.payment_amounts.get("escrowed", 0),
+                    "open_disputes": by_status.get("disputes", {}).get("open", 0),
+                    "as_of": self.as_of.isoformat() if self.as_of else None,
+                    "age_seconds": round(time.monotonic() - self.refreshed_at, 3) if self.refreshed_at else None,
+                }
+            )
+        return data
+
+
+DASHBOARD = DashboardCache()
+_installed = False
+
+
+def record_change(session: Session, name: str, old: Any, new: Any, count: int = 1, amount: int = 0) -> None:
+    """Queue `count` status changes of a tracked table made outside the ORM unit of work; applied on commit."""
+    if count:
+        session.info.setdefault(_DELTAS_KEY, []).extend([(name, _key(old), _key(new), None, amount)] * count)
+
+
+def invalidate_on_commit(session: Session) -> None:
+    """Recount on the next read once this transaction commits (for changes whose old status is unknown)."""
+    session.info[_STALE_KEY] = True
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    deltas: List[Delta] = session.info.setdefault(_DELTAS_KEY, [])
+    for obj in session.new:
+        spec = TRACKED.get(type(obj))
+        if spec:
+            name, attr = spec
+            deltas.append((name, None, _key(getattr(obj, attr)), _day(getattr(obj, "created_at", None) or datetime.utcnow()), getattr(obj, "amount", 0) or 0))
+    for obj in session.dirty:
+        spec = TRACKED.get(type(obj))
+        if spec:
+            name, attr = spec
+            history = inspect(obj).attrs[attr].history
+            if history.added and history.deleted:
+                deltas.append((name, _key(history.deleted[0]), _key(history.added[0]), None, getattr(obj, "amount", 0) or 0))
+    for obj in session.deleted:
+        spec = TRACKED.get(type(obj))
+        if spec:
+            name, attr = spec
+            deltas.append((name, _key(getattr(obj, attr)), None, None, getattr(obj, "amount", 0) or 0))
+
+
+def _after_commit(session: Session) -> None:
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if deltas:
+        DASHBOARD.apply(deltas)
+    if session.info.pop(_STALE_KEY, False):
+        DASHBOARD.invalidate()
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_DELTAS_KEY, None)
+    session.info.pop(_STALE_KEY, None)
+
+
+def install_dashboard_hooks() -> None:
+    """Register the Session hooks that keep DASHBOARD current (idempotent)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_soft_rollback", lambda session, previous_transaction: _after_rollback(session))
+    for model, (_, attr) in TRACKED.items():
+        # active_history: load the previous status on assignment even when the row was expired by a commit.
+        event.listen(getattr(model, attr), "set", lambda target, value, oldvalue, initiator: value, active_history=True)
+    _installed = True
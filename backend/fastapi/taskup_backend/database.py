@@ -1,13 +1,23 @@
 import os
+from typing import Optional
+
+from fastapi import Depends, Request
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from .config import get_settings
 from .models import Base
+from .read_routing import is_pinned_to_primary
 
 DATABASE_URL = os.getenv("DATABASE_URL") or os.getenv("SUPABASE_DB_URL") or ""
+DATABASE_REPLICA_URL = get_settings().database_replica_url or ""
 
 engine = create_engine(DATABASE_URL, echo=False, future=True) if DATABASE_URL else None
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) if engine else None
 
+# Optional read replica; without DATABASE_REPLICA_URL every read goes to the primary.
+replica_engine = create_engine(DATABASE_REPLICA_URL, echo=False, future=True) if DATABASE_REPLICA_URL else None
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if replica_engine else None
+
 
 def get_db():
     """FastAPI dependency that yields a SQLAlchemy session."""
@@ -20,6 +30,29 @@ def get_db():
         db.close()
 
 
+def get_replica_db():
+    """Yields a replica session, or None when no replica is configured."""
+    if ReplicaSessionLocal is None:
+        yield None
+        return
+    db = ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(request: Request, primary: Session = Depends(get_db), replica: Optional[Session] = Depends(get_replica_db)) -> Session:
+    """
+    Session for read-only endpoints: the replica, unless none is configured or
+    the caller wrote recently (read-your-writes pin, see read_routing).
+    Sessions connect lazily, so the unused one never checks out a connection.
+    """
+    if replica is None or is_pinned_to_primary(request):
+        return primary
+    return replica
+
+
 def init_db():
     """Create tables in dev-only scenarios."""
     if engine is None:
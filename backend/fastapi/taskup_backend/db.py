@@ -1,85 +1,325 @@
+import asyncio
+import contextvars
+import functools
+import hashlib
+import logging
+import operator
 import os
-from typing import Any, Dict, Optional, List
-from uuid import uuid4
-from supabase import create_client, Client
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, List, TypeVar
+
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
+from postgrest.utils import SyncClient
+
+from .memstore import MemStore, open_store
+
+logger = logging.getLogger("taskup.db")
 
-_service_client: Optional[Client] = None
 _anon_key = os.getenv("SUPABASE_ANON_KEY")
 _url = os.getenv("SUPABASE_URL")
 _service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
+# All PostgREST clients share one pooled transport, so per-user clients reuse
+# open (HTTP/2 when available) connections instead of handshaking per call.
+_MAX_CONNECTIONS = int(os.getenv("TASKUP_SUPABASE_MAX_CONNECTIONS", "20"))
+_TOKEN_CLIENTS = int(os.getenv("TASKUP_SUPABASE_TOKEN_CLIENTS", "256"))
+# Blocking PostgREST calls from async handlers run on their own bounded pool
+# (see run_sync/aio), so a slow response holds one of these threads instead of
+# the event loop, and can't starve the default threadpool either.
+_DB_THREADS = int(os.getenv("TASKUP_DB_THREADS", str(_MAX_CONNECTIONS)))
+
+T = TypeVar("T")
+
+_transport: Optional[httpx.HTTPTransport] = None
+_transport_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
 # In-memory fallback for offline/local dev to keep flows working without Supabase.
-_mem: Dict[str, List[Dict[str, Any]]] = {
-    "user_profiles": [],
-    "tasks": [],
-    "offers": [],
-    "messages": [],
-    "payments": [],
-    "disputes": [],
-    "notifications": [],
-    "admin_logs": [],
-    "device_fingerprints": [],
-}
-
-
-def _client(jwt: Optional[str] = None) -> Optional[Client]:
+_mem: MemStore = open_store(
+    [
+        "user_profiles",
+        "tasks",
+        "offers",
+        "messages",
+        "payments",
+        "disputes",
+        "notifications",
+        "admin_logs",
+        "device_fingerprints",
+    ]
+)
+
+
+def _shared_transport() -> httpx.HTTPTransport:
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                try:
+                    import h2  # noqa: F401
+
+                    http2 = True
+                except ImportError:
+                    http2 = False
+                _transport = httpx.HTTPTransport(
+                    http2=http2,
+                    limits=httpx.Limits(max_connections=_MAX_CONNECTIONS, max_keepalive_connections=_MAX_CONNECTIONS, keepalive_expiry=30),
+                )
+    return _transport
+
+
+class _PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose session sends through the shared transport instead of opening its own pool."""
+
+    def create_session(self, base_url, headers, timeout, verify=True) -> SyncClient:
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=True,
+            transport=_shared_transport(),
+        )
+
+
+def _postgrest_client(api_key: str, bearer: str) -> SyncPostgrestClient:
+    return _PooledPostgrestClient(
+        f"{_url}/rest/v1",
+        headers={"apiKey": api_key, "Authorization": f"Bearer {bearer}"},
+        timeout=DEFAULT_POSTGREST_CLIENT_TIMEOUT,
+    )
+
+
+class TokenClientCache:
+    """
+    Bounded LRU of per-JWT PostgREST clients keyed by the token's sha256 (raw
+    tokens are not kept as keys). The clients only hold headers; connections
+    live in the shared transport, so evicted clients are simply dropped.
+    """
+
+    def __init__(self, max_size: int = _TOKEN_CLIENTS):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clients: "OrderedDict[str, SyncPostgrestClient]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, jwt: str, api_key: str) -> SyncPostgrestClient:
+        key = hashlib.sha256(jwt.encode()).hexdigest()
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return client
+            self.misses += 1
+        client = _postgrest_client(api_key, jwt)
+        with self._lock:
+            self._clients[key] = client
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+        return client
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+
+_service_client: Optional[SyncPostgrestClient] = None
+_token_clients = TokenClientCache()
+
+
+def _client(jwt: Optional[str] = None) -> Optional[SyncPostgrestClient]:
     """
-    Returns a Supabase client. If jwt provided, it will use anon key (preferred)
+    Returns a PostgREST client. If jwt provided, it will use anon key (preferred)
     and attach the JWT for RLS. Otherwise the service role key is used.
     """
     global _service_client
     if jwt:
         if not _url or not (_anon_key or _service_key):
             return None
-        client = create_client(_url, _anon_key or _service_key)
-        client.postgrest.auth(jwt)
-        return client
+        return _token_clients.get(jwt, _anon_key or _service_key)
 
     if _service_client:
         return _service_client
     if not _url or not _service_key:
         return None
-    _service_client = create_client(_url, _service_key)
+    _service_client = _postgrest_client(_service_key, _service_key)
     return _service_client
 
 
-def _mem_select(table: str, filters: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
-    rows = _mem.get(table, [])
-    if not filters:
-        return list(rows)
-    return [r for r in rows if all(r.get(k) == v for k, v in filters.items())]
+def _db_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _transport_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_DB_THREADS, thread_name_prefix="taskup-db")
+    return _executor
+
+
+async def run_sync(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a blocking data-access call on the db thread pool, keeping context vars (write buffer)."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_db_executor(), functools.partial(context.run, fn, *args, **kwargs))
+
+
+class _AsyncHelpers:
+    """`await db.aio.get_task(...)`: any public helper of this module, run through run_sync."""
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        fn = globals().get(name)
+        if name.startswith("_") or not callable(fn) or isinstance(fn, type):
+            raise AttributeError(name)
+
+        @functools.wraps(fn)
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await run_sync(fn, *args, **kwargs)
+
+        return call
+
+
+aio = _AsyncHelpers()
+
+
+def pool_stats() -> Dict[str, int]:
+    """Connection pool and per-token client cache counters (see metrics.py)."""
+    connections = list(getattr(getattr(_transport, "_pool", None), "connections", []))
+    idle = sum(1 for c in connections if c.is_idle())
+    return {
+        "max_connections": _MAX_CONNECTIONS,
+        "db_threads": _DB_THREADS,
+        "db_calls_queued": _executor._work_queue.qsize() if _executor else 0,
+        "connections": len(connections),
+        "idle_connections": idle,
+        "active_connections": len(connections) - idle,
+        "token_clients": len(_token_clients),
+        "token_client_hits": _token_clients.hits,
+        "token_client_misses": _token_clients.misses,
+        "token_client_evictions": _token_clients.evictions,
+    }
+
+
+# select() filters: {column: value} is equality, {column: [v1, v2]} is IN,
+# {"column__op": value} applies op (neq, gt, gte, lt, lte, in, nin), and
+# {"or": [filters, filters]} matches rows meeting any of the nested filter dicts.
+_FILTER_OPS = frozenset({"eq", "neq", "gt", "gte", "lt", "lte", "in", "nin"})
+
+
+class Rows(list):
+    """Rows returned by select(); `count` is the total match count when a count mode was requested."""
+
+    def __init__(self, rows: Any = (), count: Optional[int] = None):
+        super().__init__(rows)
+        self.count = count
+
+
+def _parse_filters(filters: Optional[Dict[str, Any]]) -> List[tuple]:
+    parsed = []
+    for key, value in (filters or {}).items():
+        if key == "or":
+            parsed.append(("", "or", [_parse_filters(alt) for alt in value]))
+            continue
+        column, sep, op = key.rpartition("__")
+        if not sep or op not in _FILTER_OPS:
+            column, op = key, "in" if isinstance(value, (list, tuple, set, frozenset)) else "eq"
+        parsed.append((column, op, value))
+    return parsed
+
+
+_COMPARISONS = {"neq": operator.ne, "gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le}
+
+
+def _compare(left: Any, op: str, right: Any) -> bool:
+    if op == "eq":
+        return left == right
+    if op == "in":
+        return left in right
+    if left is None:
+        # SQL: NULL fails every comparison, including <> and NOT IN.
+        return False
+    if op == "nin":
+        return left not in right
+    return _COMPARISONS[op](left, right)
+
+
+def _matches(row: Dict[str, Any], parsed: List[tuple]) -> bool:
+    return all(
+        any(_matches(row, alt) for alt in value) if op == "or" else _compare(row.get(column), op, value)
+        for column, op, value in parsed
+    )
+
+
+def _order_key(row: Dict[str, Any], column: str) -> tuple:
+    # Postgres order: NULLs last ascending (first descending), then id as the tie-break.
+    value = row.get(column)
+    return (value is None, value, str(row.get("id")))
+
+
+def _mem_select(
+    table: str,
+    filters: Dict[str, Any] | None = None,
+    columns: Any = "*",
+    order_by: Optional[str] = None,
+    desc: bool = False,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    after: Optional[tuple] = None,
+    count: Optional[str] = None,
+) -> Rows:
+    parsed = _parse_filters(filters)
+    # Equality and IN go through the table's indexes; other operators filter the result.
+    indexed = {c: v for c, op, v in parsed if op in ("eq", "in")}
+    rows = _mem.table(table).select(indexed)
+    rest = [(c, op, v) for c, op, v in parsed if op not in ("eq", "in")]
+    if rest:
+        rows = [r for r in rows if _matches(r, rest)]
+    if order_by:
+        rows.sort(key=lambda r: _order_key(r, order_by), reverse=desc)
+        if after is not None:
+            cursor = (False, after[0], str(after[1]))
+            beyond = operator.lt if desc else operator.gt
+            rows = [r for r in rows if r.get(order_by) is not None and beyond(_order_key(r, order_by), cursor)]
+    total = len(rows) if count else None
+    end = offset + limit if limit is not None else None
+    rows = rows[offset:end]
+    wanted = _columns(columns)
+    if wanted != "*":
+        names = wanted.split(",")
+        rows = [{c: r.get(c) for c in names} for r in rows]
+    return Rows(rows, count=total)
+
+
+def _columns(columns: Any) -> str:
+    return columns if isinstance(columns, str) else ",".join(columns)
+
+
+def _quote(value: Any) -> str:
+    # Values inside PostgREST logic trees (or=...) are quoted so ',', '.', ':' and parentheses survive.
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
 
 
 def _mem_insert(table: str, data: Dict[str, Any]) -> Dict[str, Any]:
-    table_rows = _mem.setdefault(table, [])
-    row = data.copy()
-    if "id" not in row:
-        row["id"] = str(uuid4())
-    table_rows.append(row)
-    return row
+    return _mem.table(table).insert(data)
 
 
 def _mem_update(table: str, filters: Dict[str, Any], data: Dict[str, Any]) -> List[Dict[str, Any]]:
-    rows = _mem.get(table, [])
-    updated: List[Dict[str, Any]] = []
-    for idx, r in enumerate(rows):
-        if all(r.get(k) == v for k, v in filters.items()):
-            rows[idx] = {**r, **data}
-            updated.append(rows[idx])
-    return updated
+    return _mem.table(table).update(filters, data)
 
 
 def _mem_delete(table: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
-    rows = _mem.get(table, [])
-    remaining = []
-    removed = []
-    for r in rows:
-        if all(r.get(k) == v for k, v in filters.items()):
-            removed.append(r)
-        else:
-            remaining.append(r)
-    _mem[table] = remaining
-    return removed
+    return _mem.table(table).delete(filters)
 
 
 def insert(table: str, data: Dict[str, Any], jwt: Optional[str] = None) -> Any:
@@ -90,18 +330,173 @@ def insert(table: str, data: Dict[str, Any], jwt: Optional[str] = None) -> Any:
     return res.data
 
 
-def select(table: str, filters: Dict[str, Any] | None = None, jwt: Optional[str] = None) -> List[Dict[str, Any]]:
+def insert_many(table: str, rows: List[Dict[str, Any]], jwt: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Insert `rows` in one request; keys missing from a row take the column default."""
+    if not rows:
+        return []
     client = _client(jwt)
     if not client:
-        return _mem_select(table, filters)
-    query = client.table(table).select("*")
-    if filters:
-        for k, v in filters.items():
-            query = query.eq(k, v)
-    res = query.execute()
+        return [_mem_insert(table, row) for row in rows]
+    res = client.table(table).insert(rows, default_to_null=False).execute()
+    return res.data or []
+
+
+def upsert_many(
+    table: str,
+    rows: List[Dict[str, Any]],
+    on_conflict: str = "id",
+    ignore_duplicates: bool = False,
+    jwt: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Insert `rows` in one request, merging into existing rows that share the
+    `on_conflict` columns ("a,b"; needs a unique constraint on them), or
+    leaving those rows untouched with ignore_duplicates.
+    """
+    if not rows:
+        return []
+    client = _client(jwt)
+    if not client:
+        mem_table = _mem.table(table)
+        columns = on_conflict.split(",")
+        written = [mem_table.upsert(row, columns, ignore_duplicates) for row in rows]
+        return [row for row in written if row is not None]
+    res = (
+        client.table(table)
+        .upsert(rows, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates, default_to_null=False)
+        .execute()
+    )
     return res.data or []
 
 
+# Request-scoped write buffer: notification and audit rows (record_notification,
+# log_admin_action, log_device_fingerprint) are collected while a buffer is
+# active and sent as one insert per table when it closes. Nothing reads these
+# rows back within the request that writes them.
+_write_buffer: ContextVar[Optional[Dict[str, List[Dict[str, Any]]]]] = ContextVar("taskup_db_write_buffer", default=None)
+
+
+def _insert_later(table: str, data: Dict[str, Any]) -> None:
+    pending = _write_buffer.get()
+    if pending is None:
+        insert(table, data)
+    else:
+        pending.setdefault(table, []).append(data)
+
+
+def flush_writes(pending: Dict[str, List[Dict[str, Any]]]) -> None:
+    for table, rows in pending.items():
+        try:
+            insert_many(table, rows)
+        except Exception:
+            # Audit/notification rows must not fail a request that already succeeded.
+            logger.exception("Buffered insert of %d %s rows failed", len(rows), table)
+    pending.clear()
+
+
+@contextmanager
+def buffered_writes() -> Iterator[Dict[str, List[Dict[str, Any]]]]:
+    """Defer _insert_later writes until the block exits, then flush them per table."""
+    pending: Dict[str, List[Dict[str, Any]]] = {}
+    token = _write_buffer.set(pending)
+    try:
+        yield pending
+    finally:
+        _write_buffer.reset(token)
+        flush_writes(pending)
+
+
+class BufferedWritesMiddleware:
+    """Pure ASGI: one write buffer per HTTP request, flushed after the response is sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        pending: Dict[str, List[Dict[str, Any]]] = {}
+        token = _write_buffer.set(pending)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _write_buffer.reset(token)
+            if pending:
+                await run_sync(flush_writes, pending)
+
+
+def _logic_tree(parsed: List[tuple]) -> str:
+    """Parsed filters as PostgREST logic-tree conditions (the body of or=(...) / and(...))."""
+    parts = []
+    for column, op, value in parsed:
+        if op == "or":
+            parts.append(f"or({_or_body(value)})")
+        elif op in ("in", "nin"):
+            listed = ",".join(_quote(v) for v in value)
+            parts.append(f"{column}.{'not.in' if op == 'nin' else 'in'}.({listed})")
+        else:
+            parts.append(f"{column}.{op}.{_quote(value)}")
+    return ",".join(parts)
+
+
+def _or_body(alternatives: List[List[tuple]]) -> str:
+    return ",".join(_logic_tree(alt) if len(alt) == 1 else f"and({_logic_tree(alt)})" for alt in alternatives)
+
+
+def select(
+    table: str,
+    filters: Dict[str, Any] | None = None,
+    jwt: Optional[str] = None,
+    *,
+    columns: Any = "*",
+    order_by: Optional[str] = None,
+    desc: bool = False,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    after: Optional[tuple] = None,
+    count: Optional[str] = None,
+) -> Rows:
+    """
+    Rows of `table` matching `filters` (see _FILTER_OPS), evaluated by PostgREST
+    or the in-memory store. `columns` is "a,b" or a list. Pages are either
+    limit/offset or keyset: `after=(order_by value, id)` of the previous page's
+    last row, with rows ordered by (order_by, id). `count` ("exact", "planned"
+    or "estimated") fills Rows.count with the total before paging.
+    """
+    if after is not None and not order_by:
+        raise ValueError("keyset pagination (after=) needs order_by")
+    client = _client(jwt)
+    if not client:
+        return _mem_select(table, filters, columns, order_by, desc, limit, offset, after, count)
+    query = client.table(table).select(_columns(columns), count=count)
+    for column, op, value in _parse_filters(filters):
+        if op == "in":
+            query = query.in_(column, list(value))
+        elif op == "nin":
+            query = query.not_.in_(column, list(value))
+        elif op == "or":
+            query = query.or_(_or_body(value))
+        else:
+            query = getattr(query, op)(column, value)
+    if order_by:
+        if after is not None:
+            cmp = "lt" if desc else "gt"
+            value, row_id = _quote(after[0]), _quote(after[1])
+            query = query.or_(f"{order_by}.{cmp}.{value},and({order_by}.eq.{value},id.{cmp}.{row_id})")
+        query = query.order(order_by, desc=desc).order("id", desc=desc)
+    if limit is not None:
+        query = query.limit(limit)
+    if offset:
+        query = query.offset(offset)
+    res = query.execute()
+    return Rows(res.data or [], count=res.count)
+
+
+def count_rows(table: str, filters: Dict[str, Any] | None = None, jwt: Optional[str] = None, mode: str = "exact") -> int:
+    return select(table, filters, jwt=jwt, columns="id", limit=0, count=mode).count or 0
+
+
 def update(table: str, filters: Dict[str, Any], data: Dict[str, Any], jwt: Optional[str] = None) -> List[Dict[str, Any]]:
     client = _client(jwt)
     if not client:
@@ -144,11 +539,11 @@ def create_user_profile(payload: Dict[str, Any], jwt: Optional[str] = None) -> O
 
 def log_device_fingerprint(user_id: str, ip: str, fingerprint: Optional[str] = None):
     payload = {"user_id": user_id, "ip_address": ip, "fingerprint": fingerprint or f"ip:{ip}"}
-    insert("device_fingerprints", payload)
+    _insert_later("device_fingerprints", payload)
 
 
 def log_admin_action(admin_id: str, action: str, entity: str, entity_id: Optional[str], metadata: Optional[Dict[str, Any]] = None):
-    insert(
+    _insert_later(
         "admin_logs",
         {
             "admin_id": admin_id,
@@ -170,20 +565,18 @@ def get_task(task_id: str, jwt: Optional[str] = None) -> Optional[Dict[str, Any]
     return tasks[0] if tasks else None
 
 
-def list_tasks_for_user(user_id: str, role: str, jwt: Optional[str] = None) -> List[Dict[str, Any]]:
-    client = _client(jwt)
-    if not client:
-        if role == "tasker":
-            return [t for t in _mem_select("tasks") if t.get("status") not in ("completed", "payment_released")]
-        return _mem_select("tasks", {"client_id": user_id})
+TASKER_BROWSABLE_STATUSES = ("new", "offers_incoming")
 
-    query = client.table("tasks").select("*")
+
+def list_tasks_for_user(
+    user_id: str, role: str, jwt: Optional[str] = None, limit: Optional[int] = None, offset: int = 0
+) -> List[Dict[str, Any]]:
     if role == "tasker":
-        query = query.neq("status", "completed")
+        # Taskers browse tasks still taking offers, plus the ones assigned to them.
+        filters = {"or": [{"status": list(TASKER_BROWSABLE_STATUSES)}, {"assigned_tasker_id": user_id}]}
     else:
-        query = query.eq("client_id", user_id)
-    res = query.execute()
-    return res.data or []
+        filters = {"client_id": user_id}
+    return select("tasks", filters, jwt=jwt, order_by="created_at", desc=True, limit=limit, offset=offset)
 
 
 def update_task_status(task_id: str, status: str, jwt: Optional[str] = None) -> Optional[Dict[str, Any]]:
@@ -200,10 +593,20 @@ def list_offers_for_task(task_id: str, jwt: Optional[str] = None) -> List[Dict[s
     return select("offers", {"task_id": task_id}, jwt=jwt)
 
 
-def list_offers_for_user(user_id: str, role: str, jwt: Optional[str] = None) -> List[Dict[str, Any]]:
+def list_offers_for_user(
+    user_id: str, role: str, jwt: Optional[str] = None, limit: Optional[int] = None, offset: int = 0
+) -> List[Dict[str, Any]]:
     if role == "tasker":
-        return select("offers", {"tasker_id": user_id}, jwt=jwt)
-    return select("offers", {}, jwt=jwt)
+        filters: Dict[str, Any] = {"tasker_id": user_id}
+    elif role in {"admin", "support", "moderator"}:
+        filters = {}
+    else:
+        # Clients see the offers on their own tasks.
+        task_ids = [t["id"] for t in select("tasks", {"client_id": user_id}, jwt=jwt, columns="id")]
+        if not task_ids:
+            return []
+        filters = {"task_id": task_ids}
+    return select("offers", filters, jwt=jwt, order_by="created_at", desc=True, limit=limit, offset=offset)
 
 
 def set_offer_status(offer_id: str, status: str, jwt: Optional[str] = None) -> Optional[Dict[str, Any]]:
@@ -252,4 +655,4 @@ def list_disputes_for_user(user_id: str, role: str, jwt: Optional[str] = None) -
 
 
 def record_notification(user_id: str, type_: str, payload: Dict[str, Any]):
-    insert("notifications", {"user_id": user_id, "type": type_, "payload": payload})
+    _insert_later("notifications", {"user_id": user_id, "type": type_, "payload": payload})
@@ -0,0 +1,346 @@
+"""
+Idempotency-Key support for mutating requests (POST/PUT/PATCH/DELETE).
+
+Mobile clients retry writes on flaky networks. A request sent with an
+`Idempotency-Key` header runs at most once per caller, method, path and key
+within the TTL (TASKUP_IDEMPOTENCY_TTL, default 24h). Retries get the stored
+status and body back with `Idempotent-Replayed: true`, and the handler's
+notification, fingerprint and audit writes don't run again.
+
+  - The outcome is kept in `idempotency_keys`, which all workers share, with
+    an in-process LRU in front so hot replays skip the database.
+  - A duplicate that arrives while the first request is still running on this
+    worker waits for it and gets the same response. A duplicate on another
+    worker gets 409 IDEMPOTENCY_IN_PROGRESS (retryable).
+  - Reusing a key with a different body or query string is a 422
+    IDEMPOTENCY_KEY_REUSED.
+  - Only 2xx responses and the handler's own 4xx outcomes are stored.
+    401/403/409/429 and 5xx responses (auth, rate limiting, conflicts,
+    failures) and exceptions drop the claim, so the key can be retried.
+  - A claim whose request never completed (worker crash) is taken over by
+    the next retry once its lease (TASKUP_IDEMPOTENCY_LEASE, default 60s)
+    has run out.
+
+Keys are scoped to the bearer token's subject. The token is verified before
+any lookup, and an invalid token gets the same 401 the route would return.
+Requests without a token share one anonymous scope.
+"""
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, MutableMapping, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from .database import get_db
+from .errors import TaskUpError, conflict_error, correlation_id_from_request, error_response_from_taskup_error, validation_error
+from .models import IdempotencyKey
+from .security import decode_token
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+UNSAFE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+MAX_KEY_LENGTH = 255
+MAX_STORED_BODY = 256 * 1024
+LRU_SIZE = 2048
+PURGE_EVERY = 500
+# Outcomes that depend on when or with which credentials the request was sent, not on its body.
+UNSTORED_STATUSES = frozenset({401, 403, 409, 429})
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    request_hash: str
+    status_code: int
+    content_type: Optional[str]
+    body: bytes
+    expires_at: datetime
+
+
+class _LRU:
+    def __init__(self, size: int):
+        self.size = size
+        self._items: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: datetime) -> Optional[StoredResponse]:
+        with self._lock:
+            stored = self._items.get(key)
+            if stored is None:
+                return None
+            if stored.expires_at <= now:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return stored
+
+    def put(self, key: str, stored: StoredResponse) -> None:
+        with self._lock:
+            self._items[key] = stored
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+def _claim(
+    session: Session, key: str, request_hash: str, now: datetime, expires_at: datetime, lease: timedelta
+) -> Tuple[str, Optional[StoredResponse]]:
+    """
+    Insert an in-flight row for `key`. Returns ("claimed", None), ("replay",
+    stored), ("in_progress", None) or ("mismatch", None).
+    """
+    for _ in range(2):
+        row = session.get(IdempotencyKey, key, populate_existing=True)
+        if row is not None and row.expires_at <= now:
+            session.delete(row)
+            session.commit()
+            row = None
+        if row is None:
+            session.add(IdempotencyKey(key=key, request_hash=request_hash, created_at=now, claimed_at=now, expires_at=expires_at))
+            try:
+                session.commit()
+                return "claimed", None
+            except IntegrityError:
+                # Another worker claimed it between the read and the insert.
+                session.rollback()
+                continue
+        if row.request_hash != request_hash:
+            return "mismatch", None
+        if row.status_code is None:
+            if row.claimed_at + lease > now:
+                return "in_progress", None
+            # The previous claimer died; take over its lease, unless another retry just did.
+            taken = (
+                session.query(IdempotencyKey)
+                .filter(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None), IdempotencyKey.claimed_at == row.claimed_at)
+                .update({"claimed_at": now, "expires_at": expires_at}, synchronize_session=False)
+            )
+            session.commit()
+            return ("claimed", None) if taken else ("in_progress", None)
+        return "replay", StoredResponse(row.request_hash, row.status_code, row.content_type, row.body or b"", row.expires_at)
+    return "in_progress", None
+
+
+def _complete(session: Session, key: str, stored: Optional[StoredResponse]) -> None:
+    """Store the outcome, or drop the claim (stored=None) so the key can be retried."""
+    row = session.get(IdempotencyKey, key, populate_existing=True)
+    if row is None:
+        return
+    if stored is None:
+        session.delete(row)
+    else:
+        row.status_code = stored.status_code
+        row.content_type = stored.content_type
+        row.body = stored.body
+    session.commit()
+
+
+def purge_expired(session: Session, now: Optional[datetime] = None) -> int:
+    deleted = session.query(IdempotencyKey).filter(IdempotencyKey.expires_at <= (now or datetime.utcnow())).delete(synchronize_session=False)
+    session.commit()
+    return deleted
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI: see module docstring."""
+
+    def __init__(self, app: ASGIApp, ttl_seconds: float, lease_seconds: float = 60.0, lru_size: int = LRU_SIZE):
+        self.app = app
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.lease = timedelta(seconds=lease_seconds)
+        self.cache = _LRU(lru_size)
+        self._inflight: Dict[str, "asyncio.Future[Optional[StoredResponse]]"] = {}
+        self._claims = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("method") not in UNSAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers", []))
+        raw_key = headers.get(HEADER)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+
+        client_key = raw_key.decode("latin-1").strip()
+        if not client_key or len(client_key) > MAX_KEY_LENGTH:
+            await self._error(scope, receive, send, validation_error({"Idempotency-Key": [f"Must be 1-{MAX_KEY_LENGTH} characters"]}))
+            return
+
+        caller = _verified_caller(headers.get(b"authorization", b"").decode("latin-1"))
+        if caller is None:
+            await self._error(scope, receive, send, TaskUpError(code="HTTP_401", message="Invalid token", type="internal", http_status=401))
+            return
+
+        body = await _read_body(receive)
+        key = hashlib.sha256("\n".join((caller, scope["method"], scope["path"], client_key)).encode()).hexdigest()
+        # Several endpoints take their inputs as query parameters, so they count as part of the request.
+        request_hash = hashlib.sha256(scope.get("query_string", b"") + b"\n" + body).hexdigest()
+        replay_receive = _replay_receive(body, receive)
+
+        now = datetime.utcnow()
+        stored = self.cache.get(key, now)
+        if stored is None and key in self._inflight:
+            stored = await asyncio.shield(self._inflight[key])
+        if stored is not None:
+            await self._replay(scope, replay_receive, send, stored, request_hash)
+            return
+
+        future: "asyncio.Future[Optional[StoredResponse]]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            state, stored = await self._db(scope, _claim, key, request_hash, now, now + self.ttl, self.lease)
+            if state == "replay":
+                self.cache.put(key, stored)
+                future.set_result(stored)
+                await self._replay(scope, replay_receive, send, stored, request_hash)
+                return
+            if state == "mismatch":
+                future.set_result(None)
+                await self._error(scope, replay_receive, send, _key_reused())
+                return
+            if state == "in_progress":
+                future.set_result(None)
+                err = conflict_error("IDEMPOTENCY_IN_PROGRESS", "A request with this Idempotency-Key is still being processed")
+                err.retryable = True
+                await self._error(scope, replay_receive, send, err)
+                return
+
+            stored = None
+            try:
+                stored = await self._run(scope, replay_receive, send, request_hash, now + self.ttl)
+            finally:
+                if stored is not None:
+                    self.cache.put(key, stored)
+                await self._db(scope, _complete, key, stored)
+                future.set_result(stored)
+                await self._maybe_purge(scope)
+        finally:
+            if not future.done():
+                future.set_result(None)
+            self._inflight.pop(key, None)
+
+    async def _run(self, scope: Scope, receive: Receive, send: Send, request_hash: str, expires_at: datetime) -> Optional[StoredResponse]:
+        status = 500
+        content_type: Optional[str] = None
+        chunks: List[bytes] = []
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, content_type, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size <= MAX_STORED_BODY:
+                    chunks.append(chunk)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+        if not _storable(status) or size > MAX_STORED_BODY:
+            return None
+        return StoredResponse(request_hash, status, content_type, b"".join(chunks), expires_at)
+
+    async def _replay(self, scope: Scope, receive: Receive, send: Send, stored: StoredResponse, request_hash: str) -> None:
+        if stored.request_hash != request_hash:
+            await self._error(scope, receive, send, _key_reused())
+            return
+        headers = [(b"content-length", str(len(stored.body)).encode()), (REPLAYED_HEADER, b"true")]
+        if stored.content_type:
+            headers.append((b"content-type", stored.content_type.encode("latin-1")))
+        await send({"type": "http.response.start", "status": stored.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": stored.body})
+
+    async def _error(self, scope: Scope, receive: Receive, send: Send, err: TaskUpError) -> None:
+        response = error_response_from_taskup_error(err, correlation_id_from_request(Request(scope)))
+        await response(scope, receive, send)
+
+    async def _db(self, scope: Scope, fn: Callable[..., Any], *args: Any) -> Any:
+        # Same session source as the routes, so dependency overrides (tests) apply.
+        app = scope.get("app")
+        provider = getattr(app, "dependency_overrides", {}).get(get_db, get_db)
+
+        def call() -> Any:
+            sessions = provider()
+            session = next(sessions)
+            try:
+                return fn(session, *args)
+            finally:
+                sessions.close()
+
+        return await run_in_threadpool(call)
+
+    async def _maybe_purge(self, scope: Scope) -> None:
+        self._claims += 1
+        if self._claims % PURGE_EVERY == 0:
+            await self._db(scope, purge_expired)
+
+
+def _storable(status: int) -> bool:
+    return 200 <= status < 300 or (400 <= status < 500 and status not in UNSTORED_STATUSES)
+
+
+def _verified_caller(authorization: str) -> Optional[str]:
+    """Subject of a valid bearer token, "" without one, None when the token is invalid."""
+    if not authorization.lower().startswith("bearer "):
+        return ""
+    try:
+        payload = decode_token(authorization.split(" ", 1)[1])
+    except HTTPException:
+        return None
+    return str(payload.get("sub") or payload.get("user_id") or "")
+
+
+def _key_reused() -> TaskUpError:
+    return TaskUpError(
+        code="IDEMPOTENCY_KEY_REUSED",
+        message="Idempotency-Key was already used with a different request body",
+        type="validation",
+        http_status=422,
+    )
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def _replay_receive(body: bytes, receive: Receive) -> Receive:
+    sent = False
+
+    async def wrapped() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return wrapped
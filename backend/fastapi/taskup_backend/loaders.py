@@ -0,0 +1,69 @@
+"""
+Per-request batched lookups by key (dataloader-style) for User, Wallet (by
+user_id) and Payment (by offer_id).
+
+`get_many(keys)` fetches every key not cached yet in one `WHERE key IN (...)`
+query. Results, misses included, are cached for the rest of the request, so
+code further down (e.g. payments_service) that asks for a row the handler
+already loaded doesn't go back to the database. Rows loaded some other way
+(joins) are handed over with `add`.
+"""
+from typing import Any, Dict, Generic, Iterable, List, Optional, Type, TypeVar
+
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from .database import get_db
+from .models import Payment, User, Wallet
+
+M = TypeVar("M")
+
+_MISSING = object()
+
+
+class Loader(Generic[M]):
+    def __init__(self, session: Session, model: Type[M], key: str = "id"):
+        self.session = session
+        self.model = model
+        self.key = key
+        self.queries = 0
+        self._cache: Dict[Any, Optional[M]] = {}
+
+    def add(self, *rows: Optional[M]) -> None:
+        for row in rows:
+            if row is not None:
+                self._cache[getattr(row, self.key)] = row
+
+    def get(self, key: Any) -> Optional[M]:
+        if key is None:
+            return None
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[Any]) -> Dict[Any, M]:
+        keys = [k for k in dict.fromkeys(keys) if k is not None]
+        self._fetch([k for k in keys if k not in self._cache])
+        return {k: row for k in keys if (row := self._cache.get(k, _MISSING)) not in (None, _MISSING)}
+
+    def _fetch(self, keys: List[Any]) -> None:
+        if not keys:
+            return
+        column = getattr(self.model, self.key)
+        rows = self.session.query(self.model).filter(column.in_(keys)).all()
+        self.queries += 1
+        for key in keys:
+            self._cache[key] = None
+        self.add(*rows)
+
+
+class Loaders:
+    """One loader per model, sharing the request's session."""
+
+    def __init__(self, session: Session):
+        self.users: Loader[User] = Loader(session, User)
+        self.payments: Loader[Payment] = Loader(session, Payment, key="offer_id")
+        self.wallets: Loader[Wallet] = Loader(session, Wallet, key="user_id")
+
+
+def get_loaders(db: Session = Depends(get_db)) -> Loaders:
+    """FastAPI caches dependencies per request, so every Depends(get_loaders) in a request shares one set."""
+    return Loaders(db)
@@ -1,10 +1,150 @@
+import atexit
+import copy
 import json
 import logging
-from typing import Any, Dict, Optional
+import logging.handlers
+import queue
+import sys
+from typing import Any, Callable, Dict, Optional, Union
 from fastapi import Request, Response
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson optional
+    orjson = None
+
 logger = logging.getLogger("taskup")
 
+ExtraPayload = Union[Dict[str, Any], Callable[[], Dict[str, Any]]]
+
+_queue_handler: Optional["DroppingQueueHandler"] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# LogRecord attributes that are not user-supplied `extra` fields.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "payload"}
+
+
+def dumps(payload: Dict[str, Any]) -> str:
+    """Serialize a log payload; uses orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str).decode()
+    return json.dumps(payload, default=str)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line. log_event payloads are emitted as-is; plain
+    records get their message plus any `extra` fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = getattr(record, "payload", None)
+        data: Dict[str, Any] = dict(payload) if payload else {"message": record.getMessage()}
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                data.setdefault(key, value)
+        data.setdefault("level", record.levelname)
+        data.setdefault("logger", record.name)
+        data.setdefault("ts", record.created)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        return dumps(data)
+
+
+class _PayloadText:
+    """A log_event payload rendered as JSON only if a handler asks for the message text."""
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+
+    def __str__(self) -> str:
+        return dumps(self.payload)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Non-blocking QueueHandler: when the bounded queue is full the record is
+    dropped and counted instead of stalling the request.
+    """
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread; only freeze what can't travel.
+        # Work on a copy: the record still propagates to the root handlers.
+        record = copy.copy(record)
+        payload = getattr(record, "payload", None)
+        if payload is not None:
+            # JsonFormatter emits the payload itself; don't build the text message.
+            record.msg = payload.get("action", record.msg)
+            record.args = None
+        elif record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Resolves sys.stdout at emit time so redirected/captured streams are honoured."""
+
+    def __init__(self, level: int = logging.NOTSET):
+        logging.Handler.__init__(self, level)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+
+def configure_logging(level: Union[int, str] = logging.INFO, queue_size: int = 10000, handler: Optional[logging.Handler] = None) -> None:
+    """
+    Route the `taskup` logger through a bounded queue drained by a background
+    writer thread. Idempotent; later calls only adjust the level. Records
+    still propagate, so root handlers (and pytest's caplog) see them too.
+    """
+    global _queue_handler, _listener
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if _listener is not None:
+        return
+    sink = handler or _StdoutHandler()
+    sink.setFormatter(JsonFormatter())
+    q: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = DroppingQueueHandler(q)
+    _listener = logging.handlers.QueueListener(q, sink, respect_handler_level=True)
+    _listener.start()
+    logger.addHandler(_queue_handler)
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    logger.removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
+
+
+def dropped_log_records() -> int:
+    """Records discarded because the log queue was full."""
+    return _queue_handler.dropped if _queue_handler else 0
+
 
 def log_event(
     *,
@@ -13,12 +153,19 @@ def log_event(
     user_id: Optional[str] = None,
     action: str,
     level: int = logging.INFO,
-    extra: Optional[Dict[str, Any]] = None,
+    extra: Optional[ExtraPayload] = None,
 ) -> None:
     """
     Emit a structured log for important events (payments, disputes, admin actions).
     Includes correlation_id if present on request.state.
+    Nothing is built when the level is disabled; `extra` may be a callable for
+    payloads that are costly to compute. The message is "<action> <payload
+    JSON>" for plain handlers; JsonFormatter emits the payload fields instead.
     """
+    if not logger.isEnabledFor(level):
+        return
+    if callable(extra):
+        extra = extra()
     payload: Dict[str, Any] = extra.copy() if extra else {}
     if request:
         payload.setdefault("path", request.url.path)
@@ -31,4 +178,4 @@ def log_event(
     if user_id:
         payload.setdefault("user_id", user_id)
     payload["action"] = action
-    logger.log(level, json.dumps(payload))
+    logger.log(level, "%s %s", action, _PayloadText(payload), extra={"payload": payload})
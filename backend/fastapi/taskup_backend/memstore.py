@@ -0,0 +1,229 @@
+"""
+In-memory tables behind the offline fallback in db.py (local dev, demos and
+load tests with large seeded datasets).
+
+Each table keeps rows in a primary-key dict plus hash indexes on the columns
+the helpers filter by (INDEXED_COLUMNS). An index is built on the first
+lookup by its column and then maintained on insert/update/delete, so
+equality lookups touch only the matching rows instead of scanning the table.
+Rows come back in insertion order, as with the old list-based store.
+
+Set TASKUP_MEM_SNAPSHOT to a file path to load the store from it at start-up
+and write it back (atomically) at exit or on save_snapshot().
+"""
+import atexit
+import logging
+import os
+import pickle
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from uuid import uuid4
+
+logger = logging.getLogger("taskup.memstore")
+
+INDEXED_COLUMNS = frozenset({"task_id", "client_id", "tasker_id", "user_id", "email"})
+SNAPSHOT_PATH = os.getenv("TASKUP_MEM_SNAPSHOT")
+
+
+# Filter values of these types mean IN, as in the repository Filters.
+_MULTI = (list, tuple, set, frozenset)
+
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _matches(value: Any, wanted: Any) -> bool:
+    return value in wanted if isinstance(wanted, _MULTI) else value == wanted
+
+
+class MemTable:
+    """
+    Rows of one table keyed by `id`, with lazily built secondary indexes.
+    Filters are {column: value} (equality) or {column: [values]} (IN).
+    """
+
+    def __init__(self, rows: Iterable[Dict[str, Any]] = ()):
+        self._rows: Dict[Any, Dict[str, Any]] = {}
+        self._seq: Dict[Any, int] = {}
+        self._next_seq = 0
+        # column -> value -> ids (dict used as an ordered set)
+        self._indexes: Dict[str, Dict[Any, Dict[Any, None]]] = {}
+        self._lock = threading.RLock()
+        for row in rows:
+            self.insert(row)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(list(self._rows.values()))
+
+    def append(self, row: Dict[str, Any]) -> None:
+        self.insert(row)
+
+    def _index(self, column: str) -> Dict[Any, Dict[Any, None]]:
+        index = self._indexes.get(column)
+        if index is None:
+            index = {}
+            for row_id, row in self._rows.items():
+                self._index_add(index, row.get(column), row_id)
+            self._indexes[column] = index
+        return index
+
+    @staticmethod
+    def _index_add(index: Dict[Any, Dict[Any, None]], value: Any, row_id: Any) -> None:
+        if _hashable(value):
+            index.setdefault(value, {})[row_id] = None
+
+    @staticmethod
+    def _index_remove(index: Dict[Any, Dict[Any, None]], value: Any, row_id: Any) -> None:
+        if not _hashable(value):
+            return
+        bucket = index.get(value)
+        if bucket is not None:
+            bucket.pop(row_id, None)
+            if not bucket:
+                del index[value]
+
+    def _lookup(self, column: str, value: Any) -> Optional[Iterable[Any]]:
+        values = value if isinstance(value, _MULTI) else (value,)
+        if not all(_hashable(v) for v in values):
+            return None
+        if column == "id":
+            return [v for v in values if v in self._rows]
+        index = self._index(column)
+        if len(values) == 1:
+            return index.get(values[0], {})
+        return {row_id: None for v in values for row_id in index.get(v, {})}
+
+    def _candidates(self, filters: Dict[str, Any]) -> Optional[List[Any]]:
+        """Ids that may match `filters`, or None when no index applies (full scan)."""
+        best: Optional[Iterable[Any]] = None
+        for column in INDEXED_COLUMNS.union({"id"}).intersection(filters):
+            ids = self._lookup(column, filters[column])
+            if ids is not None and (best is None or len(ids) < len(best)):
+                best = ids
+        if best is None:
+            return None
+        return sorted(best, key=self._seq.__getitem__)
+
+    def _match(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        ids = self._candidates(filters)
+        rows = self._rows.values() if ids is None else (self._rows[i] for i in ids)
+        return [r for r in rows if all(_matches(r.get(k), v) for k, v in filters.items())]
+
+    def select(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            if not filters:
+                return list(self._rows.values())
+            return self._match(filters)
+
+    def insert(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        row = data.copy()
+        if "id" not in row:
+            row["id"] = str(uuid4())
+        with self._lock:
+            row_id = row["id"]
+            if row_id in self._rows:
+                self._remove(row_id)
+            self._rows[row_id] = row
+            self._seq[row_id] = self._next_seq
+            self._next_seq += 1
+            for column, index in self._indexes.items():
+                self._index_add(index, row.get(column), row_id)
+        return row
+
+    def upsert(self, data: Dict[str, Any], on_conflict: Iterable[str] = ("id",), ignore_duplicates: bool = False) -> Optional[Dict[str, Any]]:
+        """Merge `data` into the row with the same `on_conflict` values, or insert it; None when skipped."""
+        with self._lock:
+            key = {c: data.get(c) for c in on_conflict}
+            existing = self._match(key) if all(v is not None for v in key.values()) else []
+            if not existing:
+                return self.insert(data)
+            if ignore_duplicates:
+                return None
+            return self.update({"id": existing[0]["id"]}, data)[0]
+
+    def _remove(self, row_id: Any) -> Dict[str, Any]:
+        row = self._rows.pop(row_id)
+        self._seq.pop(row_id, None)
+        for column, index in self._indexes.items():
+            self._index_remove(index, row.get(column), row_id)
+        return row
+
+    def update(self, filters: Dict[str, Any], data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        updated: List[Dict[str, Any]] = []
+        with self._lock:
+            for old in self._match(filters):
+                row_id = old["id"]
+                new = {**old, **data}
+                if new["id"] != row_id:
+                    seq = self._seq[row_id]
+                    self._remove(row_id)
+                    self.insert(new)
+                    self._seq[new["id"]] = seq
+                else:
+                    self._rows[row_id] = new
+                    for column, index in self._indexes.items():
+                        if old.get(column) != new.get(column):
+                            self._index_remove(index, old.get(column), row_id)
+                            self._index_add(index, new.get(column), row_id)
+                updated.append(new)
+        return updated
+
+    def delete(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._remove(r["id"]) for r in self._match(filters)]
+
+
+class MemStore(dict):
+    """table name -> MemTable; assigning a plain list of rows wraps it in a MemTable."""
+
+    def __init__(self, tables: Iterable[str] = ()):
+        super().__init__((name, MemTable()) for name in tables)
+
+    def __setitem__(self, table: str, rows: Any) -> None:
+        super().__setitem__(table, rows if isinstance(rows, MemTable) else MemTable(rows))
+
+    def table(self, name: str) -> MemTable:
+        if name not in self:
+            self[name] = MemTable()
+        return dict.__getitem__(self, name)
+
+    def save_snapshot(self, path: Optional[str] = None) -> None:
+        path = path or SNAPSHOT_PATH
+        if not path:
+            return
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as fh:
+            # Plain rows only; indexes are rebuilt lazily after loading.
+            pickle.dump({name: table.select() for name, table in self.items()}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def load_snapshot(self, path: Optional[str] = None) -> bool:
+        path = path or SNAPSHOT_PATH
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as fh:
+                tables = pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as exc:
+            logger.warning("Ignoring unreadable in-memory snapshot %s: %s", path, exc)
+            return False
+        for name, rows in tables.items():
+            self[name] = rows
+        return True
+
+
+def open_store(tables: Iterable[str]) -> MemStore:
+    """Build the store, restoring from TASKUP_MEM_SNAPSHOT when it is set."""
+    store = MemStore(tables)
+    if SNAPSHOT_PATH:
+        store.load_snapshot()
+        atexit.register(store.save_snapshot)
+    return store
@@ -1,10 +1,448 @@
-import logging
+"""
+In-process metrics registry (counters, gauges, histograms) with Prometheus
+text exposition.
 
-logger = logging.getLogger("taskup")
+Updates are lock-free on the hot path: every thread writes into its own shard
+and shards are merged only at scrape time. When TASKUP_METRICS_DIR is set each
+worker also snapshots its totals to <dir>/metrics-<pid>.json, and a scrape on
+any worker merges every worker's snapshot (clear the directory on deploy).
+Snapshots of workers that have exited (pid gone; the directory is per host)
+are folded into <dir>/metrics-archive.json on the next scrape: their counters
+and histograms keep counting towards the totals, their gauges are dropped.
+"""
+import fcntl
+import glob
+import json
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .db import pool_stats
+from .logging_utils import dropped_log_records
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_MULTIPROC_DIR = os.getenv("TASKUP_METRICS_DIR")
+_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("TASKUP_METRICS_SNAPSHOT_INTERVAL", "5"))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+        (registry or REGISTRY).register(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            # Taken once per thread, never on the update path.
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        try:
+            return tuple(str(labels[n]) for n in self.labelnames)
+        except KeyError as exc:
+            raise ValueError(f"{self.name} missing label {exc}") from None
+
+    def labels(self, **labels: str) -> "_Child":
+        return _Child(self, self._key(labels))
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        """Read the (unlabelled) value from `fn` at scrape time."""
+        if self.labelnames:
+            raise ValueError("set_function is only supported on unlabelled metrics")
+        self._function = fn
+
+    def collect(self) -> Dict[LabelValues, object]:
+        raise NotImplementedError
+
+
+class _Child:
+    __slots__ = ("_metric", "_key")
+
+    def __init__(self, metric: _Metric, key: LabelValues):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._metric._inc(self._key, amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._metric._inc(self._key, -amount)
+
+    def set(self, value: float) -> None:
+        self._metric._set(self._key, value)
+
+    def observe(self, value: float) -> None:
+        self._metric._observe(self._key, value)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._inc((), amount)
+
+    def _inc(self, key: LabelValues, amount: float) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        shard = self._shard()
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def collect(self) -> Dict[LabelValues, float]:
+        if self._function is not None:
+            return {(): float(self._function())}
+        totals: Dict[LabelValues, float] = {}
+        for shard in list(self._shards):
+            for key, value in list(shard.items()):
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+
+class Gauge(_Metric):
+    """
+    Gauges keep one value per label set (last write wins); `multiprocess_mode`
+    decides how workers are combined: "sum" or "max".
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None, multiprocess_mode: str = "sum"):
+        super().__init__(name, documentation, labelnames, registry)
+        self.multiprocess_mode = multiprocess_mode
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float) -> None:
+        self._set((), value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._inc((), amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._inc((), -amount)
+
+    def _set(self, key: LabelValues, value: float) -> None:
+        self._values[key] = float(value)
+
+    def _inc(self, key: LabelValues, amount: float) -> None:
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> Dict[LabelValues, float]:
+        if self._function is not None:
+            return {(): float(self._function())}
+        return dict(self._values)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        upper = sorted(float(b) for b in buckets)
+        if not upper or upper[-1] != math.inf:
+            upper.append(math.inf)
+        self.buckets = tuple(upper)
+
+    def observe(self, value: float) -> None:
+        self._observe((), value)
+
+    def _observe(self, key: LabelValues, value: float) -> None:
+        shard = self._shard()
+        entry = shard.get(key)
+        if entry is None:
+            # [per-bucket counts (non-cumulative)..., sum, count]
+            entry = [0] * len(self.buckets) + [0.0, 0]
+            shard[key] = entry
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    def collect(self) -> Dict[LabelValues, list]:
+        totals: Dict[LabelValues, list] = {}
+        for shard in list(self._shards):
+            for key, entry in list(shard.items()):
+                acc = totals.get(key)
+                if acc is None:
+                    totals[key] = list(entry)
+                else:
+                    for i, v in enumerate(entry):
+                        acc[i] += v
+        return totals
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {
+            name: {"samples": [[list(key), value] for key, value in metric.collect().items()]}
+            for name, metric in self._metrics.items()
+        }
+
+    def render(self, snapshots: Optional[List[Dict[str, dict]]] = None) -> str:
+        """Prometheus text format, merging `snapshots` from other workers if given."""
+        lines: List[str] = []
+        for name, metric in self._metrics.items():
+            if snapshots is None:
+                samples = metric.collect()
+            else:
+                samples = _merge(metric, [s.get(name, {}).get("samples", []) for s in snapshots])
+            lines.append(f"# HELP {name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+            for key, value in sorted(samples.items()):
+                labels = list(zip(metric.labelnames, key))
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets, value):
+                        cumulative += count
+                        le = "+Inf" if bound == math.inf else _format_value(bound)
+                        lines.append(f"{name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-2])}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {value[-1]}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge(metric: _Metric, per_worker: List[list]) -> Dict[LabelValues, object]:
+    merged: Dict[LabelValues, object] = {}
+    for samples in per_worker:
+        for key, value in samples:
+            key = tuple(key)
+            current = merged.get(key)
+            if current is None:
+                merged[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(metric, Histogram):
+                for i, v in enumerate(value):
+                    current[i] += v
+            elif isinstance(metric, Gauge) and metric.multiprocess_mode == "max":
+                merged[key] = max(current, value)
+            else:
+                merged[key] = current + value
+    return merged
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return f"{value:.1f}"
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+
+
+# Multiprocess support
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(_MULTIPROC_DIR or "", f"metrics-{pid}.json")
+
+
+def write_snapshot() -> None:
+    """Persist this worker's totals for cross-worker scrapes (no-op without TASKUP_METRICS_DIR)."""
+    if not _MULTIPROC_DIR:
+        return
+    os.makedirs(_MULTIPROC_DIR, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(REGISTRY.snapshot(), fh)
+    os.replace(tmp, path)
+
+
+def _snapshot_loop() -> None:
+    while True:
+        time.sleep(_SNAPSHOT_INTERVAL_SECONDS)
+        try:
+            write_snapshot()
+        except OSError:
+            pass
+
+
+_snapshot_thread: Optional[threading.Thread] = None
+
+
+def start_snapshot_writer() -> None:
+    """Start the background snapshot thread once per worker when multiprocess mode is on."""
+    global _snapshot_thread
+    if not _MULTIPROC_DIR or (_snapshot_thread and _snapshot_thread.is_alive()):
+        return
+    _snapshot_thread = threading.Thread(target=_snapshot_loop, name="taskup-metrics-snapshot", daemon=True)
+    _snapshot_thread.start()
+
+
+_SNAPSHOT_PID = re.compile(r"metrics-(\d+)\.json$")
+_ARCHIVE_NAME = "metrics-archive.json"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_snapshot(path: str) -> Optional[Dict[str, dict]]:
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _archive_dead_workers(directory: str, registry: Registry) -> None:
+    """Fold counters and histograms of exited workers into the archive snapshot and delete their files."""
+    dead = [
+        path
+        for path in glob.glob(os.path.join(directory, "metrics-*.json"))
+        if (m := _SNAPSHOT_PID.search(path)) and not _pid_alive(int(m.group(1)))
+    ]
+    if not dead:
+        return
+    archive_path = os.path.join(directory, _ARCHIVE_NAME)
+    with open(os.path.join(directory, ".archive.lock"), "w") as lock:
+        # Scrapes on several workers can find the same dead file; only one folds it in.
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        folded = [snap for snap in map(_read_snapshot, dead) if snap is not None]
+        archive = _read_snapshot(archive_path) or {}
+        merged = {}
+        for name, metric in registry._metrics.items():
+            if isinstance(metric, Gauge):
+                continue
+            samples = _merge(metric, [s.get(name, {}).get("samples", []) for s in [archive, *folded]])
+            if samples:
+                merged[name] = {"samples": [[list(key), value] for key, value in samples.items()]}
+        tmp = f"{archive_path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(merged, fh)
+        os.replace(tmp, archive_path)
+        for path in dead:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def render_prometheus() -> str:
+    if not _MULTIPROC_DIR:
+        return REGISTRY.render()
+    write_snapshot()
+    _archive_dead_workers(_MULTIPROC_DIR, REGISTRY)
+    snapshots = [snap for snap in map(_read_snapshot, glob.glob(os.path.join(_MULTIPROC_DIR, "metrics-*.json"))) if snap is not None]
+    return REGISTRY.render(snapshots)
+
+
+# Application metrics
+
+PAYMENT_EVENTS = Counter("taskup_payment_events_total", "Payment lifecycle events.", ["event", "currency"])
+PAYMENT_AMOUNT = Counter("taskup_payment_amount_cents_total", "Sum of payment amounts in minor units.", ["event", "currency"])
+TRANSACTIONS_LISTED = Histogram(
+    "taskup_transactions_list_size",
+    "Rows returned by the wallet transactions list.",
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+APP_EVENTS = Counter("taskup_events_total", "Application events recorded via record_metric.", ["name"])
+LOG_RECORDS_DROPPED = Counter("taskup_log_records_dropped_total", "Log records dropped because the log queue was full.")
+LOG_RECORDS_DROPPED.set_function(dropped_log_records)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "taskup_http_request_duration_seconds",
+    "Request latency by route template.",
+    ["method", "route", "status"],
+)
+HTTP_DB_QUERIES = Histogram(
+    "taskup_http_db_queries",
+    "DB statements issued per request by route template.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+HTTP_DB_SECONDS = Histogram(
+    "taskup_http_db_seconds",
+    "Time spent in DB statements per request by route template.",
+    ["method", "route"],
+)
+QUERY_BUDGET_EXCEEDED = Counter(
+    "taskup_query_budget_exceeded_total",
+    "Requests that issued more DB statements than the configured budget.",
+    ["method", "route"],
+)
+STALE_WRITES = Counter(
+    "taskup_stale_writes_total",
+    "Optimistic-concurrency conflicts (version mismatch on UPDATE) by outcome.",
+    ["outcome"],
+)
+
+SUPABASE_POOL_CONNECTIONS = Gauge("taskup_supabase_pool_connections", "Open connections in the shared PostgREST pool.")
+SUPABASE_POOL_CONNECTIONS.set_function(lambda: pool_stats()["connections"])
+SUPABASE_POOL_IDLE = Gauge("taskup_supabase_pool_idle_connections", "Idle keep-alive connections in the shared PostgREST pool.")
+SUPABASE_POOL_IDLE.set_function(lambda: pool_stats()["idle_connections"])
+SUPABASE_CALLS_QUEUED = Gauge("taskup_supabase_calls_queued", "Blocking PostgREST calls waiting for a db pool thread.")
+SUPABASE_CALLS_QUEUED.set_function(lambda: pool_stats()["db_calls_queued"])
+SUPABASE_TOKEN_CLIENTS = Gauge("taskup_supabase_token_clients", "Cached per-JWT PostgREST clients.")
+SUPABASE_TOKEN_CLIENTS.set_function(lambda: pool_stats()["token_clients"])
+SUPABASE_TOKEN_CLIENT_MISSES = Counter("taskup_supabase_token_client_misses_total", "Per-JWT PostgREST clients built on a cache miss.")
+SUPABASE_TOKEN_CLIENT_MISSES.set_function(lambda: pool_stats()["token_client_misses"])
+
+_AMOUNT_EVENTS = {"payment.created", "payment.released", "payment.refunded", "payout.request"}
 
 
 def record_metric(name: str, value: float = 1.0, **tags):
     """
-    Lightweight metric hook. Replace with DataDog/Prometheus client in production.
+    Event-style hook used by the routers. Maps known events onto the registry;
+    only `currency` is kept as a label, other tags (ids) are dropped so label
+    sets stay fixed.
     """
-    logger.info(f"metric {name} value={value} tags={tags}")
+    if name == "transactions.list":
+        TRANSACTIONS_LISTED.observe(value)
+    elif name in _AMOUNT_EVENTS:
+        currency = str(tags.get("currency") or "NOK").upper()
+        PAYMENT_EVENTS.labels(event=name, currency=currency).inc()
+        PAYMENT_AMOUNT.labels(event=name, currency=currency).inc(value)
+    else:
+        APP_EVENTS.labels(name=name).inc(value)
@@ -0,0 +1,145 @@
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, MutableMapping, Optional
+
+from . import query_stats
+from .profiler import ProfilerBusy, SamplingProfiler, write_profile
+from .metrics import HTTP_DB_QUERIES, HTTP_DB_SECONDS, HTTP_REQUEST_DURATION, QUERY_BUDGET_EXCEEDED
+
+logger = logging.getLogger("taskup")
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+CORRELATION_HEADER = b"x-correlation-id"
+PROFILE_HEADER = b"x-taskup-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+PER_REQUEST_PROFILE_INTERVAL = 0.001
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the matched route (e.g. /api/tasks/{task_id}); bounded label cardinality."""
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class CorrelationIdMiddleware:
+    """
+    Pure ASGI middleware: assigns the request correlation id, stamps it on the
+    response headers, times the request and emits the access log.
+
+    Replaces the BaseHTTPMiddleware + @app.middleware("http") pair, which each
+    spawned a task and copied the body through a memory stream per request.
+    The id is stored in scope["state"] so request.state.correlation_id (and
+    errors.correlation_id_from_request) see the same value downstream.
+
+    It also opens a query_stats scope so DB statements and DB time are
+    reported per route template (and exposed as request.state.query_stats),
+    and warns when a request exceeds
+    `query_budget` statements (likely N+1).
+
+    With `profile_token` set, a request carrying `X-TaskUp-Profile: <token>`
+    is sampled for its duration and written to `profile_dir` as
+    <correlation id>.collapsed. Without a token nothing is checked.
+    """
+
+    def __init__(self, app: ASGIApp, query_budget: Optional[int] = None, profile_token: Optional[str] = None, profile_dir: Optional[str] = None):
+        self.app = app
+        self.query_budget = query_budget
+        self.profile_token = profile_token.encode("latin-1") if profile_token else None
+        self.profile_dir = profile_dir
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state: Dict[str, Any] = scope.setdefault("state", {})
+        cid = state.get("correlation_id")
+        if not cid:
+            cid = str(uuid.uuid4())
+            state["correlation_id"] = cid
+        cid_header = cid.encode("latin-1")
+        start = time.perf_counter()
+        status_code = 500
+        stats, token = query_stats.begin_request()
+        state["query_stats"] = stats
+        profiler = self._maybe_start_profiler(scope) if self.profile_token is not None else None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((CORRELATION_HEADER, cid_header))
+                if profiler is not None:
+                    headers.append((PROFILE_ID_HEADER, cid_header))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            query_stats.end_request(token)
+            duration = time.perf_counter() - start
+            if profiler is not None:
+                self._finish_profile(profiler, cid)
+            self._record(scope, cid, status_code, duration, stats)
+
+    def _maybe_start_profiler(self, scope: Scope) -> Optional[SamplingProfiler]:
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER:
+                if value != self.profile_token:
+                    return None
+                try:
+                    return SamplingProfiler(interval=PER_REQUEST_PROFILE_INTERVAL).start()
+                except ProfilerBusy:
+                    return None
+        return None
+
+    def _finish_profile(self, profiler: SamplingProfiler, cid: str) -> None:
+        profiler.stop()
+        try:
+            path = write_profile(profiler, self.profile_dir, cid)
+        except OSError as exc:
+            logger.warning("profile_write_failed", extra={"correlation_id": cid, "error": str(exc)})
+            return
+        logger.info("request_profiled", extra={"correlation_id": cid, "profile_path": path, "samples": sum(profiler.samples.values())})
+
+    def _record(self, scope: Scope, cid: str, status_code: int, duration: float, stats: query_stats.QueryStats) -> None:
+        method = scope.get("method", "")
+        route = route_template(scope)
+        HTTP_REQUEST_DURATION.labels(method=method, route=route, status=str(status_code)).observe(duration)
+        HTTP_DB_QUERIES.labels(method=method, route=route).observe(stats.count)
+        HTTP_DB_SECONDS.labels(method=method, route=route).observe(stats.duration)
+        if self.query_budget is not None and stats.count > self.query_budget:
+            QUERY_BUDGET_EXCEEDED.labels(method=method, route=route).inc()
+            logger.warning(
+                "query_budget_exceeded",
+                extra={
+                    "correlation_id": cid,
+                    "method": method,
+                    "route": route,
+                    "db_queries": stats.count,
+                    "query_budget": self.query_budget,
+                },
+            )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "request",
+                extra={
+                    "correlation_id": cid,
+                    "method": method,
+                    "path": scope.get("path"),
+                    "route": route,
+                    "status_code": status_code,
+                    "duration_ms": round(duration * 1000.0, 3),
+                    "db_queries": stats.count,
+                    "db_ms": round(stats.duration * 1000.0, 3),
+                },
+            )
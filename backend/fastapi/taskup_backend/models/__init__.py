@@ -82,6 +82,9 @@ class Task(Base):
     status = Column(Enum(TaskStatus), default=TaskStatus.open, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     due_date = Column(DateTime)
+    # Optimistic concurrency: UPDATEs are `WHERE id = ? AND version = ?` (see concurrency.py).
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     client = relationship("User", back_populates="tasks", foreign_keys=[client_id])
     assigned_tasker = relationship("User", back_populates="assigned_tasks", foreign_keys=[assigned_tasker_id])
@@ -115,6 +118,8 @@ class Offer(Base):
     status = Column(Enum(OfferStatus), default=OfferStatus.pending, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     task = relationship("Task", back_populates="offers", foreign_keys=[task_id])
     tasker = relationship("User")
@@ -129,6 +134,8 @@ class Wallet(Base):
     escrow_balance = Column(Integer, default=0)
     currency = Column(String, default="NOK")
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     user = relationship("User", back_populates="wallet")
     transactions = relationship("Transaction", back_populates="wallet")
@@ -161,6 +168,8 @@ class Payment(Base):
     stripe_refund_id = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     wallet = relationship("Wallet", back_populates="payments")
     task = relationship("Task")
@@ -308,3 +317,55 @@ class FraudFlag(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User")
+
+
+# Daily analytics rollups (maintained by taskup_backend.analytics, never written by request handlers)
+class AnalyticsDaily(Base):
+    __tablename__ = "analytics_daily"
+
+    day = Column(Date, primary_key=True)
+    tasks_posted = Column(Integer, default=0, nullable=False)
+    tasks_with_offers = Column(Integer, default=0, nullable=False)
+    first_offer_seconds_total = Column(Float, default=0.0, nullable=False)
+    offers_made = Column(Integer, default=0, nullable=False)
+    offers_accepted = Column(Integer, default=0, nullable=False)
+    disputes_opened = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AnalyticsDailyCurrency(Base):
+    __tablename__ = "analytics_daily_currency"
+
+    day = Column(Date, primary_key=True)
+    currency = Column(String, primary_key=True)
+    payments = Column(Integer, default=0, nullable=False)
+    gmv = Column(Integer, default=0, nullable=False)
+    refunds = Column(Integer, default=0, nullable=False)
+    refunded_amount = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AnalyticsWatermark(Base):
+    __tablename__ = "analytics_watermarks"
+
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class IdempotencyKey(Base):
+    """Stored outcome of a request sent with an Idempotency-Key header (see idempotency.py)."""
+
+    __tablename__ = "idempotency_keys"
+
+    # sha256 of caller, method, path and the client's key
+    key = Column(String(64), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    # NULL while the first request is still running
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Start of the current in-flight lease; a retry may take over once it has run out.
+    claimed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
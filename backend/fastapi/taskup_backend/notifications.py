@@ -54,7 +54,8 @@ def send_in_app_notification(user_id: str, type_: str, data: Optional[Any] = Non
     return send_push_notification(user_id, type_, type_, data or {})
 
 
-def create_notification(db: Session, user_id: str, type_: str, title: str, body: str, data: Optional[Any] = None):
+def add_notification(db: Session, user_id: str, type_: str, title: str, body: str, data: Optional[Any] = None) -> Notification:
+    """Stage a notification row without committing (for callers that batch several writes into one commit)."""
     note = Notification(
         id=str(uuid4()),
         user_id=user_id,
@@ -66,6 +67,11 @@ def create_notification(db: Session, user_id: str, type_: str, title: str, body:
         is_read=False,
     )
     db.add(note)
+    return note
+
+
+def create_notification(db: Session, user_id: str, type_: str, title: str, body: str, data: Optional[Any] = None):
+    note = add_notification(db, user_id, type_, title, body, data)
     db.commit()
     db.refresh(note)
     send_push_notification(user_id, title, body, data or {})
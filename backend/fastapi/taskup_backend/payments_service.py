@@ -6,7 +6,8 @@ from sqlalchemy.orm import Session
 from .models import Wallet, Transaction, TransactionType, TransactionStatus, Offer, Task, Payment, PaymentStatus, User
 from .notifications import create_notification
 from .admin_logs import log_admin_action
-from .payments_utils import ensure_wallet, create_tx
+from .loaders import Loaders
+from .payments_utils import ensure_wallet, ensure_wallets, create_tx
 import stripe
 import os
 from .errors import conflict_error, internal_error
@@ -18,8 +19,16 @@ def _get_wallet(db: Session, user_id: str) -> Wallet:
     return ensure_wallet(db, user_id)
 
 
-def hold_escrow_for_offer(db: Session, client_user_id: str, task: Task, offer: Offer, intent_id: Optional[str] = None, charge_id: Optional[str] = None):
-    client_wallet = _get_wallet(db, client_user_id)
+def hold_escrow_for_offer(
+    db: Session,
+    client_user_id: str,
+    task: Task,
+    offer: Offer,
+    intent_id: Optional[str] = None,
+    charge_id: Optional[str] = None,
+    loaders: Optional[Loaders] = None,
+):
+    client_wallet = ensure_wallets(db, [client_user_id], loaders=loaders)[client_user_id]
     if client_wallet.available_balance < offer.amount:
         raise ValueError("Insufficient balance for escrow")
 
@@ -59,10 +68,21 @@ def hold_escrow_for_offer(db: Session, client_user_id: str, task: Task, offer: O
     return tx, payment
 
 
-def release_escrow_to_tasker(db: Session, client_user_id: str, tasker_user_id: str, task: Task, offer: Offer):
-    client_wallet = _get_wallet(db, client_user_id)
-    tasker_wallet = _get_wallet(db, tasker_user_id)
+# Payments whose money is still held in escrow; a Stripe dispute keeps it there until resolved.
+SETTLEABLE_PAYMENT_STATUSES = frozenset({PaymentStatus.escrowed, PaymentStatus.disputed})
 
+
+def release_escrow_to_tasker(db: Session, client_user_id: str, tasker_user_id: str, task: Task, offer: Offer, loaders: Optional[Loaders] = None):
+    loaders = loaders or Loaders(db)
+    wallets = ensure_wallets(db, [client_user_id, tasker_user_id], loaders=loaders)
+    client_wallet = wallets[client_user_id]
+    tasker_wallet = wallets[tasker_user_id]
+
+    payment: Payment | None = loaders.payments.get(offer.id)
+    if payment and payment.status == PaymentStatus.payment_released:
+        raise ValueError("Payment already released")
+    if payment and payment.status not in SETTLEABLE_PAYMENT_STATUSES:
+        raise ValueError(f"Cannot release a payment in status {payment.status}")
     if client_wallet.escrow_balance < offer.amount:
         raise ValueError("Escrow balance insufficient")
 
@@ -89,10 +109,9 @@ def release_escrow_to_tasker(db: Session, client_user_id: str, tasker_user_id: s
         meta={"task_id": task.id, "offer_id": offer.id, "from": client_user_id},
     )
 
-    payment: Payment | None = db.query(Payment).filter(Payment.offer_id == offer.id, Payment.task_id == task.id).first()
     if payment:
         destination = None
-        tasker: User | None = db.query(User).filter(User.id == tasker_user_id).first()
+        tasker: User | None = loaders.users.get(tasker_user_id)
         if tasker and tasker.stripe_connect_account_id:
             destination = tasker.stripe_connect_account_id
         transfer_id = None
@@ -103,6 +122,8 @@ def release_escrow_to_tasker(db: Session, client_user_id: str, tasker_user_id: s
                     currency=offer.currency.lower(),
                     destination=destination,
                     metadata={"payment_id": payment.id, "task_id": task.id, "tasker_id": tasker_user_id},
+                    # A retried release (version conflict) must not transfer twice.
+                    idempotency_key=f"release-{payment.id}",
                 )
                 transfer_id = transfer["id"]
             except Exception as e:
@@ -1,8 +1,9 @@
 from datetime import datetime
 from uuid import uuid4
-from typing import Optional
+from typing import Dict, Iterable, Optional
 from sqlalchemy.orm import Session
 
+from .loaders import Loader, Loaders
 from .models import Wallet, Transaction, TransactionType, TransactionStatus
 
 
@@ -12,11 +13,28 @@ def ensure_wallet(db: Session, user_id: str, currency: str = "NOK") -> Wallet:
         return wallet
     wallet = Wallet(id=str(uuid4()), user_id=user_id, available_balance=0, escrow_balance=0, currency=currency)
     db.add(wallet)
-    db.commit()
-    db.refresh(wallet)
+    # Flush, not commit: callers are mid-unit and commit the wallet with the rest of their writes.
+    db.flush()
     return wallet
 
 
+def ensure_wallets(db: Session, user_ids: Iterable[str], currency: str = "NOK", loaders: Optional[Loaders] = None) -> Dict[str, Wallet]:
+    """
+    Wallets for all `user_ids` with one lookup (cached on `loaders` when given),
+    creating missing ones. New wallets are flushed; the caller commits.
+    """
+    loader = loaders.wallets if loaders else Loader(db, Wallet, key="user_id")
+    user_ids = list(dict.fromkeys(user_ids))
+    wallets = loader.get_many(user_ids)
+    missing = [Wallet(id=str(uuid4()), user_id=u, available_balance=0, escrow_balance=0, currency=currency) for u in user_ids if u not in wallets]
+    if missing:
+        db.add_all(missing)
+        db.flush()
+        loader.add(*missing)
+        wallets.update((w.user_id, w) for w in missing)
+    return wallets
+
+
 def create_tx(db: Session, wallet_id: str, type_: TransactionType, amount: int, currency: str, status: TransactionStatus, meta: dict | None = None, stripe_ids: dict | None = None):
     tx = Transaction(
         id=str(uuid4()),
@@ -0,0 +1,145 @@
+"""
+Low-overhead sampling profiler for live workers.
+
+A daemon thread snapshots every thread's Python stack via
+sys._current_frames() at a fixed interval and aggregates identical stacks.
+Output is either Brendan Gregg's collapsed-stack format (flamegraph.pl,
+speedscope, inferno) or a speedscope JSON document.
+
+mode="wall" keeps every sample; mode="cpu" drops samples whose leaf frame is
+a known blocking wait (selectors, threading, queue), approximating on-CPU
+time without OS support. Only one profile runs per worker at a time.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+MAX_PROFILE_SECONDS = 60
+PROFILE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("socket.py", "accept"),
+    ("ssl.py", "read"),
+}
+
+_active_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, mode: str = "wall"):
+        if mode not in ("wall", "cpu"):
+            raise ValueError("mode must be 'wall' or 'cpu'")
+        self.interval = interval
+        self.mode = mode
+        self.samples: Counter = Counter()
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        """Start sampling; raises ProfilerBusy if another profile is running in this worker."""
+        if not _active_lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running in this worker")
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="taskup-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        if self._thread is None:
+            return self
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.duration = time.perf_counter() - (self.started_at or 0.0)
+        _active_lock.release()
+        return self
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = _stack(frame)
+                if self.mode == "cpu" and stack and (os.path.basename(stack[-1][1]), stack[-1][0]) in _IDLE_LEAVES:
+                    continue
+                self.samples[(names.get(thread_id, str(thread_id)), stack)] += 1
+
+    def collapsed(self) -> str:
+        lines = []
+        for (thread_name, stack), count in self.samples.most_common():
+            frames = [thread_name] + [_frame_label(f) for f in stack]
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def speedscope(self, name: str = "taskup") -> dict:
+        frame_index: Dict[Frame, int] = {}
+        frames: List[dict] = []
+        profiles: Dict[str, dict] = {}
+        for (thread_name, stack), count in self.samples.items():
+            indices = []
+            for f in stack:
+                idx = frame_index.get(f)
+                if idx is None:
+                    idx = frame_index[f] = len(frames)
+                    frames.append({"name": f[0], "file": f[1], "line": f[2]})
+                indices.append(idx)
+            profile = profiles.setdefault(
+                thread_name,
+                {"type": "sampled", "name": thread_name, "unit": "seconds", "startValue": 0, "endValue": self.duration, "samples": [], "weights": []},
+            )
+            profile["samples"].append(indices)
+            profile["weights"].append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "taskup-profiler",
+            "shared": {"frames": frames},
+            "profiles": list(profiles.values()),
+        }
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _frame_label(frame: Frame) -> str:
+    name, filename, line = frame
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def profile_path(profile_dir: str, profile_id: str) -> str:
+    if not PROFILE_ID_RE.match(profile_id):
+        raise ValueError("Invalid profile id")
+    return os.path.join(profile_dir, f"{profile_id}.collapsed")
+
+
+def write_profile(profiler: SamplingProfiler, profile_dir: str, profile_id: str) -> str:
+    os.makedirs(profile_dir, exist_ok=True)
+    path = profile_path(profile_dir, profile_id)
+    with open(path, "w") as fh:
+        fh.write(profiler.collapsed())
+    return path
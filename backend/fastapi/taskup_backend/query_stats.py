@@ -0,0 +1,87 @@
+"""
+Per-request DB query accounting via SQLAlchemy cursor events.
+
+install_query_hooks() listens on every Engine; the middleware opens a
+QueryStats scope per request and the hooks add to whichever scope is active
+in the current context (sync dependencies run in the threadpool with a copy
+of the context, so they report into the same object).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+
+    def add(self, elapsed: float) -> None:
+        self.count += 1
+        self.duration += elapsed
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("taskup_query_stats", default=None)
+_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._taskup_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    start = getattr(context, "_taskup_query_start", None)
+    if stats is not None and start is not None:
+        stats.add(time.perf_counter() - start)
+
+
+def install_query_hooks() -> None:
+    """Register the cursor hooks on all engines (idempotent)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+def begin_request() -> tuple:
+    """Start a QueryStats scope; returns (stats, token) for end_request()."""
+    stats = QueryStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token) -> None:
+    _current.reset(token)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def count_queries(engine: Engine) -> Iterator[QueryStats]:
+    """Count every statement executed on `engine` inside the block (tests/benchmarks)."""
+    stats = QueryStats()
+    starts: list = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        starts.append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        stats.add(time.perf_counter() - starts.pop() if starts else 0.0)
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+    try:
+        yield stats
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+        event.remove(engine, "after_cursor_execute", after)
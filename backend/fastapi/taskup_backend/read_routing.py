@@ -0,0 +1,111 @@
+"""
+Read-your-writes pinning for read-replica routing (database.get_read_db).
+
+After a successful unsafe request (POST/PUT/PATCH/DELETE answered with a
+status below 400) the caller is pinned to the primary for `window` seconds,
+long enough to cover replication lag:
+
+  - a `taskup_rw` cookie holding the pin expiry, which browsers send to any
+    worker
+  - the bearer token's subject in an in-process map, for API clients that
+    drop cookies (per worker only)
+
+The token is read without verifying its signature: the only thing a forged
+token can do is send its bearer's reads to the primary.
+"""
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, MutableMapping, Optional
+
+import jwt
+from starlette.requests import Request
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+PIN_COOKIE = "taskup_rw"
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+MAX_TRACKED_USERS = 100_000
+
+
+class WriteTracker:
+    """user id -> pin expiry (epoch seconds), bounded."""
+
+    def __init__(self, max_users: int = MAX_TRACKED_USERS):
+        self.max_users = max_users
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: str, until: float) -> None:
+        with self._lock:
+            if len(self._until) >= self.max_users:
+                now = time.time()
+                self._until = {u: t for u, t in self._until.items() if t > now}
+                if len(self._until) >= self.max_users:
+                    self._until.clear()
+            self._until[user_id] = until
+
+    def pinned(self, user_id: str, now: Optional[float] = None) -> bool:
+        until = self._until.get(user_id)
+        return until is not None and until > (time.time() if now is None else now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._until.clear()
+
+
+WRITES = WriteTracker()
+
+
+def token_subject(authorization: Optional[str]) -> Optional[str]:
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization.split(" ", 1)[1], options={"verify_signature": False, "verify_exp": False})
+    except jwt.PyJWTError:
+        return None
+    return payload.get("sub") or payload.get("user_id")
+
+
+def is_pinned_to_primary(request: Request) -> bool:
+    now = time.time()
+    cookie = request.cookies.get(PIN_COOKIE)
+    if cookie:
+        try:
+            if float(cookie) > now:
+                return True
+        except ValueError:
+            pass
+    subject = token_subject(request.headers.get("authorization"))
+    return subject is not None and WRITES.pinned(subject, now)
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI: pins callers to the primary after successful writes (see module docstring)."""
+
+    def __init__(self, app: ASGIApp, window: float):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("method") in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + self.window
+                cookie = f"{PIN_COOKIE}={until:.3f}; Max-Age={int(self.window) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode("latin-1"))]
+                for name, value in scope.get("headers", []):
+                    if name == b"authorization":
+                        subject = token_subject(value.decode("latin-1"))
+                        if subject:
+                            WRITES.mark(subject, until)
+                        break
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
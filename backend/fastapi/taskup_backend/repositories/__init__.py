@@ -0,0 +1,131 @@
+"""
+Repository layer shared by both entry points.
+
+One interface (base.Repository: list/page/get/get_many/create/update/delete
+over plain dict rows) with two implementations:
+
+  - orm.SqlAlchemyRepository   SQLAlchemy session (taskup_backend app)
+  - postgrest.PostgrestRepository   Supabase PostgREST / in-memory fallback
+                                    via taskup_backend.db (app_core app)
+
+`data_backend` in each app's Settings (TASKUP_DATA_BACKEND) picks the
+implementation. Pagination (page) and batched lookups (get_many) live here,
+so they are written once for both apps. Rows keep the backing store's
+column names (the SQLAlchemy models and the Supabase schema differ) unless
+`build_repositories(..., supabase_columns=True)` asks the SQLAlchemy side to
+use the Supabase names, and `user=` limits its rows to what the RLS policies
+would show that user.
+"""
+from typing import Any, Dict, Optional
+
+from fastapi import Depends
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import get_db, get_read_db
+from ..models import Message, Notification, Offer, Payment, Task
+from .base import Filters, Page, Repositories, Repository
+from .orm import SqlAlchemyRepository
+from .postgrest import PostgrestRepository
+
+BACKENDS = ("sqlalchemy", "postgrest")
+
+# repository name -> (SQLAlchemy model, PostgREST table)
+ENTITIES = {
+    "tasks": (Task, "tasks"),
+    "offers": (Offer, "offers"),
+    "messages": (Message, "messages"),
+    "payments": (Payment, "payments"),
+    "notifications": (Notification, "notifications"),
+}
+
+# repository name -> {Supabase column: SQLAlchemy attribute}, for the names that differ
+SUPABASE_COLUMNS = {
+    "tasks": {"budget_cents": "budget_max", "address": "location", "lat": "latitude", "lng": "longitude"},
+    "offers": {"amount_cents": "amount"},
+    "messages": {"recipient_id": "receiver_id", "body": "content"},
+    "payments": {
+        "amount_cents": "amount",
+        "payment_intent_id": "stripe_payment_intent_id",
+        "charge_id": "stripe_charge_id",
+        "transfer_id": "stripe_transfer_id",
+        "refund_id": "stripe_refund_id",
+    },
+    "notifications": {},
+}
+
+# Roles the RLS policies let read every row.
+STAFF_ROLES = frozenset({"admin", "support", "moderator"})
+
+
+def visible_rows(name: str, user: Dict[str, Any]):
+    """The rows of repository `name` the RLS policies show `user` (None: all of them)."""
+    if user.get("role") in STAFF_ROLES:
+        return None
+    user_id = user.get("id")
+    if name == "tasks":
+        return None if user.get("role") == "tasker" else Task.client_id == user_id
+    if name == "offers":
+        return or_(Offer.tasker_id == user_id, Offer.task_id.in_(select(Task.id).where(Task.client_id == user_id)))
+    if name == "messages":
+        return or_(Message.sender_id == user_id, Message.receiver_id == user_id)
+    if name == "payments":
+        return or_(Payment.client_id == user_id, Payment.tasker_id == user_id)
+    if name == "notifications":
+        return Notification.user_id == user_id
+    raise ValueError(f"No visibility rule for {name!r}")
+
+
+def build_repositories(
+    backend: str,
+    session: Optional[Session] = None,
+    jwt: Optional[str] = None,
+    user: Optional[Dict[str, Any]] = None,
+    supabase_columns: bool = False,
+) -> Repositories:
+    if backend == "sqlalchemy":
+        if session is None:
+            raise ValueError("The sqlalchemy data backend needs a session")
+        return Repositories(
+            **{
+                name: SqlAlchemyRepository(
+                    session,
+                    model,
+                    columns=SUPABASE_COLUMNS[name] if supabase_columns else None,
+                    scope=visible_rows(name, user) if user is not None else None,
+                )
+                for name, (model, _) in ENTITIES.items()
+            }
+        )
+    if backend == "postgrest":
+        return Repositories(**{name: PostgrestRepository(table, jwt=jwt) for name, (_, table) in ENTITIES.items()})
+    raise ValueError(f"Unknown data backend {backend!r} (expected one of {', '.join(BACKENDS)})")
+
+
+def get_repositories(db: Session = Depends(get_db)) -> Repositories:
+    """FastAPI dependency: repositories on the primary."""
+    return build_repositories(get_settings().data_backend, session=db)
+
+
+def get_read_repositories(db: Session = Depends(get_read_db)) -> Repositories:
+    """FastAPI dependency: repositories for read-only endpoints (replica routing applies)."""
+    return build_repositories(get_settings().data_backend, session=db)
+
+
+__all__ = [
+    "BACKENDS",
+    "ENTITIES",
+    "Filters",
+    "Page",
+    "PostgrestRepository",
+    "Repositories",
+    "Repository",
+    "STAFF_ROLES",
+    "SUPABASE_COLUMNS",
+    "SqlAlchemyRepository",
+    "build_repositories",
+    "get_read_repositories",
+    "get_repositories",
+    "visible_rows",
+]
@@ -0,0 +1,75 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+# Filters: {column: value} is equality, {column: [v1, v2]} (list/tuple/set) is IN.
+Filters = Dict[str, Any]
+
+
+@dataclass
+class Page:
+    items: List[Dict[str, Any]]
+    limit: Optional[int]
+    offset: int
+    has_more: bool
+
+
+class Repository(ABC):
+    """
+    Data access for one table. Rows are plain dicts keyed by the backing
+    store's column names, so call sites don't depend on ORM objects or on
+    the PostgREST response type.
+    """
+
+    key = "id"
+
+    @abstractmethod
+    def list(
+        self,
+        filters: Optional[Filters] = None,
+        order_by: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def get_many(self, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Rows by primary key, fetched together; missing ids are absent from the result."""
+
+    @abstractmethod
+    def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def update(self, row_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def delete(self, row_id: str) -> bool:
+        ...
+
+    def get(self, row_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([row_id]).get(row_id)
+
+    def page(
+        self,
+        filters: Optional[Filters] = None,
+        order_by: str = "created_at",
+        desc: bool = True,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Page:
+        # One extra row tells whether there is a next page without a COUNT.
+        rows = self.list(filters, order_by=order_by, desc=desc, limit=limit + 1, offset=offset)
+        return Page(items=rows[:limit], limit=limit, offset=offset, has_more=len(rows) > limit)
+
+
+@dataclass
+class Repositories:
+    tasks: Repository
+    offers: Repository
+    messages: Repository
+    payments: Repository
+    notifications: Repository
@@ -0,0 +1,93 @@
+import enum
+from typing import Any, Dict, Iterable, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+from ..serializers import Projection
+from .base import Filters, Repository
+
+
+def _plain(value: Any) -> Any:
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+class SqlAlchemyRepository(Repository):
+    """
+    Repository over a mapped model; reads select the columns only (no ORM
+    objects), writes commit. `columns` renames model attributes for callers
+    written against another schema ({row name: model attribute}); `scope` is a
+    condition every read, update and delete is limited to (the caller's
+    visibility, as RLS does on PostgREST).
+    """
+
+    def __init__(self, session: Session, model: Any, columns: Optional[Dict[str, str]] = None, scope: Optional[ColumnElement] = None):
+        self.session = session
+        self.model = model
+        self.scope = scope
+        renamed = {attr: name for name, attr in (columns or {}).items()}
+        self._attrs = {renamed.get(attr.key, attr.key): attr.key for attr in inspect(model).column_attrs}
+        self._columns = {name: getattr(model, attr) for name, attr in self._attrs.items()}
+        self._fields = Projection(**self._columns)
+
+    def _column(self, name: str):
+        try:
+            return self._columns[name]
+        except KeyError:
+            raise ValueError(f"{self.model.__tablename__} has no column {name!r}") from None
+
+    def _scoped(self, query):
+        return query.filter(self.scope) if self.scope is not None else query
+
+    def _attr(self, name: str) -> str:
+        self._column(name)
+        return self._attrs[name]
+
+    def _rows(self, query) -> List[Dict[str, Any]]:
+        return [{k: _plain(v) for k, v in row.items()} for row in self._fields.rows(query)]
+
+    def list(
+        self,
+        filters: Optional[Filters] = None,
+        order_by: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        query = self._scoped(self._fields.query(self.session))
+        for name, value in (filters or {}).items():
+            column = self._column(name)
+            query = query.filter(column.in_(list(value)) if isinstance(value, (list, tuple, set)) else column == value)
+        if order_by:
+            column = self._column(order_by)
+            query = query.order_by(column.desc() if desc else column.asc())
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return self._rows(query)
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        return {row[self.key]: row for row in self.list({self.key: ids})}
+
+    def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        obj = self.model(**{self._attr(name): value for name, value in {self.key: str(uuid4()), **data}.items()})
+        self.session.add(obj)
+        self.session.commit()
+        return {name: _plain(getattr(obj, attr)) for name, attr in self._attrs.items()}
+
+    def update(self, row_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        query = self._scoped(self.session.query(self.model).filter(self._column(self.key) == row_id))
+        updated = query.update({self._attr(name): value for name, value in data.items()}, synchronize_session="fetch")
+        self.session.commit()
+        return self.get(row_id) if updated else None
+
+    def delete(self, row_id: str) -> bool:
+        deleted = self._scoped(self.session.query(self.model).filter(self._column(self.key) == row_id)).delete(synchronize_session="fetch")
+        self.session.commit()
+        return bool(deleted)
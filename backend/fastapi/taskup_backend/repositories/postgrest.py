@@ -0,0 +1,44 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from .. import db
+from .base import Filters, Repository
+
+
+class PostgrestRepository(Repository):
+    """
+    Repository over taskup_backend.db: Supabase PostgREST (RLS applies when a
+    user JWT is given) or the in-memory fallback when Supabase isn't configured.
+    Filters, ordering and paging are evaluated by db.select (server-side on
+    PostgREST, indexed in memory).
+    """
+
+    def __init__(self, table: str, jwt: Optional[str] = None):
+        self.table = table
+        self.jwt = jwt
+
+    def list(
+        self,
+        filters: Optional[Filters] = None,
+        order_by: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        return list(db.select(self.table, filters, jwt=self.jwt, order_by=order_by, desc=desc, limit=limit, offset=offset))
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        return {row[self.key]: row for row in db.select(self.table, {self.key: ids}, jwt=self.jwt)}
+
+    def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        rows = db.insert(self.table, data, jwt=self.jwt)
+        return rows[0] if rows else dict(data)
+
+    def update(self, row_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        rows = db.update(self.table, {self.key: row_id}, data, jwt=self.jwt)
+        return rows[0] if rows else None
+
+    def delete(self, row_id: str) -> bool:
+        return bool(db.delete(self.table, {self.key: row_id}, jwt=self.jwt))
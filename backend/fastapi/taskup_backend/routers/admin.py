@@ -1,36 +1,173 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import os
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
 
 from ..security import require_roles
-from ..database import get_db
-from ..models import User, Task, Offer, Dispute, Payment
+from ..database import get_db, get_read_db
+from ..models import User, Task, Offer, Dispute, Payment, UserRole, TaskStatus, OfferStatus, DisputeStatus, PaymentStatus
 from ..notifications import create_notification
 from ..admin_logs import log_admin_action
-from ..errors import not_found_error
+from ..analytics import daily_report, run_rollup
+from ..admin_listing import AdminListParams, ListSpec, admin_list_params, list_resource
+from ..config import get_settings
+from ..dashboard import DASHBOARD
+from ..errors import not_found_error, conflict_error, validation_error
 from ..logging_utils import log_event
+from ..profiler import MAX_PROFILE_SECONDS, ProfilerBusy, SamplingProfiler, profile_path
+from ..serializers import Projection
+from ..user_summaries import SUMMARIES
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+# Explicit projections: never hashed_password / reset_token, only what the back office needs.
+USER_LIST = ListSpec(
+    name="users",
+    model=User,
+    fields=Projection(
+        id=User.id,
+        email=User.email,
+        full_name=User.full_name,
+        role=User.role,
+        language=User.language,
+        kyc_status=User.kyc_status,
+        risk_score=User.risk_score,
+        flags=User.flags,
+        stripe_customer_id=User.stripe_customer_id,
+        created_at=User.created_at,
+        updated_at=User.updated_at,
+    ),
+    status_column=User.role,
+    status_enum=UserRole,
+    user_columns=(User.id,),
+)
+TASK_LIST = ListSpec(
+    name="tasks",
+    model=Task,
+    fields=Projection(
+        id=Task.id,
+        title=Task.title,
+        category=Task.category,
+        location=Task.location,
+        status=Task.status,
+        client_id=Task.client_id,
+        assigned_tasker_id=Task.assigned_tasker_id,
+        assigned_offer_id=Task.assigned_offer_id,
+        budget_min=Task.budget_min,
+        budget_max=Task.budget_max,
+        currency=Task.currency,
+        created_at=Task.created_at,
+        due_date=Task.due_date,
+    ),
+    status_column=Task.status,
+    status_enum=TaskStatus,
+    user_columns=(Task.client_id, Task.assigned_tasker_id),
+    amount_column=Task.budget_max,
+)
+OFFER_LIST = ListSpec(
+    name="offers",
+    model=Offer,
+    fields=Projection(
+        id=Offer.id,
+        task_id=Offer.task_id,
+        tasker_id=Offer.tasker_id,
+        amount=Offer.amount,
+        currency=Offer.currency,
+        status=Offer.status,
+        created_at=Offer.created_at,
+        updated_at=Offer.updated_at,
+    ),
+    status_column=Offer.status,
+    status_enum=OfferStatus,
+    user_columns=(Offer.tasker_id,),
+    amount_column=Offer.amount,
+)
+DISPUTE_LIST = ListSpec(
+    name="disputes",
+    model=Dispute,
+    fields=Projection(
+        id=Dispute.id,
+        task_id=Dispute.task_id,
+        raised_by_id=Dispute.raised_by_id,
+        against_user_id=Dispute.against_user_id,
+        reason=Dispute.reason,
+        description=Dispute.description,
+        status=Dispute.status,
+        created_at=Dispute.created_at,
+        updated_at=Dispute.updated_at,
+    ),
+    status_column=Dispute.status,
+    status_enum=DisputeStatus,
+    user_columns=(Dispute.raised_by_id, Dispute.against_user_id),
+)
+PAYMENT_LIST = ListSpec(
+    name="payments",
+    model=Payment,
+    fields=Projection(
+        id=Payment.id,
+        task_id=Payment.task_id,
+        offer_id=Payment.offer_id,
+        client_id=Payment.client_id,
+        tasker_id=Payment.tasker_id,
+        amount=Payment.amount,
+        currency=Payment.currency,
+        status=Payment.status,
+        stripe_payment_intent_id=Payment.stripe_payment_intent_id,
+        stripe_charge_id=Payment.stripe_charge_id,
+        stripe_transfer_id=Payment.stripe_transfer_id,
+        stripe_refund_id=Payment.stripe_refund_id,
+        created_at=Payment.created_at,
+        updated_at=Payment.updated_at,
+    ),
+    status_column=Payment.status,
+    status_enum=PaymentStatus,
+    user_columns=(Payment.client_id, Payment.tasker_id),
+    amount_column=Payment.amount,
+)
+
 
 @router.get("/metrics")
-async def metrics(user=Depends(require_roles("admin", "support", "moderator")), db: Session = Depends(get_db)):
-    users = db.query(User).count()
-    tasks = db.query(Task).count()
-    offers = db.query(Offer).count()
-    disputes = db.query(Dispute).count()
-    payments = db.query(Payment).count()
-    return {
-        "users": users,
-        "tasks": tasks,
-        "offers": offers,
-        "disputes": disputes,
-        "payments": payments,
-    }
+async def metrics(refresh: bool = False, user=Depends(require_roles("admin", "support", "moderator")), db: Session = Depends(get_db)):
+    """Totals (users/tasks/offers/disputes/payments) plus per-status, per-day and amount breakdowns, cached."""
+    return DASHBOARD.get(db, max_age=get_settings().dashboard_max_age_seconds, force=refresh)
+
+
+@router.get("/analytics/daily")
+async def analytics_daily(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user=Depends(require_roles("admin", "support", "moderator")),
+    db: Session = Depends(get_db),
+):
+    """Tasks posted, offers per task, accept rate, time-to-first-offer, GMV by currency, refund and dispute rates per day (rollup tables only)."""
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise validation_error({"date_from": ["date_from must not be after date_to"]})
+    if (date_to - date_from).days > 366:
+        raise validation_error({"date_from": ["Range is limited to 366 days"]})
+    return daily_report(db, date_from, date_to)
+
+
+@router.post("/analytics/rollup")
+async def analytics_rollup(full: bool = False, user=Depends(require_roles("admin")), db: Session = Depends(get_db)):
+    """Run the daily rollup now (normally scheduled via `python -m taskup_backend.analytics`)."""
+    result = run_rollup(db, full=full)
+    log_admin_action(db, user.get("id"), "analytics_rollup", "analytics", None, {"full": full, **result})
+    return result
 
 
 @router.get("/users")
-async def list_users(user=Depends(require_roles("admin", "support", "moderator")), db: Session = Depends(get_db)):
-    return db.query(User).all()
+async def list_users(
+    params: AdminListParams = Depends(admin_list_params),
+    user=Depends(require_roles("admin", "support", "moderator")),
+    db: Session = Depends(get_read_db),
+):
+    return list_resource(db, USER_LIST, params)
 
 
 @router.post("/users/{user_id}/kyc")
@@ -39,6 +176,7 @@ async def set_kyc_status(user_id: str, kyc_status: str, user=Depends(require_rol
     if not updated:
         raise not_found_error("USER_NOT_FOUND", "User not found")
     db.commit()
+    SUMMARIES.invalidate(user_id)  # bulk update: the mapper hooks don't fire
     log_admin_action(db, user.get("id"), "set_kyc_status", "user", user_id, {"kyc_status": kyc_status})
     log_event(user_id=user.get("id"), action="admin_set_kyc", extra={"user_id": user_id, "kyc_status": kyc_status})
     return {"ok": True}
@@ -50,29 +188,46 @@ async def set_risk_score(user_id: str, risk_score: float, note: str = "", user=D
     if not updated:
         raise not_found_error("USER_NOT_FOUND", "User not found")
     db.commit()
+    SUMMARIES.invalidate(user_id)
     log_admin_action(db, user.get("id"), "set_risk_score", "user", user_id, {"risk_score": risk_score, "note": note})
     log_event(user_id=user.get("id"), action="admin_set_risk", extra={"user_id": user_id, "risk_score": risk_score})
     return {"ok": True}
 
 
 @router.get("/tasks")
-async def list_tasks(user=Depends(require_roles("admin", "support", "moderator")), db: Session = Depends(get_db)):
-    return db.query(Task).all()
+async def list_tasks(
+    params: AdminListParams = Depends(admin_list_params),
+    user=Depends(require_roles("admin", "support", "moderator")),
+    db: Session = Depends(get_read_db),
+):
+    return list_resource(db, TASK_LIST, params)
 
 
 @router.get("/offers")
-async def list_offers(user=Depends(require_roles("admin", "support", "moderator")), db: Session = Depends(get_db)):
-    return db.query(Offer).all()
+async def list_offers(
+    params: AdminListParams = Depends(admin_list_params),
+    user=Depends(require_roles("admin", "support", "moderator")),
+    db: Session = Depends(get_read_db),
+):
+    return list_resource(db, OFFER_LIST, params)
 
 
 @router.get("/disputes")
-async def list_disputes(user=Depends(require_roles("admin", "support", "moderator")), db: Session = Depends(get_db)):
-    return db.query(Dispute).all()
+async def list_disputes(
+    params: AdminListParams = Depends(admin_list_params),
+    user=Depends(require_roles("admin", "support", "moderator")),
+    db: Session = Depends(get_read_db),
+):
+    return list_resource(db, DISPUTE_LIST, params)
 
 
 @router.get("/payments")
-async def list_payments(user=Depends(require_roles("admin", "support", "moderator")), db: Session = Depends(get_db)):
-    return db.query(Payment).all()
+async def list_payments(
+    params: AdminListParams = Depends(admin_list_params),
+    user=Depends(require_roles("admin", "support", "moderator")),
+    db: Session = Depends(get_read_db),
+):
+    return list_resource(db, PAYMENT_LIST, params)
 
 
 @router.post("/block")
@@ -81,6 +236,7 @@ async def block_user(user_id: str, reason: str = "manual_block", user=Depends(re
     if not updated:
         raise not_found_error("USER_NOT_FOUND", "User not found")
     db.commit()
+    SUMMARIES.invalidate(user_id)
     create_notification(db, user_id, "account_blocked", "Account blocked", reason)
     log_admin_action(db, user.get("id"), "block_user", "user", user_id, {"reason": reason})
     log_event(user_id=user.get("id"), action="admin_block_user", extra={"target_user": user_id, "reason": reason})
@@ -93,7 +249,44 @@ async def unblock_user(user_id: str, user=Depends(require_roles("admin", "suppor
     if not updated:
         raise not_found_error("USER_NOT_FOUND", "User not found")
     db.commit()
+    SUMMARIES.invalidate(user_id)
     create_notification(db, user_id, "account_unblocked", "Account unblocked", "")
     log_admin_action(db, user.get("id"), "unblock_user", "user", user_id, {})
     log_event(user_id=user.get("id"), action="admin_unblock_user", extra={"target_user": user_id})
     return {"ok": True, "unblocked_user_id": user_id}
+
+
+@router.get("/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    mode: str = Query("wall", pattern="^(wall|cpu)$"),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+    interval_ms: float = Query(5, ge=1, le=100),
+    user=Depends(require_roles("admin")),
+):
+    """Sample this worker's stacks for `seconds` while it keeps serving traffic."""
+    profiler = SamplingProfiler(interval=interval_ms / 1000.0, mode=mode)
+    try:
+        profiler.start()
+    except ProfilerBusy:
+        raise conflict_error("PROFILE_BUSY", "A profile is already running in this worker")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    log_event(user_id=user.get("id"), action="admin_profile", extra={"seconds": seconds, "mode": mode, "samples": sum(profiler.samples.values())})
+    if format == "speedscope":
+        return JSONResponse(profiler.speedscope(name=f"taskup-{os.getpid()}-{mode}"))
+    return PlainTextResponse(profiler.collapsed())
+
+
+@router.get("/profile/{profile_id}")
+async def get_request_profile(profile_id: str, user=Depends(require_roles("admin"))):
+    """Download a per-request profile recorded via the X-TaskUp-Profile header (id = correlation id)."""
+    try:
+        path = profile_path(get_settings().profile_dir, profile_id)
+    except ValueError:
+        raise validation_error({"profile_id": ["Invalid profile id"]})
+    if not os.path.exists(path):
+        raise not_found_error("PROFILE_NOT_FOUND", "Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=os.path.basename(path))
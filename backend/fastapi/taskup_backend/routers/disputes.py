@@ -7,13 +7,16 @@ from sqlalchemy.orm import Session
 from ..schemas import DisputeOut, DisputeCreate, DisputeResolve
 from ..security import get_current_user, require_roles
 from ..database import get_db
-from ..models import Dispute, Task, DisputeStatus, Payment, PaymentStatus, TaskStatus, Wallet
-from ..payments_service import release_escrow_to_tasker
+from ..loaders import Loaders, get_loaders
+from ..models import Dispute, Task, DisputeStatus, Offer, Payment, PaymentStatus, TaskStatus, Wallet
+from ..payments_service import SETTLEABLE_PAYMENT_STATUSES, release_escrow_to_tasker
 from ..payments_utils import create_tx
 from ..models import TransactionType, TransactionStatus
-from ..notifications import create_notification
+from ..notifications import add_notification, create_notification
 from ..admin_logs import log_admin_action
-from ..errors import not_found_error, permission_error
+from ..errors import conflict_error, not_found_error, permission_error
+from ..concurrency import with_retry
+from ..task_states import dispatch, transition
 from ..logging_utils import log_event
 
 router = APIRouter(prefix="/disputes", tags=["disputes"])
@@ -36,9 +39,6 @@ async def my_disputes(user=Depends(get_current_user), db: Session = Depends(get_
 
 @router.post("", response_model=DisputeOut)
 async def open_dispute(payload: DisputeCreate, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    task = db.query(Task).filter(Task.id == payload.task_id).first()
-    if not task:
-        raise not_found_error("TASK_NOT_FOUND", "Task not found")
     dispute = Dispute(
         id=str(uuid4()),
         task_id=payload.task_id,
@@ -49,82 +49,130 @@ async def open_dispute(payload: DisputeCreate, user=Depends(get_current_user), d
         status=DisputeStatus.open,
         created_at=datetime.utcnow(),
     )
+    moved = transition(
+        db,
+        payload.task_id,
+        TaskStatus.disputed,
+        "dispute_opened",
+        actor=user,
+        data={"dispute_id": dispute.id, "against_user_id": payload.against_user_id, "reason": payload.reason},
+        strict=False,
+    )
+    if moved is None:
+        # A task that is already disputed (e.g. the other party opened one first) takes further disputes as-is.
+        status = db.query(Task.status).filter(Task.id == payload.task_id).scalar()
+        if status is None:
+            raise not_found_error("TASK_NOT_FOUND", "Task not found")
+        if status != TaskStatus.disputed:
+            raise conflict_error("TASK_STATUS_CONFLICT", f"Invalid transition from {status} to {TaskStatus.disputed}")
+        if payload.against_user_id:
+            add_notification(db, payload.against_user_id, "dispute_opened", "Dispute opened", payload.reason or "", {"task_id": payload.task_id})
     db.add(dispute)
-    task.status = TaskStatus.disputed
     db.commit()
-    db.refresh(dispute)
-    create_notification(db, payload.against_user_id, "dispute_opened", "Dispute opened", payload.reason, {"task_id": payload.task_id})
+    dispatch(db)
     log_event(user_id=user.get("id"), action="dispute_opened", extra={"dispute_id": dispute.id, "task_id": payload.task_id})
     return DisputeOut.from_orm(dispute)
 
 
+def _require_escrowed(payment: Payment) -> None:
+    # Payment carries a version column: a concurrent release/refund makes this unit's flush stale,
+    # and the retry re-reads the payment and stops here.
+    if payment.status not in SETTLEABLE_PAYMENT_STATUSES:
+        raise conflict_error("PAYMENT_NOT_ESCROWED", f"Cannot settle a payment in status {payment.status}")
+
+
+def _take_from_escrow(wallet: Wallet, amount: int) -> None:
+    if wallet.escrow_balance < amount:
+        raise conflict_error("ESCROW_BALANCE_INSUFFICIENT", "Escrow balance insufficient")
+    wallet.escrow_balance -= amount
+
+
 @router.post("/{dispute_id}/resolve")
-async def resolve_dispute(dispute_id: str, payload: DisputeResolve, user=Depends(require_roles("admin", "support", "moderator")), db: Session = Depends(get_db)):
-    dispute: Dispute | None = db.query(Dispute).filter(Dispute.id == dispute_id).first()
-    if not dispute:
-        raise not_found_error("DISPUTE_NOT_FOUND", "Dispute not found")
-    task = db.query(Task).filter(Task.id == dispute.task_id).first()
-    payment = db.query(Payment).filter(Payment.task_id == dispute.task_id).first()
-    if payload.resolution == "release":
-        if task and payment:
-            # release escrow to tasker
-            offer = payment.offer
-            release_escrow_to_tasker(db, payment.client_id, payment.tasker_id, task, offer)
-        dispute.status = DisputeStatus.resolved_tasker
-        if payment:
-            payment.status = PaymentStatus.payment_released
-    elif payload.resolution == "refund":
-        if payment:
-            client_wallet: Wallet | None = db.query(Wallet).filter(Wallet.id == payment.wallet_id).first()
-            if client_wallet:
-                client_wallet.escrow_balance = max(0, client_wallet.escrow_balance - payment.amount)
-                client_wallet.available_balance += payment.amount
-                create_tx(
-                    db,
-                    wallet_id=client_wallet.id,
-                    type_=TransactionType.refund,
-                    amount=payment.amount,
-                    currency=payment.currency,
-                    status=TransactionStatus.succeeded,
-                    meta={"dispute_id": dispute.id, "task_id": dispute.task_id},
-                    stripe_ids={"refund": payment.stripe_refund_id},
-                )
-            payment.status = PaymentStatus.refunded
-        dispute.status = DisputeStatus.resolved_client
-    else:
-        dispute.status = DisputeStatus.partial_refund
-        # Split 50/50: half to client (released from escrow), half to tasker
-        if payment:
-            half = int(payment.amount * 0.5)
-            client_wallet: Wallet | None = db.query(Wallet).filter(Wallet.id == payment.wallet_id).first()
-            tasker_wallet: Wallet | None = db.query(Wallet).filter(Wallet.user_id == payment.tasker_id).first()
-            if client_wallet:
-                client_wallet.escrow_balance = max(0, client_wallet.escrow_balance - half)
-                client_wallet.available_balance += half
-                create_tx(
-                    db,
-                    wallet_id=client_wallet.id,
-                    type_=TransactionType.partial_refund,
-                    amount=half,
-                    currency=payment.currency,
-                    status=TransactionStatus.succeeded,
-                    meta={"dispute_id": dispute.id, "task_id": dispute.task_id, "split": "50/50"},
-                )
-            if tasker_wallet:
-                tasker_wallet.available_balance += (payment.amount - half)
-                create_tx(
-                    db,
-                    wallet_id=tasker_wallet.id,
-                    type_=TransactionType.release,
-                    amount=payment.amount - half,
-                    currency=payment.currency,
-                    status=TransactionStatus.succeeded,
-                    meta={"dispute_id": dispute.id, "task_id": dispute.task_id, "split": "50/50", "to": payment.tasker_id},
-                )
-            payment.status = PaymentStatus.refunded
-
-    dispute.updated_at = datetime.utcnow()
-    db.commit()
+async def resolve_dispute(
+    dispute_id: str,
+    payload: DisputeResolve,
+    user=Depends(require_roles("admin", "support", "moderator")),
+    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
+):
+    def unit() -> Dispute:
+        dispute: Dispute | None = db.query(Dispute).filter(Dispute.id == dispute_id).first()
+        if not dispute:
+            raise not_found_error("DISPUTE_NOT_FOUND", "Dispute not found")
+        if dispute.status not in (DisputeStatus.open, DisputeStatus.under_review):
+            raise conflict_error("DISPUTE_ALREADY_RESOLVED", "Dispute is already resolved")
+        task = db.query(Task).filter(Task.id == dispute.task_id).first()
+        # The payment and its offer in one round trip; the release reuses the payment via the loader.
+        payment, offer = db.query(Payment, Offer).outerjoin(Offer, Offer.id == Payment.offer_id).filter(Payment.task_id == dispute.task_id).first() or (None, None)
+        loaders.payments.add(payment)
+        if payload.resolution == "release":
+            dispute.status = DisputeStatus.resolved_tasker
+            if task and payment:
+                # release escrow to tasker
+                try:
+                    release_escrow_to_tasker(db, payment.client_id, payment.tasker_id, task, offer, loaders=loaders)
+                except ValueError as e:
+                    raise conflict_error("PAYMENT_RELEASE_FAILED", str(e))
+            if payment:
+                payment.status = PaymentStatus.payment_released
+        elif payload.resolution == "refund":
+            if payment:
+                _require_escrowed(payment)
+                client_wallet: Wallet | None = db.query(Wallet).filter(Wallet.id == payment.wallet_id).first()
+                if client_wallet:
+                    _take_from_escrow(client_wallet, payment.amount)
+                    client_wallet.available_balance += payment.amount
+                    create_tx(
+                        db,
+                        wallet_id=client_wallet.id,
+                        type_=TransactionType.refund,
+                        amount=payment.amount,
+                        currency=payment.currency,
+                        status=TransactionStatus.succeeded,
+                        meta={"dispute_id": dispute.id, "task_id": dispute.task_id},
+                        stripe_ids={"refund": payment.stripe_refund_id},
+                    )
+                payment.status = PaymentStatus.refunded
+            dispute.status = DisputeStatus.resolved_client
+        else:
+            dispute.status = DisputeStatus.partial_refund
+            # Split 50/50: half to client (released from escrow), half to tasker
+            if payment:
+                _require_escrowed(payment)
+                half = int(payment.amount * 0.5)
+                client_wallet: Wallet | None = db.query(Wallet).filter(Wallet.id == payment.wallet_id).first()
+                tasker_wallet: Wallet | None = db.query(Wallet).filter(Wallet.user_id == payment.tasker_id).first()
+                if client_wallet:
+                    # Both halves leave the client's escrow.
+                    _take_from_escrow(client_wallet, payment.amount)
+                    client_wallet.available_balance += half
+                    create_tx(
+                        db,
+                        wallet_id=client_wallet.id,
+                        type_=TransactionType.partial_refund,
+                        amount=half,
+                        currency=payment.currency,
+                        status=TransactionStatus.succeeded,
+                        meta={"dispute_id": dispute.id, "task_id": dispute.task_id, "split": "50/50"},
+                    )
+                if tasker_wallet:
+                    tasker_wallet.available_balance += (payment.amount - half)
+                    create_tx(
+                        db,
+                        wallet_id=tasker_wallet.id,
+                        type_=TransactionType.release,
+                        amount=payment.amount - half,
+                        currency=payment.currency,
+                        status=TransactionStatus.succeeded,
+                        meta={"dispute_id": dispute.id, "task_id": dispute.task_id, "split": "50/50", "to": payment.tasker_id},
+                    )
+                payment.status = PaymentStatus.refunded
+
+        dispute.updated_at = datetime.utcnow()
+        db.commit()
+        return dispute
+
+    dispute = with_retry(db, unit)
     create_notification(db, dispute.raised_by_id, "dispute_resolved", "Dispute resolved", payload.note or "", {"dispute_id": dispute.id})
     create_notification(db, dispute.against_user_id, "dispute_resolved", "Dispute resolved", payload.note or "", {"dispute_id": dispute.id})
     log_event(user_id=user.get("id"), action="dispute_resolved", extra={"dispute_id": dispute.id, "resolution": payload.resolution})
@@ -1,24 +1,38 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Query, Request
 from uuid import uuid4
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
 
-from ..schemas import MessageOut, MessageCreate
+from ..schemas import MessageOut, MessageListItemOut, MessageCreate
 from ..security import get_current_user
 from ..rate_limit import check
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models import Message, Task
 from ..notifications import create_notification
 from ..errors import not_found_error, permission_error
 from ..logging_utils import log_event
+from ..serializers import Projection, json_response
 from ..admin_logs import log_admin_action
 from ..request_context import get_request_context
 from ..abuse import ensure_not_blocked, log_device_fingerprint, record_action
+from ..user_summaries import expand_rows, parse_expand
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
 
+# Column projection matching MessageOut, for the list fast path.
+MESSAGE_LIST_FIELDS = Projection(
+    task_id=Message.task_id,
+    sender_id=Message.sender_id,
+    recipient_id=Message.receiver_id,
+    body=Message.content,
+    id=Message.id,
+    created_at=Message.created_at,
+    is_read=Message.is_read,
+)
+
+
 def _serialize_message(msg: Message) -> MessageOut:
     return MessageOut(
         id=msg.id,
@@ -31,22 +45,27 @@ def _serialize_message(msg: Message) -> MessageOut:
     )
 
 
-@router.get("", response_model=List[MessageOut])
-async def list_messages(task_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+@router.get("", response_model=List[MessageListItemOut])
+async def list_messages(
+    task_id: str,
+    expand: Optional[str] = Query(None, description="`user` embeds sender and recipient summaries"),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    expansions = parse_expand(expand)
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise not_found_error("TASK_NOT_FOUND", "Task not found")
     # Only client or assigned tasker or admin can view
     if user.get("role") != "admin" and user.get("id") not in (task.client_id, task.assigned_tasker_id):
         raise permission_error("MESSAGE_FORBIDDEN", "Forbidden")
-    messages = (
-        db.query(Message)
+    messages = MESSAGE_LIST_FIELDS.rows(
+        MESSAGE_LIST_FIELDS.query(db)
         .filter(Message.task_id == task_id)
         .order_by(Message.created_at.asc())
-        .all()
     )
     log_event(user_id=user.get("id"), action="messages_list", extra={"task_id": task_id, "count": len(messages)})
-    return [_serialize_message(m) for m in messages]
+    return json_response(expand_rows(db, messages, expansions, {"sender_id": "sender", "recipient_id": "recipient"}))
 
 
 @router.post("", response_model=MessageOut)
@@ -0,0 +1,20 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from fastapi.responses import PlainTextResponse
+
+from ..config import get_settings
+from ..errors import auth_error
+from ..metrics import render_prometheus
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(authorization: Optional[str] = Header(None)):
+    token = get_settings().metrics_token
+    if token and authorization != f"Bearer {token}":
+        raise auth_error("METRICS_UNAUTHORIZED", "Invalid metrics token")
+    return PlainTextResponse(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -8,15 +8,16 @@ from ..models import Notification
 from ..schemas import NotificationOut, NotificationReadResponse
 from ..errors import not_found_error
 from ..logging_utils import log_event
+from ..repositories import Repositories, get_read_repositories
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
 
 @router.get("", response_model=List[NotificationOut])
-async def list_notifications(user=Depends(get_current_user), db: Session = Depends(get_db)):
-    notes = db.query(Notification).filter(Notification.user_id == user["id"]).order_by(Notification.created_at.desc()).all()
+async def list_notifications(user=Depends(get_current_user), repos: Repositories = Depends(get_read_repositories)):
+    notes = repos.notifications.list({"user_id": user["id"]}, order_by="created_at", desc=True)
     log_event(user_id=user.get("id"), action="notifications_list", extra={"count": len(notes)})
-    return [NotificationOut.from_orm(n) for n in notes]
+    return [NotificationOut(**n) for n in notes]
 
 
 @router.post("/{notification_id}/read", response_model=NotificationReadResponse)
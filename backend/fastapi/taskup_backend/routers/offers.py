@@ -1,27 +1,48 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Query, Request
 from uuid import uuid4
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
-from ..schemas import OfferOut, OfferCreate
+from ..schemas import OfferOut, OfferListItemOut, OfferCreate
 from ..security import get_current_user, require_roles
 from ..rate_limit import check
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models import Offer, Task, OfferStatus, TaskStatus
 from ..notifications import send_in_app_notification
 from ..notifications import create_notification
 from ..errors import permission_error, not_found_error, conflict_error
 from ..logging_utils import log_event
+from ..serializers import Projection, json_response
 from ..admin_logs import log_admin_action
 from ..request_context import get_request_context
 from ..abuse import ensure_not_blocked, log_device_fingerprint, record_action
+from ..user_summaries import expand_rows, parse_expand
 
 router = APIRouter(prefix="/offers", tags=["offers"])
 
+# Column projection matching OfferOut, for the list fast path.
+OFFER_LIST_FIELDS = Projection(
+    task_id=Offer.task_id,
+    amount_cents=Offer.amount,
+    currency=Offer.currency,
+    message=Offer.message,
+    id=Offer.id,
+    tasker_id=Offer.tasker_id,
+    status=Offer.status,
+    created_at=Offer.created_at,
+    updated_at=Offer.updated_at,
+)
 
-@router.get("", response_model=List[OfferOut])
-async def list_offers(task_id: str | None = None, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    query = db.query(Offer)
+
+@router.get("", response_model=List[OfferListItemOut])
+async def list_offers(
+    task_id: str | None = None,
+    expand: Optional[str] = Query(None, description="`user` embeds tasker summaries"),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    expansions = parse_expand(expand)
+    query = OFFER_LIST_FIELDS.query(db)
     if task_id:
         query = query.filter(Offer.task_id == task_id)
     if user.get("role") not in ("admin",):
@@ -30,21 +51,8 @@ async def list_offers(task_id: str | None = None, user=Depends(get_current_user)
             task = db.query(Task).filter(Task.id == task_id).first()
             if not task or (task.client_id != user.get("id") and task.assigned_tasker_id != user.get("id")):
                 raise permission_error("OFFER_FORBIDDEN", "You cannot view these offers")
-    offers = query.order_by(Offer.created_at.desc()).all()
-    return [
-        OfferOut(
-            id=o.id,
-            task_id=o.task_id,
-            tasker_id=o.tasker_id,
-            amount_cents=o.amount,
-            currency=o.currency,
-            message=o.message,
-            status=o.status.value if hasattr(o.status, "value") else o.status,
-            created_at=o.created_at,
-            updated_at=o.updated_at,
-        )
-        for o in offers
-    ]
+    rows = OFFER_LIST_FIELDS.rows(query.order_by(Offer.created_at.desc()))
+    return json_response(expand_rows(db, rows, expansions, {"tasker_id": "tasker"}))
 
 
 @router.post("", response_model=OfferOut)
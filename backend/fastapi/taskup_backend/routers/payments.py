@@ -5,6 +5,7 @@ from datetime import datetime
 from ..schemas import PaymentOut, PaymentCreate, WalletOut, TransactionOut
 from ..security import get_current_user, require_roles
 from ..database import get_db
+from ..loaders import Loaders, get_loaders
 from ..models import (
     Wallet,
     Transaction,
@@ -15,6 +16,7 @@ from ..models import (
     Offer,
     User,
     Task,
+    TaskStatus,
     Dispute,
     DisputeStatus,
 )
@@ -24,16 +26,34 @@ from ..payments_service import _get_wallet, release_escrow_to_tasker
 from ..payments_utils import create_tx
 from ..logging_utils import log_event
 from ..metrics import record_metric
+from ..serializers import Projection, json_response
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 import stripe
 import os
 import json
 from ..errors import not_found_error, conflict_error, internal_error
+from ..concurrency import with_retry
+from ..task_states import dispatch, transition
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 
+# Column projection matching TransactionOut, for the list fast path.
+TRANSACTION_LIST_FIELDS = Projection(
+    id=Transaction.id,
+    wallet_id=Transaction.wallet_id,
+    type=Transaction.type,
+    amount=Transaction.amount,
+    currency=Transaction.currency,
+    stripe_payment_intent_id=Transaction.stripe_payment_intent_id,
+    stripe_payout_id=Transaction.stripe_payout_id,
+    status=Transaction.status,
+    meta=Transaction.meta,
+    created_at=Transaction.created_at,
+)
+
 
 def _transfer_destination_for_user(db: Session, tasker_id: str | None) -> str | None:
     if not tasker_id:
@@ -59,25 +79,12 @@ async def list_transactions(user=Depends(get_current_user), db: Session = Depend
     wallet = db.query(Wallet).filter(Wallet.user_id == user["id"]).first()
     if not wallet:
         return []
-    txs = db.query(Transaction).filter(Transaction.wallet_id == wallet.id).order_by(Transaction.created_at.desc()).all()
+    txs = TRANSACTION_LIST_FIELDS.rows(
+        TRANSACTION_LIST_FIELDS.query(db).filter(Transaction.wallet_id == wallet.id).order_by(Transaction.created_at.desc())
+    )
     log_event(user_id=user.get("id"), action="transactions_list", extra={"wallet_id": wallet.id, "count": len(txs)})
-    record_metric("transactions.list", len(txs), wallet_id=wallet.id)
-    return [
-        TransactionOut(
-            id=t.id,
-            wallet_id=t.wallet_id,
-            type=t.type.value if hasattr(t.type, "value") else t.type,
-            amount=t.amount,
-            currency=t.currency,
-            stripe_payment_intent_id=t.stripe_payment_intent_id,
-            stripe_payout_id=t.stripe_payout_id,
-            stripe_transfer_id=t.stripe_transfer_id,
-            status=t.status.value if hasattr(t.status, "value") else t.status,
-            meta=t.meta,
-            created_at=t.created_at,
-        )
-        for t in txs
-    ]
+    record_metric("transactions.list", len(txs))
+    return json_response(txs)
 
 
 @router.post("/topup-intent")
@@ -91,7 +98,7 @@ async def topup_intent(user=Depends(get_current_user)):
         metadata={"user_id": user.get("id")},
     )
     log_event(user_id=user.get("id"), action="topup_intent", extra={"payment_intent_id": intent["id"]})
-    record_metric("topup.intent", 1, user_id=user.get("id"))
+    record_metric("topup.intent", 1)
     return {"client_secret": intent["client_secret"], "payment_intent_id": intent["id"]}
 
 
@@ -144,91 +151,124 @@ async def create_payment(payload: PaymentCreate, user=Depends(get_current_user),
     db.refresh(payment)
     create_notification(db, user["id"], "payment_created", "Payment initiated", "", {"payment_id": payment.id, "task_id": task.id})
     log_event(user_id=user.get("id"), action="payment_created", extra={"payment_id": payment.id, "amount": payload.amount_cents})
-    record_metric("payment.created", payload.amount_cents, user_id=user.get("id"), currency=payload.currency)
+    record_metric("payment.created", payload.amount_cents, currency=payload.currency)
     return PaymentOut.from_orm(payment)
 
 
 @router.post("/{payment_id}/release")
-async def release_payment(payment_id: str, user=Depends(require_roles("admin", "client")), db: Session = Depends(get_db)):
-    payment = db.query(Payment).filter(Payment.id == payment_id).first()
-    if not payment:
-        raise not_found_error("PAYMENT_NOT_FOUND", "Payment not found")
-    task = db.query(Task).filter(Task.id == payment.task_id).first()
-    offer = db.query(Offer).filter(Offer.id == payment.offer_id).first()
-    if not task or not offer:
-        raise not_found_error("TASK_OR_OFFER_MISSING", "Task or offer missing for release")
-    try:
-        release_escrow_to_tasker(db, payment.client_id, offer.tasker_id, task, offer)
-    except Exception as e:
-        raise conflict_error("PAYMENT_RELEASE_FAILED", str(e))
-    payment = db.query(Payment).filter(Payment.id == payment_id).first()
+async def release_payment(
+    payment_id: str,
+    user=Depends(require_roles("admin", "client")),
+    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
+):
+    def unit() -> Payment:
+        # Payment, task and offer in one round trip instead of three.
+        row = (
+            db.query(Payment, Task, Offer)
+            .outerjoin(Task, Task.id == Payment.task_id)
+            .outerjoin(Offer, Offer.id == Payment.offer_id)
+            .filter(Payment.id == payment_id)
+            .first()
+        )
+        if not row:
+            raise not_found_error("PAYMENT_NOT_FOUND", "Payment not found")
+        payment, task, offer = row
+        if not task or not offer:
+            raise not_found_error("TASK_OR_OFFER_MISSING", "Task or offer missing for release")
+        loaders.payments.add(payment)
+        try:
+            release_escrow_to_tasker(db, payment.client_id, offer.tasker_id, task, offer, loaders=loaders)
+        except StaleDataError:
+            raise
+        except Exception as e:
+            raise conflict_error("PAYMENT_RELEASE_FAILED", str(e))
+        return payment
+
+    payment = with_retry(db, unit)
     log_admin_action(db, user.get("id"), "release_payment", "payment", payment_id, {"task_id": payment.task_id, "offer_id": payment.offer_id})
     log_event(user_id=user.get("id"), action="payment_released", extra={"payment_id": payment.id})
-    record_metric("payment.released", payment.amount, payment_id=payment.id)
+    record_metric("payment.released", payment.amount, currency=payment.currency)
     create_notification(db, payment.tasker_id, "payment_released", "Payment released", "", {"payment_id": payment.id, "task_id": payment.task_id})
     return {"ok": True, "payment": PaymentOut.from_orm(payment)}
 
 
 @router.post("/{payment_id}/refund")
 async def refund_payment(payment_id: str, user=Depends(require_roles("admin", "support", "client")), db: Session = Depends(get_db)):
-    payment = db.query(Payment).filter(Payment.id == payment_id).first()
-    if not payment:
-        raise not_found_error("PAYMENT_NOT_FOUND", "Payment not found")
-    wallet = db.query(Wallet).filter(Wallet.id == payment.wallet_id).first()
-    if not wallet:
-        raise conflict_error("WALLET_NOT_FOUND", "Wallet missing for payment")
-    refund_id = None
-    if stripe.api_key and payment.stripe_payment_intent_id:
-        try:
-            refund = stripe.Refund.create(payment_intent=payment.stripe_payment_intent_id)
-            refund_id = refund["id"]
-        except Exception as e:
-            print(f"[payments] Stripe refund error: {e}")
-    # move funds back to available if still in escrow
-    wallet.escrow_balance = max(0, wallet.escrow_balance - payment.amount)
-    wallet.available_balance += payment.amount
-    payment.status = PaymentStatus.refunded
-    payment.stripe_refund_id = refund_id
-    payment.updated_at = datetime.utcnow()
-    create_tx(
-        db,
-        wallet_id=wallet.id,
-        type_=TransactionType.refund,
-        amount=payment.amount,
-        currency=payment.currency,
-        status=TransactionStatus.succeeded,
-        meta={"payment_id": payment.id, "task_id": payment.task_id},
-        stripe_ids={"refund": refund_id},
-    )
-    db.commit()
+    def unit():
+        payment = db.query(Payment).filter(Payment.id == payment_id).first()
+        if not payment:
+            raise not_found_error("PAYMENT_NOT_FOUND", "Payment not found")
+        if payment.status == PaymentStatus.refunded:
+            raise conflict_error("PAYMENT_ALREADY_REFUNDED", "Payment already refunded")
+        if payment.status != PaymentStatus.escrowed:
+            # Released (or failed/disputed) money is no longer in escrow to give back.
+            raise conflict_error("PAYMENT_NOT_ESCROWED", f"Cannot refund a payment in status {payment.status}")
+        wallet = db.query(Wallet).filter(Wallet.id == payment.wallet_id).first()
+        if not wallet:
+            raise conflict_error("WALLET_NOT_FOUND", "Wallet missing for payment")
+        refund_id = None
+        if stripe.api_key and payment.stripe_payment_intent_id:
+            try:
+                refund = stripe.Refund.create(payment_intent=payment.stripe_payment_intent_id, idempotency_key=f"refund-{payment.id}")
+                refund_id = refund["id"]
+            except Exception as e:
+                print(f"[payments] Stripe refund error: {e}")
+        # move funds back to available if still in escrow
+        wallet.escrow_balance = max(0, wallet.escrow_balance - payment.amount)
+        wallet.available_balance += payment.amount
+        payment.status = PaymentStatus.refunded
+        payment.stripe_refund_id = refund_id
+        payment.updated_at = datetime.utcnow()
+        create_tx(
+            db,
+            wallet_id=wallet.id,
+            type_=TransactionType.refund,
+            amount=payment.amount,
+            currency=payment.currency,
+            status=TransactionStatus.succeeded,
+            meta={"payment_id": payment.id, "task_id": payment.task_id},
+            stripe_ids={"refund": refund_id},
+        )
+        db.commit()
+        return payment, refund_id
+
+    payment, refund_id = with_retry(db, unit)
     db.refresh(payment)
     create_notification(db, payment.client_id, "payment_refunded", "Payment refunded", "", {"payment_id": payment.id})
     log_admin_action(db, user.get("id"), "refund_payment", "payment", payment_id, {"refund_id": refund_id})
     log_event(user_id=user.get("id"), action="payment_refunded", extra={"payment_id": payment.id, "refund_id": refund_id})
-    record_metric("payment.refunded", payment.amount, payment_id=payment.id)
+    record_metric("payment.refunded", payment.amount, currency=payment.currency)
     return {"ok": True, "payment": PaymentOut.from_orm(payment)}
 
 
 @router.post("/payout-request")
 async def payout_request(amount_cents: int, user=Depends(require_roles("tasker", "admin")), db: Session = Depends(get_db)):
-    wallet = db.query(Wallet).filter(Wallet.user_id == user["id"]).first()
-    if not wallet or wallet.available_balance < amount_cents:
-        raise conflict_error("PAYOUT_INSUFFICIENT_BALANCE", "Insufficient available balance")
-    db_user = db.query(User).filter(User.id == user["id"]).first()
     destination = _transfer_destination_for_user(db, user["id"])
-    if not destination:
-        raise conflict_error("PAYOUT_DESTINATION_MISSING", "Stripe Connect account not linked")
-    wallet.available_balance -= amount_cents
-    tx = Transaction(
-        id=str(uuid4()),
-        wallet_id=wallet.id,
-        type=TransactionType.payout,
-        amount=amount_cents,
-        currency=wallet.currency,
-        status=TransactionStatus.pending,
-        created_at=datetime.utcnow(),
-    )
-    db.add(tx)
+
+    def unit():
+        # Debit and pending transaction commit before Stripe is called, so a
+        # version conflict is retried without a payout having been sent.
+        wallet = db.query(Wallet).filter(Wallet.user_id == user["id"]).first()
+        if not wallet or wallet.available_balance < amount_cents:
+            raise conflict_error("PAYOUT_INSUFFICIENT_BALANCE", "Insufficient available balance")
+        if not destination:
+            raise conflict_error("PAYOUT_DESTINATION_MISSING", "Stripe Connect account not linked")
+        wallet.available_balance -= amount_cents
+        tx = Transaction(
+            id=str(uuid4()),
+            wallet_id=wallet.id,
+            type=TransactionType.payout,
+            amount=amount_cents,
+            currency=wallet.currency,
+            status=TransactionStatus.pending,
+            created_at=datetime.utcnow(),
+        )
+        db.add(tx)
+        db.commit()
+        return wallet, tx
+
+    wallet, tx = with_retry(db, unit)
     payout_id = None
     if stripe.api_key and destination:
         try:
@@ -237,6 +277,7 @@ async def payout_request(amount_cents: int, user=Depends(require_roles("tasker",
                 currency=wallet.currency.lower(),
                 metadata={"wallet_id": wallet.id, "user_id": user["id"], "tx_id": tx.id},
                 stripe_account=destination,
+                idempotency_key=f"payout-{tx.id}",
             )
             payout_id = payout["id"]
             tx.stripe_payout_id = payout_id
@@ -249,7 +290,7 @@ async def payout_request(amount_cents: int, user=Depends(require_roles("tasker",
     create_notification(db, user["id"], "payout_requested", "Payout requested", "", {"amount_cents": amount_cents})
     log_admin_action(db, user.get("id"), "payout_request", "wallet", wallet.id, {"amount_cents": amount_cents})
     log_event(user_id=user.get("id"), action="payout_request", extra={"wallet_id": wallet.id, "amount_cents": amount_cents})
-    record_metric("payout.request", amount_cents, wallet_id=wallet.id)
+    record_metric("payout.request", amount_cents, currency=wallet.currency)
     return {"ok": True, "payout_status": tx.status, "payout_id": payout_id}
 
 
@@ -276,7 +317,7 @@ async def create_connect_account_link(user=Depends(require_roles("tasker", "admi
         type="account_onboarding",
     )
     log_event(user_id=user.get("id"), action="connect_account_link", extra={"account_id": account_id})
-    record_metric("connect.account_link", 1, user_id=user.get("id"))
+    record_metric("connect.account_link", 1)
     return {"url": link["url"], "account_id": account_id}
 
 
@@ -371,6 +412,7 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
             create_notification(db, payment.client_id, "payment_refunded", "Payment refunded", "", {"payment_id": payment.id})
         elif event_type == "charge.dispute.created":
             payment.status = PaymentStatus.disputed
+            transition(db, payment.task_id, TaskStatus.disputed, "stripe_dispute_opened", strict=False)
             dispute = ensure_dispute(payment)
             notify_admins(db, "payment_dispute", "Stripe dispute opened", "", {"payment_id": payment.id, "dispute_id": dispute.id})
             create_notification(db, payment.client_id, "dispute_opened", "Dispute opened", "", {"payment_id": payment.id, "dispute_id": dispute.id})
@@ -381,9 +423,11 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
             if outcome == "won":
                 dispute.status = DisputeStatus.resolved_tasker
                 payment.status = PaymentStatus.payment_released
+                transition(db, payment.task_id, TaskStatus.completed, "stripe_dispute_closed", strict=False, data={"outcome": outcome})
             else:
                 dispute.status = DisputeStatus.resolved_client
                 payment.status = PaymentStatus.refunded
+                transition(db, payment.task_id, TaskStatus.cancelled, "stripe_dispute_closed", strict=False, data={"outcome": outcome})
             notify_admins(db, "payment_dispute_closed", "Dispute closed", "", {"payment_id": payment.id, "dispute_id": dispute.id, "outcome": outcome})
             create_notification(db, payment.client_id, "dispute_closed", "Dispute closed", "", {"payment_id": payment.id, "outcome": outcome})
             create_notification(db, payment.tasker_id, "dispute_closed", "Dispute closed", "", {"payment_id": payment.id, "outcome": outcome})
@@ -410,5 +454,6 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
             db.commit()
         notify_admins(db, "payout_failed", "Payout failed", "", {"payout_id": data.get("id")})
 
+    dispatch(db)
     log_event(user_id=None, action="stripe_webhook", extra={"type": event_type, "intent": intent_id})
     return {"received": True}
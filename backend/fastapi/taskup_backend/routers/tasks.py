@@ -1,36 +1,32 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Query, Request
 from uuid import uuid4
 from typing import List, Optional
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from ..schemas import TaskOut, TaskCreate, AcceptOffer
+from ..schemas import TaskOut, TaskListItemOut, TaskDetailOut, OfferDetailOut, UserSummaryOut, TaskCreate, AcceptOffer
 from ..security import get_current_user, require_roles
 from ..rate_limit import check
-from ..database import get_db
-from ..models import Task, Offer, TaskStatus, OfferStatus, User
+from ..database import get_db, get_read_db
+from ..loaders import Loaders, get_loaders
+from ..models import Task, Offer, TaskStatus, OfferStatus, User, Payment
 from ..payments_service import hold_escrow_for_offer, release_escrow_to_tasker
 from ..notifications import create_notification
-from ..errors import TaskUpError, not_found_error, permission_error, conflict_error, auth_error
+from ..errors import TaskUpError, not_found_error, permission_error, conflict_error, auth_error, validation_error
 from ..logging_utils import log_event
-from ..admin_logs import log_admin_action
+from ..serializers import Projection, json_response
 from ..request_context import get_request_context
 from ..abuse import ensure_not_blocked, log_device_fingerprint, record_action
+from ..search import apply_geo, apply_search, search_terms
+from ..user_summaries import expand_rows, parse_expand
+from ..concurrency import with_retry
+from ..dashboard import record_change
+from ..task_states import dispatch, transition
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
-ALLOWED_TRANSITIONS = {
-    TaskStatus.open: {TaskStatus.assigned, TaskStatus.in_progress, TaskStatus.disputed, TaskStatus.cancelled},
-    TaskStatus.assigned: {TaskStatus.in_progress, TaskStatus.disputed, TaskStatus.cancelled},
-    TaskStatus.in_progress: {TaskStatus.awaiting_client_confirmation, TaskStatus.disputed},
-    TaskStatus.awaiting_client_confirmation: {TaskStatus.completed, TaskStatus.disputed},
-    TaskStatus.completed: {TaskStatus.client_confirmed},
-    TaskStatus.disputed: {TaskStatus.cancelled, TaskStatus.completed},
-}
-
-
-def _serialize_task(task: Task, include_offers: bool = False) -> TaskOut:
-    data = {
+def _task_fields(task: Task) -> dict:
+    return {
         "id": task.id,
         "client_id": task.client_id,
         "assigned_offer_id": task.assigned_offer_id,
@@ -48,41 +44,167 @@ def _serialize_task(task: Task, include_offers: bool = False) -> TaskOut:
         "created_at": task.created_at,
         "due_date": task.due_date,
     }
-    if include_offers:
-        data["offers"] = getattr(task, "offers", [])
-    return TaskOut(**data)
 
 
-@router.get("", response_model=List[TaskOut])
-async def list_tasks(status: Optional[str] = None, category: Optional[str] = None, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    query = db.query(Task)
+# id column -> key of the embedded summary with ?expand=user
+TASK_USER_FIELDS = {"client_id": "client", "assigned_tasker_id": "assigned_tasker"}
+
+# Column projection matching TaskOut, for the list fast path.
+TASK_LIST_FIELDS = Projection(
+    title=Task.title,
+    description=Task.description,
+    category=Task.category,
+    location=Task.location,
+    latitude=Task.latitude,
+    longitude=Task.longitude,
+    budget_min=Task.budget_min,
+    budget_max=Task.budget_max,
+    currency=Task.currency,
+    id=Task.id,
+    client_id=Task.client_id,
+    assigned_offer_id=Task.assigned_offer_id,
+    assigned_tasker_id=Task.assigned_tasker_id,
+    status=Task.status,
+    created_at=Task.created_at,
+    due_date=Task.due_date,
+)
+
+
+def _serialize_task(task: Task) -> TaskOut:
+    return TaskOut(**_task_fields(task))
+
+
+def _user_summary(user: User | None) -> UserSummaryOut | None:
+    if user is None:
+        return None
+    return UserSummaryOut(
+        id=user.id,
+        full_name=user.full_name,
+        role=user.role.value if hasattr(user.role, "value") else user.role,
+        kyc_status=user.kyc_status,
+        created_at=user.created_at,
+    )
+
+
+def _serialize_offer_detail(offer: Offer) -> OfferDetailOut:
+    return OfferDetailOut(
+        id=offer.id,
+        task_id=offer.task_id,
+        tasker_id=offer.tasker_id,
+        amount_cents=offer.amount,
+        currency=offer.currency,
+        message=offer.message,
+        status=offer.status.value if hasattr(offer.status, "value") else offer.status,
+        created_at=offer.created_at,
+        updated_at=offer.updated_at,
+        tasker=_user_summary(offer.tasker),
+    )
+
+
+def _serialize_task_detail(task: Task, include_offers: bool, payment_status=None) -> TaskDetailOut:
+    offers = sorted(task.offers, key=lambda o: o.created_at or datetime.min, reverse=True) if include_offers else []
+    return TaskDetailOut(
+        **_task_fields(task),
+        offers=[_serialize_offer_detail(o) for o in offers],
+        assigned_tasker=_user_summary(task.assigned_tasker),
+        payment_status=payment_status.value if hasattr(payment_status, "value") else payment_status,
+    )
+
+
+def _task_rows(db: Session, query, expand: Optional[str]) -> List[dict]:
+    return expand_rows(db, TASK_LIST_FIELDS.rows(query), parse_expand(expand), TASK_USER_FIELDS)
+
+
+@router.get("", response_model=List[TaskListItemOut])
+async def list_tasks(
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    expand: Optional[str] = Query(None, description="`user` embeds client and assigned tasker summaries"),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    query = TASK_LIST_FIELDS.query(db)
     if status:
         query = query.filter(Task.status == status)
     if category:
         query = query.filter(Task.category == category)
-    tasks = query.order_by(Task.created_at.desc()).all()
-    return [_serialize_task(t) for t in tasks]
+    return json_response(_task_rows(db, query.order_by(Task.created_at.desc()), expand))
 
 
-@router.get("/my", response_model=List[TaskOut])
-async def my_tasks(user=Depends(get_current_user), db: Session = Depends(get_db)):
+@router.get("/my", response_model=List[TaskListItemOut])
+async def my_tasks(
+    expand: Optional[str] = Query(None, description="`user` embeds client and assigned tasker summaries"),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
     role = user.get("role")
+    query = TASK_LIST_FIELDS.query(db)
     if role == "tasker":
-        tasks = db.query(Task).filter(Task.assigned_tasker_id == user["id"]).all()
+        query = query.filter(Task.assigned_tasker_id == user["id"])
     else:
-        tasks = db.query(Task).filter(Task.client_id == user["id"]).all()
-    return [_serialize_task(t) for t in tasks]
+        query = query.filter(Task.client_id == user["id"])
+    return json_response(_task_rows(db, query, expand))
 
 
-@router.get("/{task_id}", response_model=TaskOut)
-async def get_task(task_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    task: Task | None = db.query(Task).filter(Task.id == task_id).first()
+@router.get("/search", response_model=List[TaskListItemOut])
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200),
+    status: Optional[TaskStatus] = None,
+    category: Optional[str] = None,
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(25, gt=0, le=500),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    expand: Optional[str] = Query(None, description="`user` embeds client and assigned tasker summaries"),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """Ranked full-text search; every word is a prefix match, so it works for type-ahead."""
+    terms = search_terms(q)
+    if not terms:
+        raise validation_error({"q": ["Search query must contain a word"]})
+    query = TASK_LIST_FIELDS.query(db)
+    if status:
+        query = query.filter(Task.status == status)
+    if category:
+        query = query.filter(Task.category == category)
+    if (lat is None) != (lng is None):
+        raise validation_error({"lat": ["lat and lng must be given together"]})
+    if lat is not None:
+        query = apply_geo(query, lat, lng, radius_km)
+    query = apply_search(query, terms)
+    return json_response(_task_rows(db, query.offset(offset).limit(limit), expand))
+
+
+@router.get("/{task_id}", response_model=TaskDetailOut)
+async def get_task(task_id: str, user=Depends(get_current_user), db: Session = Depends(get_read_db)):
+    # Fixed query count regardless of offer count: task + assigned tasker (join),
+    # offers + their taskers (one selectin), accepted payment status.
+    task: Task | None = (
+        db.query(Task)
+        .options(
+            joinedload(Task.assigned_tasker),
+            selectinload(Task.offers).joinedload(Offer.tasker),
+        )
+        .filter(Task.id == task_id)
+        .first()
+    )
     if not task:
         raise not_found_error("TASK_NOT_FOUND", "Task not found")
     if user.get("role") != "admin" and task.client_id not in (None, user.get("id")) and task.assigned_tasker_id != user.get("id"):
         raise permission_error("TASK_FORBIDDEN", "You cannot access this task")
     include_offers = user.get("role") in ("admin",) or task.client_id == user.get("id")
-    return _serialize_task(task, include_offers=include_offers)
+    payment_status = None
+    if task.assigned_offer_id:
+        payment_status = (
+            db.query(Payment.status)
+            .filter(Payment.task_id == task.id, Payment.offer_id == task.assigned_offer_id)
+            .order_by(Payment.created_at.desc())
+            .limit(1)
+            .scalar()
+        )
+    return _serialize_task_detail(task, include_offers, payment_status)
 
 
 @router.post("", response_model=TaskOut)
@@ -137,106 +259,128 @@ async def update_task(task_id: str, payload: TaskCreate, user=Depends(get_curren
 
 @router.post("/{task_id}/status")
 async def change_status(task_id: str, status: TaskStatus, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    task: Task | None = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise not_found_error("TASK_NOT_FOUND", "Task not found")
-    if user.get("role") != "admin" and task.client_id != user.get("id"):
-        raise permission_error("TASK_FORBIDDEN", "You cannot change this status")
-    current = task.status
-    allowed = ALLOWED_TRANSITIONS.get(current, set())
-    if status not in allowed:
-        raise conflict_error("TASK_STATUS_CONFLICT", f"Invalid transition from {current} to {status}")
-    task.status = status
-    task.updated_at = datetime.utcnow()
+    guards = []
+    if user.get("role") != "admin":
+        guards.append((Task.client_id == user.get("id"), permission_error("TASK_FORBIDDEN", "You cannot change this status")))
+    transition(db, task_id, status, "status_changed", actor=user, guards=guards)
     db.commit()
-    db.refresh(task)
-    create_notification(db, task.client_id, "task_status", f"Status updated to {task.status}", "", {"task_id": task.id, "status": task.status})
-    log_event(user_id=user.get("id"), action="task_status_change", extra={"task_id": task.id, "status": str(task.status)})
-    if user.get("role") == "admin":
-        log_admin_action(db, user.get("id"), "task_status_change", "task", task.id, {"status": str(task.status)})
-    return {"ok": True, "status": task.status}
+    dispatch(db)
+    log_event(user_id=user.get("id"), action="task_status_change", extra={"task_id": task_id, "status": str(status)})
+    return {"ok": True, "status": status}
 
 
 @router.post("/{task_id}/accept-offer")
-async def accept_offer(task_id: str, payload: AcceptOffer, user=Depends(require_roles("client", "admin")), db: Session = Depends(get_db)):
-    task: Task | None = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise not_found_error("TASK_NOT_FOUND", "Task not found")
-    if user.get("role") != "admin" and task.client_id != user.get("id"):
-        raise permission_error("TASK_FORBIDDEN", "Only the client can accept offers")
-
-    offer: Offer | None = db.query(Offer).filter(Offer.id == payload.offer_id, Offer.task_id == task_id).first()
-    if not offer:
-        raise not_found_error("OFFER_NOT_FOUND", "Offer not found")
-    # Reject other offers
-    db.query(Offer).filter(Offer.task_id == task_id, Offer.id != payload.offer_id).update({"status": OfferStatus.rejected})
-    offer.status = OfferStatus.accepted
-    task.assigned_offer_id = offer.id
-    task.assigned_tasker_id = offer.tasker_id
-    task.status = TaskStatus.in_progress
-    # Escrow hold
-    try:
-        hold_escrow_for_offer(db, task.client_id, task, offer)
-    except ValueError as e:
-        raise conflict_error("PAYMENT_ESCROW_FAILED", str(e))
-    db.commit()
-    db.refresh(task)
-    create_notification(db, offer.tasker_id, "offer_accepted", "Offer accepted", f"Your offer on {task.title} was accepted", {"task_id": task_id, "offer_id": offer.id})
-    log_event(user_id=user.get("id"), action="offer_accepted", extra={"task_id": task.id, "offer_id": offer.id})
-    log_admin_action(db, user.get("id"), "accept_offer", "task", task.id, {"offer_id": offer.id})
-    return {"ok": True, "task_status": task.status}
+async def accept_offer(
+    task_id: str,
+    payload: AcceptOffer,
+    user=Depends(require_roles("client", "admin")),
+    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
+):
+    def unit():
+        # Task and the offer being accepted in one round trip.
+        row = (
+            db.query(Task, Offer)
+            .outerjoin(Offer, (Offer.id == payload.offer_id) & (Offer.task_id == Task.id))
+            .filter(Task.id == task_id)
+            .first()
+        )
+        task: Task | None = row[0] if row else None
+        if not task:
+            raise not_found_error("TASK_NOT_FOUND", "Task not found")
+        if user.get("role") != "admin" and task.client_id != user.get("id"):
+            raise permission_error("TASK_FORBIDDEN", "Only the client can accept offers")
+
+        offer: Offer | None = row[1]
+        if not offer:
+            raise not_found_error("OFFER_NOT_FOUND", "Offer not found")
+        # Guarded on the current status: a concurrent accept that won the race gets a 409 here.
+        transition(
+            db,
+            task_id,
+            TaskStatus.in_progress,
+            "offer_accepted",
+            actor=user,
+            values={"assigned_offer_id": offer.id, "assigned_tasker_id": offer.tasker_id},
+            data={"offer_id": offer.id},
+        )
+        # Reject the other pending offers; a bulk update skips the dashboard flush hooks, so report it.
+        rejected = db.query(Offer).filter(Offer.task_id == task_id, Offer.id != payload.offer_id, Offer.status == OfferStatus.pending).update(
+            {"status": OfferStatus.rejected, "version": Offer.version + 1}, synchronize_session=False
+        )
+        record_change(db, "offers", OfferStatus.pending, OfferStatus.rejected, count=rejected)
+        offer.status = OfferStatus.accepted
+        # Escrow hold (commits the transition, offers, wallet and payment together)
+        try:
+            hold_escrow_for_offer(db, task.client_id, task, offer, loaders=loaders)
+        except ValueError as e:
+            raise conflict_error("PAYMENT_ESCROW_FAILED", str(e))
+        db.commit()
+        return offer
+
+    offer = with_retry(db, unit)
+    dispatch(db)
+    log_event(user_id=user.get("id"), action="offer_accepted", extra={"task_id": task_id, "offer_id": offer.id})
+    return {"ok": True, "task_status": TaskStatus.in_progress}
 
 
 @router.post("/{task_id}/mark-done")
 async def mark_done(task_id: str, user=Depends(require_roles("tasker", "admin")), db: Session = Depends(get_db)):
-    task: Task | None = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise not_found_error("TASK_NOT_FOUND", "Task not found")
-    if user.get("role") != "admin" and task.assigned_tasker_id != user.get("id"):
-        raise permission_error("TASK_FORBIDDEN", "Only assigned tasker can mark done")
-    task.status = TaskStatus.awaiting_client_confirmation
-    task.updated_at = datetime.utcnow()
+    guards = []
+    if user.get("role") != "admin":
+        guards.append((Task.assigned_tasker_id == user.get("id"), permission_error("TASK_FORBIDDEN", "Only assigned tasker can mark done")))
+    transition(db, task_id, TaskStatus.awaiting_client_confirmation, "marked_done", actor=user, guards=guards)
     db.commit()
-    create_notification(db, task.client_id, "task_marked_done", "Task marked done", "", {"task_id": task_id})
-    log_event(user_id=user.get("id"), action="task_marked_done", extra={"task_id": task.id})
-    return {"ok": True, "status": task.status}
+    dispatch(db)
+    log_event(user_id=user.get("id"), action="task_marked_done", extra={"task_id": task_id})
+    return {"ok": True, "status": TaskStatus.awaiting_client_confirmation}
 
 
 @router.post("/{task_id}/confirm-received")
-async def confirm_received(task_id: str, user=Depends(require_roles("client", "admin")), db: Session = Depends(get_db)):
-    task: Task | None = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise not_found_error("TASK_NOT_FOUND", "Task not found")
-    if user.get("role") != "admin" and task.client_id != user.get("id"):
-        raise permission_error("TASK_FORBIDDEN", "Only the client can confirm delivery")
-    if not task.assigned_offer_id or not task.assigned_tasker_id:
-        raise conflict_error("TASK_NO_ACCEPTED_OFFER", "No accepted offer to release")
-    offer = db.query(Offer).filter(Offer.id == task.assigned_offer_id).first()
-    if not offer:
-        raise not_found_error("OFFER_NOT_FOUND", "Accepted offer missing")
-    try:
-        release_escrow_to_tasker(db, task.client_id, task.assigned_tasker_id, task, offer)
-    except ValueError as e:
-        raise conflict_error("PAYMENT_RELEASE_FAILED", str(e))
-    task.status = TaskStatus.completed
-    task.updated_at = datetime.utcnow()
-    db.commit()
-    create_notification(db, task.assigned_tasker_id, "payment_released", "Payment released", "", {"task_id": task_id})
-    log_event(user_id=user.get("id"), action="payment_released_task", extra={"task_id": task.id, "offer_id": offer.id})
-    return {"ok": True, "status": task.status}
+async def confirm_received(
+    task_id: str,
+    user=Depends(require_roles("client", "admin")),
+    db: Session = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
+):
+    def unit():
+        # Task, its accepted offer and that offer's payment in one round trip.
+        row = (
+            db.query(Task, Offer, Payment)
+            .outerjoin(Offer, Offer.id == Task.assigned_offer_id)
+            .outerjoin(Payment, Payment.offer_id == Task.assigned_offer_id)
+            .filter(Task.id == task_id)
+            .first()
+        )
+        task: Task | None = row[0] if row else None
+        if not task:
+            raise not_found_error("TASK_NOT_FOUND", "Task not found")
+        if user.get("role") != "admin" and task.client_id != user.get("id"):
+            raise permission_error("TASK_FORBIDDEN", "Only the client can confirm delivery")
+        if not task.assigned_offer_id or not task.assigned_tasker_id:
+            raise conflict_error("TASK_NO_ACCEPTED_OFFER", "No accepted offer to release")
+        offer: Offer | None = row[1]
+        if not offer:
+            raise not_found_error("OFFER_NOT_FOUND", "Accepted offer missing")
+        transition(db, task_id, TaskStatus.completed, "delivery_confirmed", actor=user, data={"offer_id": offer.id})
+        loaders.payments.add(row[2])
+        try:
+            release_escrow_to_tasker(db, task.client_id, task.assigned_tasker_id, task, offer, loaders=loaders)
+        except ValueError as e:
+            raise conflict_error("PAYMENT_RELEASE_FAILED", str(e))
+        db.commit()
+        return offer
+
+    offer = with_retry(db, unit)
+    dispatch(db)
+    log_event(user_id=user.get("id"), action="payment_released_task", extra={"task_id": task_id, "offer_id": offer.id})
+    return {"ok": True, "status": TaskStatus.completed}
 
 
 @router.post("/{task_id}/dispute")
 async def dispute_task(task_id: str, reason: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    task: Task | None = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise not_found_error("TASK_NOT_FOUND", "Task not found")
-    task.status = TaskStatus.disputed
-    task.updated_at = datetime.utcnow()
+    transition(db, task_id, TaskStatus.disputed, "disputed", actor=user, data={"reason": reason})
     db.commit()
-    create_notification(db, task.client_id, "dispute_opened", "Dispute opened", reason, {"task_id": task_id})
-    create_notification(db, task.assigned_tasker_id or task.client_id, "dispute_opened", "Dispute opened", reason, {"task_id": task_id})
-    log_event(user_id=user.get("id"), action="dispute_opened", extra={"task_id": task.id})
-    if user.get("role") == "admin":
-        log_admin_action(db, user.get("id"), "dispute_marked", "task", task.id, {"reason": reason})
-    return {"ok": True, "status": task.status}
+    dispatch(db)
+    log_event(user_id=user.get("id"), action="dispute_opened", extra={"task_id": task_id})
+    return {"ok": True, "status": TaskStatus.disputed}
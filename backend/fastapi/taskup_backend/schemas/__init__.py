@@ -48,6 +48,20 @@ class UserOut(UserBase):
         from_attributes = True
 
 
+class UserSummaryOut(BaseModel):
+    """Public profile fields safe to embed in other users' responses."""
+    id: str
+    full_name: Optional[str] = None
+    role: UserRole
+    kyc_status: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+        from_attributes = True
+        use_enum_values = True
+
+
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
@@ -167,6 +181,27 @@ class OfferOut(OfferBase):
         use_enum_values = True
 
 
+class OfferListItemOut(OfferOut):
+    """List row; `tasker` is filled with ?expand=user."""
+    tasker: Optional[UserSummaryOut] = None
+
+
+class OfferDetailOut(OfferOut):
+    tasker: Optional[UserSummaryOut] = None
+
+
+class TaskListItemOut(TaskOut):
+    """List row; `client` and `assigned_tasker` are filled with ?expand=user."""
+    client: Optional[UserSummaryOut] = None
+    assigned_tasker: Optional[UserSummaryOut] = None
+
+
+class TaskDetailOut(TaskOut):
+    offers: List[OfferDetailOut] = []
+    assigned_tasker: Optional[UserSummaryOut] = None
+    payment_status: Optional[PaymentStatus] = None
+
+
 # Wallet / Transactions
 class WalletOut(BaseModel):
     id: str
@@ -223,6 +258,7 @@ class PaymentOut(BaseModel):
 
     class Config:
         orm_mode = True
+        from_attributes = True
         allow_population_by_field_name = True
         use_enum_values = True
 
@@ -249,6 +285,12 @@ class MessageOut(MessageBase):
         from_attributes = True
 
 
+class MessageListItemOut(MessageOut):
+    """List row; `sender` and `recipient` are filled with ?expand=user."""
+    sender: Optional[UserSummaryOut] = None
+    recipient: Optional[UserSummaryOut] = None
+
+
 # Dispute
 class DisputeBase(BaseModel):
     task_id: str
@@ -278,6 +320,7 @@ class DisputeOut(DisputeBase):
 
     class Config:
         orm_mode = True
+        from_attributes = True
         use_enum_values = True
 
 
@@ -0,0 +1,142 @@
+"""
+Full-text search over tasks (title, description, category, location).
+
+  - Postgres: a GIN expression index over a weighted `tsvector` (title A,
+    category B, location C, description D) with the `simple` configuration
+    (no stemming: listings mix Norwegian and English). Queries use the same
+    expression, so the planner picks the index; Postgres keeps it current on
+    every INSERT/UPDATE.
+  - SQLite (tests, local dev): an external-content FTS5 table `tasks_fts`
+    kept in sync by triggers on tasks; the UPDATE trigger only fires for the
+    indexed columns, so status changes never touch the index.
+
+Every query term is matched as a prefix (type-ahead) and all terms must
+match. Results are ranked by ts_rank_cd / bm25 with the same column weights.
+Other dialects (or SQLite builds without FTS5) fall back to LIKE matching
+ordered by recency.
+
+The index is created with the tasks table (metadata.create_all); for an
+existing database run ensure_search_index(engine) once or see MIGRATIONS.md.
+"""
+import logging
+import math
+import re
+import weakref
+from typing import List
+
+from sqlalchemy import column, event, func, literal_column, or_, table, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Query
+
+from .models import Task
+
+logger = logging.getLogger("taskup.search")
+
+MAX_TERMS = 8
+SQLITE_FTS_TABLE = "tasks_fts"
+POSTGRES_INDEX = "tasks_search_idx"
+
+# engine -> whether tasks_fts exists (SQLite), so searches don't probe sqlite_master every time
+_fts_ready: "weakref.WeakKeyDictionary[Engine, bool]" = weakref.WeakKeyDictionary()
+
+PG_TSVECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(location, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'D')"
+)
+_fts = table(SQLITE_FTS_TABLE, column("rowid"))
+# bm25 weights in FTS5 column order: title, description, category, location
+SQLITE_BM25 = f"bm25({SQLITE_FTS_TABLE}, 10.0, 1.0, 4.0, 2.0)"
+
+_SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5("
+    "title, description, category, location, content='tasks', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, description, category, location) "
+    "VALUES (new.rowid, new.title, new.description, new.category, new.location); END",
+    f"CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, title, description, category, location) "
+    "VALUES ('delete', old.rowid, old.title, old.description, old.category, old.location); END",
+    f"CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description, category, location ON tasks BEGIN "
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, title, description, category, location) "
+    "VALUES ('delete', old.rowid, old.title, old.description, old.category, old.location); "
+    f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, description, category, location) "
+    "VALUES (new.rowid, new.title, new.description, new.category, new.location); END",
+]
+
+
+def _has_fts5(connection: Connection) -> bool:
+    try:
+        return bool(connection.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar())
+    except Exception:  # pragma: no cover - very old SQLite
+        return False
+
+
+def ensure_search_index(bind) -> None:
+    """Create the full-text index for the bind's dialect if missing (idempotent)."""
+    if isinstance(bind, Engine):
+        with bind.begin() as connection:
+            return ensure_search_index(connection)
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        bind.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {POSTGRES_INDEX} ON tasks USING GIN (({PG_TSVECTOR}))")
+    elif dialect == "sqlite" and _has_fts5(bind):
+        exists = bind.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = ?", (SQLITE_FTS_TABLE,)).scalar()
+        for statement in _SQLITE_DDL:
+            bind.exec_driver_sql(statement)
+        if not exists:
+            bind.exec_driver_sql(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+        _fts_ready[bind.engine] = True
+    else:
+        logger.warning("No full-text index for dialect %s; task search falls back to LIKE", dialect)
+
+
+def _drop_search_index(target, connection, **kw) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}")
+        _fts_ready.pop(connection.engine, None)
+
+
+event.listen(Task.__table__, "after_create", lambda target, connection, **kw: ensure_search_index(connection))
+event.listen(Task.__table__, "before_drop", _drop_search_index)
+
+
+def search_terms(q: str) -> List[str]:
+    """Lower-cased word tokens of `q` (punctuation and query operators dropped)."""
+    return re.findall(r"\w+", q.lower())[:MAX_TERMS]
+
+
+def _sqlite_fts_ready(query: Query) -> bool:
+    engine = query.session.get_bind()
+    if engine not in _fts_ready:
+        with engine.connect() as connection:
+            _fts_ready[engine] = bool(connection.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = ?", (SQLITE_FTS_TABLE,)).scalar())
+    return _fts_ready[engine]
+
+
+def apply_search(query: Query, terms: List[str]) -> Query:
+    """Restrict a tasks query to rows matching every term (as a prefix), ordered by relevance."""
+    dialect = query.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery("simple", " & ".join(f"{t}:*" for t in terms))
+        vector = literal_column(f"({PG_TSVECTOR})")
+        return query.filter(vector.op("@@")(tsquery)).order_by(func.ts_rank_cd(vector, tsquery).desc(), Task.created_at.desc())
+    if dialect == "sqlite" and _sqlite_fts_ready(query):
+        match = " ".join(f'"{t}"*' for t in terms)
+        return (
+            query.join(_fts, _fts.c.rowid == literal_column("tasks.rowid"))
+            .filter(text(f"{SQLITE_FTS_TABLE} MATCH :fts_match").bindparams(fts_match=match))
+            .order_by(text(SQLITE_BM25), Task.created_at.desc())
+        )
+    columns = (Task.title, Task.description, Task.category, Task.location)
+    for term in terms:
+        query = query.filter(or_(*(func.lower(c).like(f"%{term}%") for c in columns)))
+    return query.order_by(Task.created_at.desc())
+
+
+def apply_geo(query: Query, lat: float, lng: float, radius_km: float) -> Query:
+    """Bounding box around (lat, lng); cheap on the raw columns, approximate at the corners."""
+    dlat = radius_km / 111.0
+    dlng = radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+    return query.filter(Task.latitude.between(lat - dlat, lat + dlat), Task.longitude.between(lng - dlng, lng + dlng))
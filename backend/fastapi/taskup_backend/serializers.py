@@ -0,0 +1,54 @@
+"""
+Fast path for list endpoints.
+
+Instead of loading ORM objects, building a pydantic model per row and then
+letting FastAPI validate `response_model` a second time, list routes select
+only the response columns as tuples, zip them into dicts and hand the list
+straight to an ORJSONResponse (stdlib json when orjson is not installed).
+
+Routes keep `response_model=` for the OpenAPI schema; a Projection's field
+names must match that model exactly (tests compare both paths).
+"""
+import enum
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, List
+
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy.orm import Query, Session
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson optional
+    orjson = None
+
+
+class Projection:
+    """Named column projection: `Projection(id=Task.id, amount_cents=Offer.amount, ...)`."""
+
+    def __init__(self, **columns: Any):
+        self.fields = tuple(columns)
+        self.columns = tuple(column.label(name) for name, column in columns.items())
+
+    def query(self, db: Session) -> Query:
+        return db.query(*self.columns)
+
+    def rows(self, rows: Iterable[tuple]) -> List[dict]:
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in rows]
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_response(content: Any, status_code: int = 200) -> Response:
+    """Serialize already-shaped rows without another validation pass."""
+    if orjson is not None:
+        return ORJSONResponse(content, status_code=status_code)
+    body = json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":"))
+    return Response(body, status_code=status_code, media_type="application/json")
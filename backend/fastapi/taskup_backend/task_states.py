@@ -0,0 +1,239 @@
+"""
+Task state machine: the one place task status changes.
+
+ALLOWED_TRANSITIONS is the transition table. `transition()` applies a change
+as a single conditional statement,
+
+    UPDATE tasks SET status = :to, version = version + 1, ...
+    WHERE id = :id AND status IN (<states allowed to move to :to>) [AND <guards>]
+    RETURNING client_id, assigned_tasker_id, title
+
+so two requests can't both pass the check and the happy path needs no prior
+read. Only when nothing matched is the row read once, to return 404, the
+failing guard's error (e.g. 403) or 409 TASK_STATUS_CONFLICT.
+
+Because the UPDATE bypasses the ORM flush, the dashboard delta is recorded
+here: the previous status is known from the WHERE when only one state may
+enter `to`, or from the task already loaded in the session; otherwise the
+dashboard recounts after commit.
+
+Side effects (notifications, audit rows) are hooks registered per event with
+`@on(event)`. A transition is queued on the session and only becomes
+dispatchable when its transaction commits (a rollback, e.g. a retried
+version conflict, drops it). `dispatch(db)` then runs every hook once per
+event for the whole batch and writes everything in one commit. Escrow stays in
+the handlers' transaction, because money has to move atomically with the
+status.
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, event, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.sql import ColumnElement
+
+from .admin_logs import add_admin_action
+from .dashboard import invalidate_on_commit, record_change
+from .errors import TaskUpError, conflict_error, not_found_error
+from .models import Task, TaskStatus
+from .notifications import add_notification, send_push_notification
+
+logger = logging.getLogger("taskup")
+
+ALLOWED_TRANSITIONS = {
+    TaskStatus.open: {TaskStatus.assigned, TaskStatus.in_progress, TaskStatus.disputed, TaskStatus.cancelled},
+    TaskStatus.assigned: {TaskStatus.in_progress, TaskStatus.disputed, TaskStatus.cancelled},
+    TaskStatus.in_progress: {TaskStatus.awaiting_client_confirmation, TaskStatus.disputed},
+    TaskStatus.awaiting_client_confirmation: {TaskStatus.completed, TaskStatus.disputed},
+    TaskStatus.completed: {TaskStatus.client_confirmed},
+    TaskStatus.disputed: {TaskStatus.cancelled, TaskStatus.completed},
+}
+
+# target status -> statuses it may be entered from
+SOURCES: Dict[TaskStatus, frozenset] = {
+    target: frozenset(s for s, targets in ALLOWED_TRANSITIONS.items() if target in targets) for target in TaskStatus
+}
+
+_PENDING = "task_transitions_pending"
+_COMMITTED = "task_transitions_committed"
+
+Guard = Tuple[ColumnElement, TaskUpError]
+
+
+@dataclass
+class Transition:
+    event: str
+    task_id: str
+    to: TaskStatus
+    client_id: str
+    tasker_id: Optional[str]
+    title: str
+    actor: Dict[str, Any] = field(default_factory=dict)
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def by_admin(self) -> bool:
+        return self.actor.get("role") == "admin"
+
+
+Hook = Callable[[Session, List[Transition]], None]
+_HOOKS: Dict[str, List[Hook]] = defaultdict(list)
+
+
+def on(*events: str) -> Callable[[Hook], Hook]:
+    """Register `hook(db, transitions)` to run after commit for a batch of these events."""
+
+    def register(hook: Hook) -> Hook:
+        for name in events:
+            _HOOKS[name].append(hook)
+        return hook
+
+    return register
+
+
+def can_transition(current: TaskStatus, to: TaskStatus) -> bool:
+    return current in SOURCES[to]
+
+
+def transition(
+    db: Session,
+    task_id: str,
+    to: TaskStatus,
+    event: str,
+    *,
+    actor: Optional[Dict[str, Any]] = None,
+    guards: Sequence[Guard] = (),
+    values: Optional[Dict[str, Any]] = None,
+    data: Optional[Dict[str, Any]] = None,
+    strict: bool = True,
+) -> Optional[Transition]:
+    """
+    Move task `task_id` to `to` in the current transaction (the caller commits).
+    `values` are extra columns set by the same statement. With strict=False an
+    illegal or failed transition returns None instead of raising.
+    """
+    stmt = (
+        update(Task)
+        .where(Task.id == task_id, Task.status.in_(SOURCES[to]), *(cond for cond, _ in guards))
+        .values(status=to, version=Task.version + 1, **(values or {}))
+        .returning(Task.client_id, Task.assigned_tasker_id, Task.title)
+        .execution_options(synchronize_session="fetch")
+    )
+    previous = _known_status(db, task_id, to)
+    row = db.execute(stmt).first()
+    if row is None:
+        if not strict:
+            return None
+        raise _rejection(db, task_id, to, guards)
+    if previous is None:
+        invalidate_on_commit(db)
+    else:
+        record_change(db, "tasks", previous, to)
+    moved = Transition(event, task_id, to, row.client_id, row.assigned_tasker_id, row.title, dict(actor or {}), dict(data or {}))
+    db.info.setdefault(_PENDING, []).append(moved)
+    return moved
+
+
+def _known_status(db: Session, task_id: str, to: TaskStatus) -> Optional[TaskStatus]:
+    """The status the task is moving from, if it is known without a read."""
+    sources = SOURCES[to]
+    if len(sources) == 1:
+        return next(iter(sources))
+    loaded = db.identity_map.get(identity_key(Task, task_id))
+    status = loaded.__dict__.get("status") if loaded is not None else None
+    return status if status in sources else None
+
+
+def _rejection(db: Session, task_id: str, to: TaskStatus, guards: Sequence[Guard]) -> TaskUpError:
+    checks = [case((cond, True), else_=False) for cond, _ in guards]
+    row = db.query(Task.status, *checks).filter(Task.id == task_id).first()
+    if row is None:
+        return not_found_error("TASK_NOT_FOUND", "Task not found")
+    for (_, error), passed in zip(guards, row[1:]):
+        if not passed:
+            return error
+    return conflict_error("TASK_STATUS_CONFLICT", f"Invalid transition from {row.status} to {to}")
+
+
+@event.listens_for(Session, "after_commit")
+def _committed(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        session.info.setdefault(_COMMITTED, []).extend(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _rolled_back(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def dispatch(db: Session) -> int:
+    """Run hooks for committed transitions, batched per event, with a single commit. Returns the batch size."""
+    batch: List[Transition] = db.info.pop(_COMMITTED, [])
+    if not batch:
+        return 0
+    by_event: Dict[str, List[Transition]] = defaultdict(list)
+    for moved in batch:
+        by_event[moved.event].append(moved)
+    for name, moves in by_event.items():
+        for hook in _HOOKS.get(name, ()):
+            try:
+                hook(db, moves)
+            except Exception:
+                # The status change is committed; a failing side effect must not fail the request.
+                logger.exception("task transition hook failed", extra={"event": name, "hook": getattr(hook, "__name__", repr(hook))})
+    db.commit()
+    return len(batch)
+
+
+def _notify(db: Session, user_id: Optional[str], type_: str, title: str, body: str, data: Dict[str, Any]) -> None:
+    if user_id:
+        add_notification(db, user_id, type_, title, body, data)
+        send_push_notification(user_id, title, body, data)
+
+
+@on("status_changed")
+def _status_changed(db: Session, moves: List[Transition]) -> None:
+    for t in moves:
+        _notify(db, t.client_id, "task_status", f"Status updated to {t.to}", "", {"task_id": t.task_id, "status": t.to})
+        if t.by_admin:
+            add_admin_action(db, t.actor["id"], "task_status_change", "task", t.task_id, {"status": str(t.to)})
+
+
+@on("offer_accepted")
+def _offer_accepted(db: Session, moves: List[Transition]) -> None:
+    for t in moves:
+        offer_id = t.data.get("offer_id")
+        _notify(db, t.tasker_id, "offer_accepted", "Offer accepted", f"Your offer on {t.title} was accepted", {"task_id": t.task_id, "offer_id": offer_id})
+        add_admin_action(db, t.actor.get("id"), "accept_offer", "task", t.task_id, {"offer_id": offer_id})
+
+
+@on("marked_done")
+def _marked_done(db: Session, moves: List[Transition]) -> None:
+    for t in moves:
+        _notify(db, t.client_id, "task_marked_done", "Task marked done", "", {"task_id": t.task_id})
+
+
+@on("delivery_confirmed")
+def _delivery_confirmed(db: Session, moves: List[Transition]) -> None:
+    for t in moves:
+        _notify(db, t.tasker_id, "payment_released", "Payment released", "", {"task_id": t.task_id})
+
+
+@on("disputed")
+def _disputed(db: Session, moves: List[Transition]) -> None:
+    for t in moves:
+        reason = t.data.get("reason") or ""
+        _notify(db, t.client_id, "dispute_opened", "Dispute opened", reason, {"task_id": t.task_id})
+        _notify(db, t.tasker_id or t.client_id, "dispute_opened", "Dispute opened", reason, {"task_id": t.task_id})
+        if t.by_admin:
+            add_admin_action(db, t.actor["id"], "dispute_marked", "task", t.task_id, {"reason": reason})
+
+
+@on("dispute_opened")
+def _dispute_opened(db: Session, moves: List[Transition]) -> None:
+    for t in moves:
+        _notify(db, t.data.get("against_user_id"), "dispute_opened", "Dispute opened", t.data.get("reason") or "", {"task_id": t.task_id})
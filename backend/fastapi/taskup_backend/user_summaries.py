@@ -0,0 +1,122 @@
+"""
+User summaries (id, full_name, role, kyc_status, created_at) embedded in list responses
+with `?expand=user`, so clients don't look up every client/tasker/sender id
+one by one.
+
+All ids referenced by a response are resolved together: hot profiles come
+from a short-TTL process cache, the rest from one `IN` query. A User update
+through the ORM drops that user's entry on this worker (bulk
+`query(User).update()` callers call `SUMMARIES.invalidate` themselves); other
+workers see the change once the TTL expires (TASKUP_USER_SUMMARY_TTL,
+default 30s).
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .errors import validation_error
+from .models import User
+from .serializers import Projection
+
+EXPANSIONS = frozenset({"user"})
+MAX_CACHED_USERS = 50_000
+
+# Same fields as schemas.UserSummaryOut, which the detail endpoints serialize.
+USER_SUMMARY_FIELDS = Projection(id=User.id, full_name=User.full_name, role=User.role, kyc_status=User.kyc_status, created_at=User.created_at)
+
+
+class UserSummaryCache:
+    """user id -> (expiry, summary dict), bounded."""
+
+    def __init__(self, ttl: float, max_users: int = MAX_CACHED_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, ids: Iterable[str], now: Optional[float] = None) -> Dict[str, dict]:
+        now = time.monotonic() if now is None else now
+        found = {}
+        for user_id in ids:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                found[user_id] = entry[1]
+        self.hits += len(found)
+        return found
+
+    def put_many(self, summaries: Iterable[dict], now: Optional[float] = None) -> None:
+        if self.ttl <= 0:
+            return
+        expires = (time.monotonic() if now is None else now) + self.ttl
+        with self._lock:
+            if len(self._entries) >= self.max_users:
+                self._entries.clear()
+            for summary in summaries:
+                self._entries[summary["id"]] = (expires, summary)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+SUMMARIES = UserSummaryCache(ttl=get_settings().user_summary_ttl_seconds)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_summary(mapper, connection, target: User) -> None:
+    SUMMARIES.invalidate(target.id)
+
+
+def parse_expand(expand: Optional[str]) -> frozenset:
+    """`expand=user[,...]` query parameter -> set of expansions; unknown names are a 400."""
+    if not expand:
+        return frozenset()
+    names = frozenset(part.strip() for part in expand.split(",") if part.strip())
+    unknown = names - EXPANSIONS
+    if unknown:
+        raise validation_error({"expand": [f"Unknown expansion: {', '.join(sorted(unknown))}"]})
+    return names
+
+
+def load_user_summaries(db: Session, ids: Iterable[str]) -> Dict[str, dict]:
+    wanted = {i for i in ids if i}
+    found = SUMMARIES.get_many(wanted)
+    missing = wanted - found.keys()
+    if missing:
+        SUMMARIES.misses += len(missing)
+        rows = USER_SUMMARY_FIELDS.rows(USER_SUMMARY_FIELDS.query(db).filter(User.id.in_(missing)))
+        for row in rows:
+            row["role"] = row["role"].value if hasattr(row["role"], "value") else row["role"]
+        SUMMARIES.put_many(rows)
+        found.update((row["id"], row) for row in rows)
+    return found
+
+
+def expand_users(db: Session, rows: List[dict], fields: Mapping[str, str]) -> List[dict]:
+    """
+    Add a summary under `fields[id_field]` for each `id_field` of every row,
+    e.g. {"client_id": "client"}; unknown ids become None.
+    """
+    summaries = load_user_summaries(db, (row.get(id_field) for row in rows for id_field in fields))
+    for row in rows:
+        for id_field, key in fields.items():
+            row[key] = summaries.get(row.get(id_field))
+    return rows
+
+
+def expand_rows(db: Session, rows: List[dict], expand: frozenset, user_fields: Mapping[str, str]) -> List[dict]:
+    if "user" in expand:
+        expand_users(db, rows, user_fields)
+    return rows
+
@@ -9,6 +9,12 @@ from taskup_backend.app import create_app
 from taskup_backend.models import Base, User, UserRole, Wallet, Task, Offer, Message, Payment, Transaction
 from taskup_backend.security import create_token, hash_password
 from taskup_backend.database import get_db
+from taskup_backend.query_stats import count_queries
+from benchmarks.datagen import generate, size_to_users
+
+
+def pytest_addoption(parser):
+    parser.addoption("--synthetic-size", default="10k", help="default size for the synthetic_data fixture (10k, 100k, 1m, 10m or a user count)")
 
 
 @pytest.fixture(scope="session")
@@ -39,6 +45,23 @@ def session(db_session):
     db.close()
 
 
+@pytest.fixture
+def query_counter(engine):
+    """Usage: `with query_counter() as q: ...` then assert on q.count."""
+    return lambda: count_queries(engine)
+
+
+@pytest.fixture
+def synthetic_data(request, session, engine):
+    """
+    Deterministic synthetic rows (benchmarks.datagen) in the test DB; returns
+    row counts per table. Size via `@pytest.mark.parametrize("synthetic_data",
+    ["1m"], indirect=True)` or --synthetic-size.
+    """
+    size = getattr(request, "param", None) or request.config.getoption("--synthetic-size")
+    return generate(engine, size_to_users(size), seed=1)
+
+
 @pytest.fixture(scope="function")
 def client(session):
     app = create_app()
@@ -16,3 +16,11 @@ def test_message_create_forbidden_nonparticipant(client, session, user_client):
     payload = {"task_id": "missing", "sender_id": user_client.id, "recipient_id": "someone", "body": "hi"}
     resp = client.post("/api/messages", json=payload, headers={"Authorization": f"Bearer {create_token(user_client.id, user_client.email)}"})
     assert resp.status_code in (404, 403)
+
+
+def test_correlation_id_header_matches_error_body(client, user_client):
+    resp = client.get("/api/tasks/missing", headers={"Authorization": f"Bearer {create_token(user_client.id, user_client.email)}"})
+    assert resp.status_code == 404
+    cid = resp.headers.get("X-Correlation-Id")
+    assert cid
+    assert resp.json()["error"]["correlation_id"] == cid
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from taskup_backend.analytics import daily_report, run_rollup
+from taskup_backend.models import Dispute, Offer, OfferStatus, Payment, PaymentStatus, Task
+from taskup_backend.security import create_token
+
+DAY1 = datetime(2024, 3, 1, 9, 0)
+DAY2 = datetime(2024, 3, 2, 9, 0)
+
+
+def _task(session, id, client_id, created_at):
+    session.add(Task(id=id, client_id=client_id, title=id, created_at=created_at))
+
+
+def _offer(session, id, task_id, tasker_id, created_at, status=OfferStatus.pending):
+    session.add(Offer(id=id, task_id=task_id, tasker_id=tasker_id, amount=1000, status=status, created_at=created_at))
+
+
+def _payment(session, id, client_id, tasker_id, amount, created_at, status=PaymentStatus.escrowed, currency="NOK"):
+    session.add(
+        Payment(id=id, task_id="t1", offer_id="o1", client_id=client_id, tasker_id=tasker_id, wallet_id=f"w-{client_id}", amount=amount, currency=currency, status=status, created_at=created_at)
+    )
+
+
+def _seed(session, client_id, tasker_id):
+    _task(session, "t1", client_id, DAY1)
+    _task(session, "t2", client_id, DAY1 + timedelta(hours=1))
+    _task(session, "t3", client_id, DAY2)
+    _offer(session, "o1", "t1", tasker_id, DAY1 + timedelta(minutes=30), OfferStatus.accepted)
+    _offer(session, "o2", "t1", tasker_id, DAY1 + timedelta(hours=2))
+    _offer(session, "o3", "t2", tasker_id, DAY1 + timedelta(hours=2))
+    _payment(session, "p1", client_id, tasker_id, 5000, DAY1 + timedelta(hours=3))
+    _payment(session, "p2", client_id, tasker_id, 3000, DAY1 + timedelta(hours=4), PaymentStatus.refunded)
+    _payment(session, "p3", client_id, tasker_id, 900, DAY1 + timedelta(hours=5), PaymentStatus.failed)
+    _payment(session, "p4", client_id, tasker_id, 2000, DAY2, currency="EUR")
+    session.add(Dispute(id="d1", task_id="t1", raised_by_id=client_id, against_user_id=tasker_id, reason="late", created_at=DAY2))
+    session.commit()
+
+
+def test_rollup_and_daily_report(client, session, user_client, user_tasker, admin_user, engine):
+    _seed(session, user_client.id, user_tasker.id)
+    headers = {"Authorization": f"Bearer {create_token(admin_user.id, admin_user.email, 'admin')}"}
+    result = client.post("/api/admin/analytics/rollup", headers=headers).json()
+    assert result["from"] is None and result["days"] == 2
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        data = client.get("/api/admin/analytics/daily?date_from=2024-03-01&date_to=2024-03-02", headers=headers).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    raw = ("FROM tasks", "FROM offers", "FROM payments", "FROM disputes")
+    assert not [s for s in statements if any(t in s for t in raw)]
+
+    day1, day2 = data["days"]
+    assert day1["day"] == "2024-03-01" and day1["tasks_posted"] == 2
+    assert day1["offers_per_task"] == 1.5
+    assert day1["accept_rate"] == round(1 / 3, 4)
+    assert day1["avg_time_to_first_offer_seconds"] == (30 * 60 + 60 * 60) / 2
+    assert day1["gmv_by_currency"] == {"NOK": 8000}
+    assert day1["payments"] == 2 and day1["refund_rate"] == 0.5
+    assert day2["gmv_by_currency"] == {"EUR": 2000}
+    assert day2["dispute_rate"] == 1.0
+    assert data["totals"]["tasks_posted"] == 3
+    assert data["totals"]["gmv_by_currency"] == {"NOK": 8000, "EUR": 2000}
+
+
+def test_rollup_is_incremental_within_lookback(session, user_client, user_tasker):
+    _seed(session, user_client.id, user_tasker.id)
+    run_rollup(session, lookback_days=1)
+
+    # Day 1 is outside the lookback window of the DAY2 watermark: changes there are not re-aggregated.
+    session.get(Offer, "o2").status = OfferStatus.accepted
+    _task(session, "t4", user_client.id, DAY2 + timedelta(hours=1))
+    session.commit()
+    result = run_rollup(session, lookback_days=0)
+    assert result["from"] == "2024-03-02"
+
+    report = daily_report(session, DAY1.date(), DAY2.date())
+    assert report["days"][0]["accept_rate"] == round(1 / 3, 4)
+    assert report["days"][1]["tasks_posted"] == 2
+
+    run_rollup(session, full=True)
+    assert daily_report(session, DAY1.date(), DAY1.date())["days"][0]["accept_rate"] == round(2 / 3, 4)
@@ -0,0 +1,242 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from taskup_backend.app import create_app
+from taskup_backend.concurrency import with_retry
+from taskup_backend.database import get_db
+from taskup_backend.errors import TaskUpError
+from taskup_backend.models import Base, Offer, OfferStatus, Payment, PaymentStatus, Task, TaskStatus, User, UserRole, Wallet
+from taskup_backend.security import create_token, hash_password
+
+WORKERS = 8
+
+
+@pytest.fixture
+def file_db(tmp_path):
+    """A file-backed SQLite DB with a session per request, so concurrent requests really race."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    Sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    yield Sessions
+    engine.dispose()
+
+
+@pytest.fixture
+def race_client(file_db):
+    app = create_app()
+
+    def override_get_db():
+        db = file_db()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def _seed(Sessions, offers: int):
+    with Sessions() as db:
+        db.add(User(id="c1", email="c1@example.com", hashed_password=hash_password("x"), role=UserRole.client))
+        db.add(Wallet(id="w-c1", user_id="c1", available_balance=100_000, escrow_balance=0))
+        db.add(Task(id="t1", client_id="c1", title="Paint fence"))
+        for n in range(offers):
+            db.add(User(id=f"t{n}", email=f"t{n}@example.com", hashed_password=hash_password("x"), role=UserRole.tasker))
+            db.add(Wallet(id=f"w-t{n}", user_id=f"t{n}", available_balance=0, escrow_balance=0))
+            db.add(Offer(id=f"o{n}", task_id="t1", tasker_id=f"t{n}", amount=1000 + n))
+        db.commit()
+
+
+def _race(calls):
+    """Run all calls at once; returns their status codes."""
+    barrier = threading.Barrier(len(calls))
+    statuses = [None] * len(calls)
+
+    def run(i, call):
+        barrier.wait()
+        statuses[i] = call().status_code
+
+    threads = [threading.Thread(target=run, args=(i, call)) for i, call in enumerate(calls)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return statuses
+
+
+def test_concurrent_accepts_escrow_exactly_once(file_db, race_client):
+    _seed(file_db, WORKERS)
+    headers = {"Authorization": f"Bearer {create_token('c1', 'c1@example.com', 'client')}"}
+    statuses = _race([
+        (lambda n=n: race_client.post("/api/tasks/t1/accept-offer", json={"offer_id": f"o{n}"}, headers=headers))
+        for n in range(WORKERS)
+    ])
+
+    assert statuses.count(200) == 1
+    assert set(statuses) <= {200, 409}
+    with file_db() as db:
+        task = db.get(Task, "t1")
+        payments = db.query(Payment).all()
+        assert len(payments) == 1 and payments[0].offer_id == task.assigned_offer_id
+        wallet = db.get(Wallet, "w-c1")
+        assert wallet.escrow_balance == payments[0].amount
+        assert wallet.available_balance + wallet.escrow_balance == 100_000
+        accepted = [o.id for o in db.query(Offer).filter(Offer.status == OfferStatus.accepted)]
+        assert accepted == [task.assigned_offer_id]
+
+
+def test_concurrent_releases_pay_the_tasker_once(file_db, race_client):
+    _seed(file_db, 1)
+    client_headers = {"Authorization": f"Bearer {create_token('c1', 'c1@example.com', 'client')}"}
+    assert race_client.post("/api/tasks/t1/accept-offer", json={"offer_id": "o0"}, headers=client_headers).status_code == 200
+    with file_db() as db:
+        payment_id = db.query(Payment.id).scalar()
+
+    statuses = _race([lambda: race_client.post(f"/api/payments/{payment_id}/release", headers=client_headers)] * WORKERS)
+
+    assert statuses.count(200) == 1
+    assert set(statuses) <= {200, 409}
+    with file_db() as db:
+        assert db.get(Payment, payment_id).status == PaymentStatus.payment_released
+        assert db.get(Wallet, "w-t0").available_balance == 1000
+        client_wallet = db.get(Wallet, "w-c1")
+        assert (client_wallet.available_balance, client_wallet.escrow_balance) == (99_000, 0)
+
+
+def test_with_retry_rereads_after_a_version_conflict(file_db):
+    _seed(file_db, 0)
+    with file_db() as a, file_db() as b:
+        stale = b.get(Wallet, "w-c1")
+        assert stale.version == 1
+        a.get(Wallet, "w-c1").available_balance -= 300
+        a.commit()
+
+        attempts = []
+
+        def unit():
+            wallet = b.get(Wallet, "w-c1")
+            attempts.append(wallet.available_balance)
+            wallet.available_balance -= 200
+            b.commit()
+            return wallet
+
+        wallet = with_retry(b, unit)
+        assert attempts == [100_000, 99_700]
+        assert (wallet.available_balance, wallet.version) == (99_500, 3)
+
+        def always_conflicts():
+            wallet = b.get(Wallet, "w-c1")
+            wallet.available_balance += 1
+            # Another request commits between this read and the write, every time.
+            a.get(Wallet, "w-c1").available_balance += 1
+            a.commit()
+            b.commit()
+
+        with pytest.raises(TaskUpError) as exc:
+            with_retry(b, always_conflicts, retries=2)
+        assert exc.value.code == "CONCURRENT_UPDATE" and exc.value.retryable
+
+
+def test_release_and_refund_race_moves_the_escrow_once(file_db, race_client):
+    _seed(file_db, 1)
+    client_headers = {"Authorization": f"Bearer {create_token('c1', 'c1@example.com', 'client')}"}
+    assert race_client.post("/api/tasks/t1/accept-offer", json={"offer_id": "o0"}, headers=client_headers).status_code == 200
+    with file_db() as db:
+        payment_id = db.query(Payment.id).scalar()
+
+    release = lambda: race_client.post(f"/api/payments/{payment_id}/release", headers=client_headers)  # noqa: E731
+    refund = lambda: race_client.post(f"/api/payments/{payment_id}/refund", headers=client_headers)  # noqa: E731
+    statuses = _race([release, refund] * (WORKERS // 2))
+
+    assert statuses.count(200) == 1
+    assert set(statuses) <= {200, 409}
+    with file_db() as db:
+        payment = db.get(Payment, payment_id)
+        client_wallet = db.get(Wallet, "w-c1")
+        tasker_wallet = db.get(Wallet, "w-t0")
+        assert client_wallet.escrow_balance == 0
+        if payment.status == PaymentStatus.payment_released:
+            assert (client_wallet.available_balance, tasker_wallet.available_balance) == (99_000, 1000)
+        else:
+            assert payment.status == PaymentStatus.refunded
+            assert (client_wallet.available_balance, tasker_wallet.available_balance) == (100_000, 0)
+
+
+def test_released_payment_cannot_be_refunded(file_db, race_client):
+    _seed(file_db, 1)
+    client_headers = {"Authorization": f"Bearer {create_token('c1', 'c1@example.com', 'client')}"}
+    assert race_client.post("/api/tasks/t1/accept-offer", json={"offer_id": "o0"}, headers=client_headers).status_code == 200
+    with file_db() as db:
+        payment_id = db.query(Payment.id).scalar()
+    assert race_client.post(f"/api/payments/{payment_id}/release", headers=client_headers).status_code == 200
+
+    resp = race_client.post(f"/api/payments/{payment_id}/refund", headers=client_headers)
+    assert resp.status_code == 409 and resp.json()["error"]["code"] == "PAYMENT_NOT_ESCROWED"
+    with file_db() as db:
+        assert db.get(Payment, payment_id).status == PaymentStatus.payment_released
+        assert (db.get(Wallet, "w-c1").available_balance, db.get(Wallet, "w-t0").available_balance) == (99_000, 1000)
+
+
+def _disputed_payment(file_db, race_client, headers):
+    """Accepted offer o0 on t1 with a dispute opened by the client; returns (payment id, dispute id)."""
+    _seed(file_db, 1)
+    with file_db() as db:
+        db.add(User(id="a1", email="a1@example.com", hashed_password=hash_password("x"), role=UserRole.admin))
+        db.commit()
+    assert race_client.post("/api/tasks/t1/accept-offer", json={"offer_id": "o0"}, headers=headers).status_code == 200
+    dispute = race_client.post("/api/disputes", json={"task_id": "t1", "reason": "late", "against_user_id": "t0"}, headers=headers)
+    with file_db() as db:
+        return db.query(Payment.id).scalar(), dispute.json()["id"]
+
+
+def test_dispute_refund_after_release_is_rejected(file_db, race_client):
+    client_headers = {"Authorization": f"Bearer {create_token('c1', 'c1@example.com', 'client')}"}
+    admin_headers = {"Authorization": f"Bearer {create_token('a1', 'a1@example.com', 'admin')}"}
+    payment_id, dispute_id = _disputed_payment(file_db, race_client, client_headers)
+    assert race_client.post("/api/tasks/t1/confirm-received", headers=client_headers).status_code == 200
+
+    resp = race_client.post(f"/api/disputes/{dispute_id}/resolve", json={"resolution": "refund"}, headers=admin_headers)
+    assert resp.status_code == 409 and resp.json()["error"]["code"] == "PAYMENT_NOT_ESCROWED"
+    with file_db() as db:
+        assert db.get(Payment, payment_id).status == PaymentStatus.payment_released
+        client_wallet = db.get(Wallet, "w-c1")
+        assert (client_wallet.available_balance, client_wallet.escrow_balance) == (99_000, 0)
+
+
+def test_dispute_release_of_a_stripe_disputed_payment(file_db, race_client):
+    client_headers = {"Authorization": f"Bearer {create_token('c1', 'c1@example.com', 'client')}"}
+    admin_headers = {"Authorization": f"Bearer {create_token('a1', 'a1@example.com', 'admin')}"}
+    payment_id, dispute_id = _disputed_payment(file_db, race_client, client_headers)
+    with file_db() as db:
+        # What the charge.dispute.created webhook leaves behind.
+        db.get(Payment, payment_id).status = PaymentStatus.disputed
+        db.commit()
+
+    resp = race_client.post(f"/api/disputes/{dispute_id}/resolve", json={"resolution": "release"}, headers=admin_headers)
+    assert resp.status_code == 200
+    with file_db() as db:
+        assert db.get(Payment, payment_id).status == PaymentStatus.payment_released
+        assert db.get(Wallet, "w-t0").available_balance == 1000
+        assert db.get(Wallet, "w-c1").escrow_balance == 0
+
+
+def test_failed_escrow_leaves_the_task_unaccepted(file_db, race_client):
+    _seed(file_db, 2)
+    with file_db() as db:
+        # No wallet yet: accept creates an empty one and then can't escrow.
+        db.delete(db.get(Wallet, "w-c1"))
+        db.commit()
+    client_headers = {"Authorization": f"Bearer {create_token('c1', 'c1@example.com', 'client')}"}
+
+    resp = race_client.post("/api/tasks/t1/accept-offer", json={"offer_id": "o0"}, headers=client_headers)
+    assert resp.status_code == 409 and resp.json()["error"]["code"] == "PAYMENT_ESCROW_FAILED"
+    with file_db() as db:
+        task = db.get(Task, "t1")
+        assert (task.status, task.assigned_offer_id) == (TaskStatus.open, None)
+        assert {o.status for o in db.query(Offer)} == {OfferStatus.pending}
+        assert db.query(Payment).count() == 0 and db.query(Wallet).filter(Wallet.user_id == "c1").count() == 0
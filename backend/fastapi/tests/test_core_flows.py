@@ -1,5 +1,7 @@
-from taskup_backend.security import create_token
+from taskup_backend.security import create_token, hash_password
 from taskup_backend.models import (
+    User,
+    UserRole,
     Wallet,
     TaskStatus,
     OfferStatus,
@@ -80,3 +82,93 @@ def test_dispute_flow_via_task_endpoint(client, session, user_client, user_taske
     # should reflect status
     g_resp = client.get(f"/api/tasks/{task_id}", headers=headers_client)
     assert g_resp.json()["status"] == TaskStatus.disputed
+
+
+# Upper bounds on DB statements per request for the core flow; tighten as endpoints get cheaper.
+CORE_FLOW_QUERY_BUDGETS = {
+    "create_task": 9,
+    "list_tasks": 2,
+    "create_offer": 12,
+    "get_task": 3,
+    "accept_offer": 22,
+    "mark_done": 3,
+    "confirm_received": 22,
+}
+
+
+def test_core_flow_query_counts(client, session, user_client, user_tasker, query_counter):
+    wallet = session.query(Wallet).filter(Wallet.user_id == user_client.id).first()
+    wallet.available_balance = 10000
+    session.commit()
+    headers_client = {"Authorization": f"Bearer {create_token(user_client.id, user_client.email, 'client')}"}
+    headers_tasker = {"Authorization": f"Bearer {create_token(user_tasker.id, user_tasker.email, 'tasker')}"}
+    counts = {}
+
+    with query_counter() as q:
+        task_id = client.post("/api/tasks", json={"title": "Paint fence", "currency": "NOK"}, headers=headers_client).json()["id"]
+    counts["create_task"] = q.count
+    with query_counter() as q:
+        assert client.get("/api/tasks", headers=headers_client).status_code == 200
+    counts["list_tasks"] = q.count
+    with query_counter() as q:
+        offer_id = client.post("/api/offers", json={"task_id": task_id, "amount_cents": 5000}, headers=headers_tasker).json()["id"]
+    counts["create_offer"] = q.count
+    with query_counter() as q:
+        assert client.get(f"/api/tasks/{task_id}", headers=headers_client).status_code == 200
+    counts["get_task"] = q.count
+    with query_counter() as q:
+        assert client.post(f"/api/tasks/{task_id}/accept-offer", json={"offer_id": offer_id}, headers=headers_client).status_code == 200
+    counts["accept_offer"] = q.count
+    with query_counter() as q:
+        assert client.post(f"/api/tasks/{task_id}/mark-done", headers=headers_tasker).status_code == 200
+    counts["mark_done"] = q.count
+    with query_counter() as q:
+        assert client.post(f"/api/tasks/{task_id}/confirm-received", headers=headers_client).status_code == 200
+    counts["confirm_received"] = q.count
+
+    over = {name: (counts[name], budget) for name, budget in CORE_FLOW_QUERY_BUDGETS.items() if counts[name] > budget}
+    assert not over, f"query budget exceeded (actual, budget): {over}"
+
+
+def test_request_metrics_use_route_template(client, user_client):
+    headers = {"Authorization": f"Bearer {create_token(user_client.id, user_client.email)}"}
+    client.get("/api/tasks/does-not-exist", headers=headers)
+    text = client.get("/metrics").text
+    assert 'taskup_http_db_queries_count{method="GET",route="/api/tasks/{task_id}"}' in text
+    assert "does-not-exist" not in text
+
+
+def test_task_detail_embeds_offers_with_fixed_query_count(client, session, user_client, query_counter):
+    wallet = session.query(Wallet).filter(Wallet.user_id == user_client.id).first()
+    wallet.available_balance = 100000
+    session.commit()
+    headers_client = {"Authorization": f"Bearer {create_token(user_client.id, user_client.email, 'client')}"}
+    task_id = client.post("/api/tasks", json={"title": "Move sofa", "currency": "NOK"}, headers=headers_client).json()["id"]
+
+    def add_offer(n: int) -> str:
+        tasker = User(id=f"u-t{n}", email=f"t{n}@example.com", hashed_password=hash_password("pass123"), full_name=f"Tasker {n}", role=UserRole.tasker)
+        session.add(tasker)
+        session.commit()
+        headers = {"Authorization": f"Bearer {create_token(tasker.id, tasker.email, 'tasker')}"}
+        return client.post("/api/offers", json={"task_id": task_id, "amount_cents": 4000 + n}, headers=headers).json()["id"]
+
+    first_offer = add_offer(0)
+    with query_counter() as q_one:
+        one = client.get(f"/api/tasks/{task_id}", headers=headers_client).json()
+    for n in range(1, 5):
+        add_offer(n)
+    with query_counter() as q_many:
+        many = client.get(f"/api/tasks/{task_id}", headers=headers_client).json()
+
+    assert len(one["offers"]) == 1 and len(many["offers"]) == 5
+    assert q_many.count == q_one.count
+    assert many["offers"][-1]["tasker"] == {"id": "u-t0", "full_name": "Tasker 0", "role": "tasker", "kyc_status": None, "created_at": many["offers"][-1]["tasker"]["created_at"]}
+    assert many["payment_status"] is None
+
+    client.post(f"/api/tasks/{task_id}/accept-offer", json={"offer_id": first_offer}, headers=headers_client)
+    detail = client.get(f"/api/tasks/{task_id}", headers=headers_client).json()
+    assert detail["payment_status"] == PaymentStatus.escrowed
+    assert detail["assigned_tasker"]["id"] == "u-t0"
+
+    tasker_view = client.get(f"/api/tasks/{task_id}", headers={"Authorization": f"Bearer {create_token('u-t0', 't0@example.com', 'tasker')}"}).json()
+    assert tasker_view["offers"] == []
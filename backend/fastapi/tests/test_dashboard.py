@@ -0,0 +1,78 @@
+import pytest
+
+from taskup_backend.dashboard import DASHBOARD
+from taskup_backend.models import Offer, OfferStatus, Payment, PaymentStatus, Task, TaskStatus, Wallet
+from taskup_backend.security import create_token
+from taskup_backend.task_states import transition
+
+
+@pytest.fixture
+def admin_headers(admin_user):
+    DASHBOARD.invalidate()
+    yield {"Authorization": f"Bearer {create_token(admin_user.id, admin_user.email, 'admin')}"}
+    DASHBOARD.invalidate()
+
+
+@pytest.mark.parametrize("synthetic_data", ["200"], indirect=True)
+def test_dashboard_matches_counts_and_breakdowns(client, session, synthetic_data, admin_headers):
+    data = client.get("/api/admin/metrics", headers=admin_headers).json()
+    assert data["tasks"] == session.query(Task).count()
+    assert data["users"] == synthetic_data["users"] + 1
+    completed = session.query(Task).filter(Task.status == TaskStatus.completed).count()
+    assert data["by_status"]["tasks"].get("completed", 0) == completed
+    assert set(data) >= {"offers", "disputes", "payments", "daily", "gmv", "escrowed_amount", "open_disputes", "as_of"}
+
+
+def test_dashboard_follows_commits_without_recounting(client, session, user_client, user_tasker, admin_headers, query_counter, monkeypatch):
+    before = client.get("/api/admin/metrics", headers=admin_headers).json()
+    monkeypatch.setattr(DASHBOARD, "refresh", lambda db: pytest.fail("dashboard re-counted within the staleness bound"))
+
+    headers_client = {"Authorization": f"Bearer {create_token(user_client.id, user_client.email, 'client')}"}
+    client.post("/api/tasks", json={"title": "Hang shelves", "currency": "NOK"}, headers=headers_client)
+    payment = Payment(id="p-dash", task_id=session.query(Task.id).scalar(), offer_id="o-x", client_id=user_client.id, tasker_id=user_tasker.id, wallet_id=f"w-{user_client.id}", amount=7000, status=PaymentStatus.escrowed)
+    session.add(payment)
+    session.commit()
+    payment.status = PaymentStatus.payment_released
+    session.commit()
+
+    with query_counter() as q:
+        after = client.get("/api/admin/metrics", headers=admin_headers).json()
+    assert after["tasks"] == before["tasks"] + 1
+    assert after["by_status"]["tasks"]["open"] == before["by_status"]["tasks"].get("open", 0) + 1
+    assert after["payments"] == before["payments"] + 1
+    assert after["gmv"] == before["gmv"] + 7000
+    assert after["escrowed_amount"] == before["escrowed_amount"]
+    assert q.count <= 2  # auth lookups only, no aggregate queries
+
+
+def test_dashboard_follows_state_machine_updates(client, session, user_client, user_tasker, admin_headers, monkeypatch):
+    session.add(Task(id="t-dash", client_id=user_client.id, title="Paint fence"))
+    for n, status in enumerate([OfferStatus.pending, OfferStatus.pending, OfferStatus.withdrawn]):
+        session.add(Offer(id=f"o-dash-{n}", task_id="t-dash", tasker_id=user_tasker.id, amount=1000, status=status))
+    session.get(Wallet, f"w-{user_client.id}").available_balance = 10_000
+    session.commit()
+    before = client.get("/api/admin/metrics", headers=admin_headers).json()
+    recounts = []
+    refresh = DASHBOARD.refresh
+    monkeypatch.setattr(DASHBOARD, "refresh", lambda db: (recounts.append(1), refresh(db)))
+
+    headers_client = {"Authorization": f"Bearer {create_token(user_client.id, user_client.email, 'client')}"}
+    assert client.post("/api/tasks/t-dash/accept-offer", json={"offer_id": "o-dash-0"}, headers=headers_client).status_code == 200
+    session.expire_all()
+    task_id = session.query(Task.id).filter(Task.id == "t-dash").scalar()
+    transition(session, task_id, TaskStatus.awaiting_client_confirmation, "marked_done")
+    session.commit()
+
+    after = client.get("/api/admin/metrics", headers=admin_headers).json()
+    assert not recounts  # both the transitions and the bulk reject were applied as deltas
+    tasks, offers = after["by_status"]["tasks"], after["by_status"]["offers"]
+    assert tasks.get("open", 0) == before["by_status"]["tasks"]["open"] - 1
+    assert tasks["awaiting_client_confirmation"] == 1 and "in_progress" not in tasks
+    assert (offers["accepted"], offers["rejected"], offers["withdrawn"]) == (1, 1, 1)
+
+    # Entered from several states with nothing loaded: the old status is unknown, so the dashboard recounts.
+    session.expire_all()
+    transition(session, task_id, TaskStatus.disputed, "disputed")
+    session.commit()
+    after = client.get("/api/admin/metrics", headers=admin_headers).json()
+    assert recounts and after["by_status"]["tasks"]["disputed"] == 1
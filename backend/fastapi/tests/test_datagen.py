@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import create_engine, event, func, select
+
+from benchmarks.datagen import Generator, generate
+from taskup_backend.models import Base, Offer, Task, User, UserRole
+
+
+@pytest.mark.parametrize("synthetic_data", ["500"], indirect=True)
+def test_synthetic_data_is_loaded(session, synthetic_data):
+    assert synthetic_data["users"] == 500
+    assert session.scalar(select(func.count()).select_from(User)) == 500
+    assert session.scalar(select(func.count()).select_from(Task)) == synthetic_data["tasks"] > 0
+    assert session.query(User).filter(User.role == UserRole.tasker).count() == 150
+    # power-law: the busiest client owns far more tasks than the median one
+    per_client = sorted(n for (n,) in session.query(func.count(Task.id)).group_by(Task.client_id))
+    assert per_client[-1] >= 5 * per_client[len(per_client) // 2]
+
+
+def test_generator_is_deterministic_and_fk_ordered():
+    engine = create_engine("sqlite://")
+    event.listen(engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine)
+    counts = generate(engine, users=300, seed=7, batch_size=50)
+    assert counts["offers"] > 0 and counts["messages"] > 0
+
+    first = [row for _, row in Generator(300, seed=7).activity()][:50]
+    again = [row for _, row in Generator(300, seed=7).activity()][:50]
+    assert first == again
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(Offer)) == counts["offers"]
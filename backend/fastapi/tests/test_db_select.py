@@ -0,0 +1,88 @@
+import httpx
+import pytest
+
+from taskup_backend import db
+from taskup_backend.memstore import MemStore
+
+
+@pytest.fixture
+def mem(monkeypatch):
+    monkeypatch.setattr(db, "_client", lambda jwt=None: None)
+    store = MemStore(["tasks", "offers"])
+    monkeypatch.setattr(db, "_mem", store)
+    return store
+
+
+def test_in_memory_select_filters_orders_and_pages(mem):
+    for i, status in enumerate(["open", "completed", "open", "payment_released", "open"]):
+        db.insert("tasks", {"id": f"t{i}", "client_id": "c1" if i < 3 else "c2", "status": status, "budget_cents": i * 100, "created_at": f"2024-01-0{i + 1}"})
+
+    assert [t["id"] for t in db.select("tasks", {"status__nin": ["completed", "payment_released"]})] == ["t0", "t2", "t4"]
+    assert [t["id"] for t in db.select("tasks", {"budget_cents__gte": 200, "client_id": "c1"})] == ["t2"]
+
+    page = db.select("tasks", {"id": ["t0", "t1", "t4"]}, columns="id,status", order_by="created_at", desc=True, limit=2, count="exact")
+    assert page == [{"id": "t4", "status": "open"}, {"id": "t1", "status": "completed"}]
+    assert page.count == 3
+
+    rest = db.select("tasks", order_by="created_at", desc=True, after=("2024-01-04", "t3"))
+    assert [t["id"] for t in rest] == ["t2", "t1", "t0"]
+    assert db.count_rows("tasks", {"client_id": "c2"}) == 2
+
+
+def test_offers_for_client_are_limited_to_their_tasks(mem):
+    db.insert("tasks", {"id": "mine", "client_id": "c1"})
+    db.insert("tasks", {"id": "theirs", "client_id": "c2"})
+    db.insert("offers", {"id": "o1", "task_id": "mine", "tasker_id": "u1"})
+    db.insert("offers", {"id": "o2", "task_id": "theirs", "tasker_id": "u1"})
+
+    assert [o["id"] for o in db.list_offers_for_user("c1", "client")] == ["o1"]
+    assert [o["id"] for o in db.list_offers_for_user("c3", "client")] == []
+    assert len(db.list_offers_for_user("u1", "tasker")) == 2
+
+
+def test_taskers_see_browsable_and_assigned_tasks(mem):
+    for i, (status, tasker) in enumerate([("new", None), ("offers_incoming", None), ("assigned", "u1"), ("assigned", "u2"), ("completed", None)]):
+        db.insert("tasks", {"id": f"t{i}", "client_id": "c1", "status": status, "assigned_tasker_id": tasker, "created_at": f"2024-01-0{i + 1}"})
+
+    assert [t["id"] for t in db.list_tasks_for_user("u1", "tasker")] == ["t2", "t1", "t0"]
+    assert len(db.list_tasks_for_user("c1", "client")) == 5
+
+
+def test_postgrest_select_maps_to_query_params(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json=[{"id": "t9"}], headers={"Content-Range": "0-0/42"})
+
+    monkeypatch.setattr(db, "_url", "https://example.supabase.co")
+    monkeypatch.setattr(db, "_service_key", "service-key")
+    monkeypatch.setattr(db, "_service_client", None)
+    monkeypatch.setattr(db, "_transport", httpx.MockTransport(handler))
+
+    rows = db.select(
+        "tasks",
+        {"client_id": "c1", "status": ["open", "assigned"], "budget_cents__lt": 500},
+        columns=["id", "title"],
+        order_by="created_at",
+        desc=True,
+        limit=20,
+        after=("2024-01-01T10:00:00+00:00", "t8"),
+        count="exact",
+    )
+
+    assert rows == [{"id": "t9"}] and rows.count == 42
+    params = seen[0].url.params
+    assert params["select"] == "id,title"
+    assert params["client_id"] == "eq.c1"
+    assert params["status"] == "in.(open,assigned)"
+    assert params["budget_cents"] == "lt.500"
+    assert params["order"] == "created_at.desc,id.desc"
+    assert params["limit"] == "20"
+    assert params["or"] == '(created_at.lt."2024-01-01T10:00:00+00:00",and(created_at.eq."2024-01-01T10:00:00+00:00",id.lt."t8"))'
+    assert seen[0].headers["prefer"] == "count=exact"
+
+    db.list_tasks_for_user("u1", "tasker")
+    params = seen[1].url.params
+    assert params["or"] == '(status.in.("new","offers_incoming"),assigned_tasker_id.eq."u1")'
+    assert "status" not in params
@@ -0,0 +1,80 @@
+import json
+
+import httpx
+import pytest
+
+from taskup_backend import db
+from taskup_backend.memstore import MemStore
+
+
+@pytest.fixture
+def postgrest_requests(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(201, json=json.loads(request.content))
+
+    monkeypatch.setattr(db, "_url", "https://example.supabase.co")
+    monkeypatch.setattr(db, "_service_key", "service-key")
+    monkeypatch.setattr(db, "_service_client", None)
+    monkeypatch.setattr(db, "_transport", httpx.MockTransport(handler))
+    return seen
+
+
+def test_upsert_many_in_memory_merges_on_conflict_columns(monkeypatch):
+    monkeypatch.setattr(db, "_client", lambda jwt=None: None)
+    monkeypatch.setattr(db, "_mem", MemStore(["favorites"]))
+    db.insert_many("favorites", [{"id": "f1", "user_id": "u1", "tasker_id": "t1", "note": "old"}])
+
+    rows = [{"user_id": "u1", "tasker_id": "t1", "note": "new"}, {"user_id": "u1", "tasker_id": "t2"}]
+    assert len(db.upsert_many("favorites", rows, on_conflict="user_id,tasker_id", ignore_duplicates=True)) == 1
+    db.upsert_many("favorites", rows, on_conflict="user_id,tasker_id")
+
+    favorites = db.select("favorites", {"user_id": "u1"})
+    assert len(favorites) == 2
+    assert db.select("favorites", {"id": "f1"})[0]["note"] == "new"
+
+
+def test_buffered_writes_send_one_bulk_insert_per_table(postgrest_requests):
+    with db.buffered_writes():
+        db.record_notification("u1", "offer_created", {"task_id": "t1"})
+        db.record_notification("u2", "offer_created", {"task_id": "t1"})
+        db.log_admin_action("a1", "block_user", "user", "u3")
+        assert postgrest_requests == []
+
+    assert [(r.method, r.url.path) for r in postgrest_requests] == [
+        ("POST", "/rest/v1/notifications"),
+        ("POST", "/rest/v1/admin_logs"),
+    ]
+    notifications = postgrest_requests[0]
+    assert [row["user_id"] for row in json.loads(notifications.content)] == ["u1", "u2"]
+    assert "missing=default" in notifications.headers["prefer"]
+
+
+def test_upsert_many_sends_on_conflict(postgrest_requests):
+    db.upsert_many("favorites", [{"user_id": "u1", "tasker_id": "t1"}], on_conflict="user_id,tasker_id")
+    request = postgrest_requests[0]
+    assert request.url.params["on_conflict"] == "user_id,tasker_id"
+    assert "resolution=merge-duplicates" in request.headers["prefer"]
+
+
+def test_aio_helpers_run_on_the_db_pool_and_keep_the_write_buffer(monkeypatch):
+    import asyncio
+    import threading
+
+    monkeypatch.setattr(db, "_client", lambda jwt=None: None)
+    monkeypatch.setattr(db, "_mem", MemStore(["notifications"]))
+    threads = []
+    monkeypatch.setattr(db, "get_user_by_id", lambda user_id: threads.append(threading.current_thread().name) or {"id": user_id})
+
+    async def handler():
+        with db.buffered_writes():
+            profile = await db.aio.get_user_by_id("u1")
+            await db.aio.record_notification("u1", "ping", {})
+            assert db.select("notifications") == []
+        return profile
+
+    assert asyncio.run(handler()) == {"id": "u1"}
+    assert threads[0].startswith("taskup-db")
+    assert len(db.select("notifications")) == 1
@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+
+from taskup_backend.app import create_app
+from taskup_backend.models import IdempotencyKey, Task
+from taskup_backend.security import create_token
+
+
+def _headers(user, role, key):
+    return {"Authorization": f"Bearer {create_token(user.id, user.email, role)}", "Idempotency-Key": key}
+
+
+def test_retried_post_is_replayed_not_rerun(client, session, user_client, user_tasker):
+    headers = _headers(user_client, "client", "create-fence-1")
+    payload = {"title": "Paint fence", "currency": "NOK"}
+
+    first = client.post("/api/tasks", json=payload, headers=headers)
+    retry = client.post("/api/tasks", json=payload, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json()["id"] == first.json()["id"]
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert session.query(Task).count() == 1
+
+    # The key is scoped to the caller: another user's identical key runs normally.
+    other = client.post("/api/tasks", json=payload, headers=_headers(user_tasker, "client", "create-fence-1"))
+    assert other.json()["id"] != first.json()["id"]
+
+    reused = client.post("/api/tasks", json={**payload, "title": "Mow lawn"}, headers=headers)
+    assert reused.status_code == 422
+    assert reused.json()["error"]["code"] == "IDEMPOTENCY_KEY_REUSED"
+
+
+def test_other_worker_replays_from_the_table(client, session, user_client):
+    headers = _headers(user_client, "client", "create-fence-2")
+    payload = {"title": "Paint fence", "currency": "NOK"}
+    first = client.post("/api/tasks", json=payload, headers=headers).json()
+    assert session.query(IdempotencyKey).filter(IdempotencyKey.status_code == 200).count() == 1
+
+    # A second app instance has its own (empty) LRU, like another worker.
+    other_worker = create_app()
+    other_worker.dependency_overrides = client.app.dependency_overrides
+    replay = TestClient(other_worker).post("/api/tasks", json=payload, headers=headers)
+    assert replay.json()["id"] == first["id"]
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert session.query(Task).count() == 1
+
+
+def test_forged_token_gets_401_not_the_victims_replay(client, session, user_client):
+    headers = _headers(user_client, "client", "create-fence-3")
+    payload = {"title": "Paint fence", "currency": "NOK"}
+    assert client.post("/api/tasks", json=payload, headers=headers).status_code == 200
+
+    header, claims, _ = headers["Authorization"].split(" ", 1)[1].split(".")
+    forged = {**headers, "Authorization": f"Bearer {header}.{claims}.invalidsig"}
+    resp = client.post("/api/tasks", json=payload, headers=forged)
+    assert resp.status_code == 401
+    assert "idempotent-replayed" not in resp.headers
+
+
+def test_auth_failures_are_not_stored_and_stale_claims_are_taken_over(client, session, user_client):
+    payload = {"title": "Paint fence", "currency": "NOK"}
+    # Valid token for a user that doesn't exist yet: the route answers 403.
+    ghost = {"Authorization": f"Bearer {create_token('u-ghost', 'ghost@example.com', 'client')}", "Idempotency-Key": "k-ghost"}
+    assert client.post("/api/tasks", json=payload, headers=ghost).status_code == 403
+    assert session.query(IdempotencyKey).count() == 0
+
+    headers = _headers(user_client, "client", "create-fence-4")
+    client.post("/api/tasks", json=payload, headers=headers)
+    # Simulate a worker that died mid-request: the claim is still in flight but its lease ran out.
+    row = session.query(IdempotencyKey).one()
+    row.status_code, row.body = None, None
+    session.commit()
+    client.app.middleware_stack = None  # rebuild: drop the worker's LRU
+    in_flight = client.post("/api/tasks", json=payload, headers=headers)
+    assert in_flight.status_code == 409 and in_flight.json()["error"]["code"] == "IDEMPOTENCY_IN_PROGRESS"
+
+    row = session.query(IdempotencyKey).filter(IdempotencyKey.status_code.is_(None)).one()
+    row.claimed_at -= timedelta(minutes=5)
+    session.commit()
+    taken_over = client.post("/api/tasks", json=payload, headers=headers)
+    assert taken_over.status_code == 200 and "idempotent-replayed" not in taken_over.headers
+
+
+def test_replays_carry_cors_headers(client, user_client):
+    origin = "http://localhost:3000"
+    headers = {**_headers(user_client, "client", "create-fence-5"), "Origin": origin}
+    payload = {"title": "Paint fence", "currency": "NOK"}
+    client.post("/api/tasks", json=payload, headers=headers)
+    replay = client.post("/api/tasks", json=payload, headers=headers)
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert replay.headers["access-control-allow-origin"] == origin
+
+
+def test_reused_key_with_other_query_params_is_rejected(client, session, user_client):
+    session.add(Task(id="t-q", client_id=user_client.id, title="Paint fence"))
+    session.commit()
+    headers = _headers(user_client, "client", "dispute-t-q")
+    assert client.post("/api/tasks/t-q/dispute", params={"reason": "late"}, headers=headers).status_code == 200
+    assert client.post("/api/tasks/t-q/dispute", params={"reason": "late"}, headers=headers).headers["idempotent-replayed"] == "true"
+
+    other = client.post("/api/tasks/t-q/dispute", params={"reason": "never showed up"}, headers=headers)
+    assert other.status_code == 422 and other.json()["error"]["code"] == "IDEMPOTENCY_KEY_REUSED"
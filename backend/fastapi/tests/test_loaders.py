@@ -0,0 +1,44 @@
+from taskup_backend.loaders import Loaders
+from taskup_backend.models import Offer, Payment, PaymentStatus, Task, User, Wallet
+from taskup_backend.payments_service import release_escrow_to_tasker
+from taskup_backend.payments_utils import ensure_wallets
+
+
+def test_loader_batches_keys_and_caches_misses(session, user_client, user_tasker, query_counter):
+    client_id, tasker_id = user_client.id, user_tasker.id
+    loaders = Loaders(session)
+    with query_counter() as q:
+        found = loaders.users.get_many([tasker_id, client_id, "missing"])
+        assert set(found) == {tasker_id, client_id}
+        assert loaders.users.get(client_id).email == "client@example.com"
+        assert loaders.users.get("missing") is None
+    assert q.count == 1
+    assert loaders.users.queries == 1
+
+
+def test_ensure_wallets_uses_one_lookup_and_creates_missing(session, user_client, user_tasker, query_counter):
+    session.add(User(id="u-new", email="new@example.com", hashed_password="x", full_name="new"))
+    session.commit()
+    loaders = Loaders(session)
+    wallets = ensure_wallets(session, [user_client.id, user_tasker.id, "u-new"], loaders=loaders)
+    assert set(wallets) == {user_client.id, user_tasker.id, "u-new"}
+    assert session.query(Wallet).filter(Wallet.user_id == "u-new").count() == 1
+    assert loaders.wallets.queries == 1
+    client_id = user_client.id
+    with query_counter() as q:
+        assert loaders.wallets.get(client_id) is wallets[client_id]
+    assert q.count == 0
+
+
+def test_release_reuses_the_payment_the_handler_loaded(session, user_client, user_tasker):
+    session.add(Task(id="t-l", client_id=user_client.id, title="Paint fence", assigned_tasker_id=user_tasker.id))
+    session.add(Offer(id="o-l", task_id="t-l", tasker_id=user_tasker.id, amount=1000))
+    session.add(Payment(id="p-l", task_id="t-l", offer_id="o-l", client_id=user_client.id, tasker_id=user_tasker.id, wallet_id=f"w-{user_client.id}", amount=1000, status=PaymentStatus.escrowed))
+    session.get(Wallet, f"w-{user_client.id}").escrow_balance = 1000
+    session.commit()
+    loaders = Loaders(session)
+    loaders.payments.add(session.get(Payment, "p-l"))
+
+    release_escrow_to_tasker(session, user_client.id, user_tasker.id, session.get(Task, "t-l"), session.get(Offer, "o-l"), loaders=loaders)
+    assert loaders.payments.queries == 0
+    assert session.get(Payment, "p-l").status == PaymentStatus.payment_released
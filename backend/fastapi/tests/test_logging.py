@@ -0,0 +1,62 @@
+import json
+import logging
+
+from taskup_backend import logging_utils
+from taskup_backend.logging_utils import DroppingQueueHandler, JsonFormatter, log_event
+
+
+def test_log_event_skips_payload_when_level_disabled():
+    previous = logging_utils.logger.level
+    logging_utils.logger.setLevel(logging.WARNING)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {"expensive": True}
+
+    try:
+        log_event(action="noop", extra=build)
+    finally:
+        logging_utils.logger.setLevel(previous)
+    assert calls == []
+
+
+def test_queue_handler_drops_when_full():
+    import queue
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    record = logging.LogRecord("taskup", logging.INFO, __file__, 1, "a %s", ("b",), None)
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.dropped == 1
+    queued = handler.queue.get_nowait()
+    assert queued.getMessage() == "a b"
+
+
+def test_json_formatter_emits_payload_and_extras():
+    record = logging.LogRecord("taskup", logging.INFO, __file__, 1, "task_created", (), None)
+    record.payload = {"action": "task_created", "task_id": "t1"}
+    record.correlation_id = "cid-1"
+    out = JsonFormatter().format(record)
+    assert '"task_id"' in out and '"correlation_id"' in out and '"level"' in out
+
+
+def test_log_event_reaches_root_handlers_with_its_payload(caplog):
+    caplog.set_level(logging.INFO, logger="taskup")
+    log_event(action="payment_released", user_id="u1", extra={"payment_id": "p1"})
+    record = caplog.records[-1]
+    assert record.name == "taskup"
+    action, payload = record.getMessage().split(" ", 1)
+    assert action == "payment_released"
+    assert json.loads(payload) == {"payment_id": "p1", "user_id": "u1", "action": "payment_released"}
+
+
+def test_queued_copy_keeps_the_propagated_record_intact():
+    import queue
+
+    handler = DroppingQueueHandler(queue.Queue())
+    record = logging.LogRecord("taskup", logging.INFO, __file__, 1, "%s %s", ("done", "{}"), None)
+    record.payload = {"action": "done"}
+    handler.handle(record)
+    assert handler.queue.get_nowait().getMessage() == "done"
+    assert record.getMessage() == "done {}"
@@ -0,0 +1,35 @@
+from taskup_backend.memstore import MemStore
+
+
+def test_indexed_lookups_follow_insert_update_and_delete():
+    store = MemStore(["offers"])
+    offers = store.table("offers")
+    a = offers.insert({"task_id": "t1", "tasker_id": "u1", "status": "pending"})
+    b = offers.insert({"task_id": "t1", "tasker_id": "u2", "status": "pending"})
+    c = offers.insert({"task_id": "t2", "tasker_id": "u1", "status": "pending"})
+
+    assert [r["id"] for r in offers.select({"task_id": "t1"})] == [a["id"], b["id"]]
+    assert offers.select({"id": c["id"]}) == [c]
+
+    offers.update({"id": a["id"]}, {"task_id": "t2", "status": "accepted"})
+    assert [r["id"] for r in offers.select({"task_id": "t1"})] == [b["id"]]
+    assert [r["id"] for r in offers.select({"task_id": "t2"})] == [a["id"], c["id"]]
+    assert [r["id"] for r in offers.select({"task_id": "t2", "status": "accepted"})] == [a["id"]]
+
+    assert offers.delete({"tasker_id": "u1"}) and offers.select({"task_id": "t2"}) == []
+    assert [r["id"] for r in offers.select()] == [b["id"]]
+
+    store["offers"] = [{"id": "x", "task_id": "t9"}]
+    assert store.table("offers").select({"task_id": "t9"})[0]["id"] == "x"
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "mem.pickle")
+    store = MemStore(["user_profiles"])
+    store.table("user_profiles").insert({"id": "u1", "email": "a@example.com"})
+    store.save_snapshot(path)
+
+    restored = MemStore()
+    assert restored.load_snapshot(path)
+    assert restored.table("user_profiles").select({"email": "a@example.com"}) == [{"id": "u1", "email": "a@example.com"}]
+    assert not MemStore().load_snapshot(str(tmp_path / "missing.pickle"))
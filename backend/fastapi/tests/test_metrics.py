@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from taskup_backend import metrics
+from taskup_backend.metrics import Counter, Gauge, Histogram, Registry
+from taskup_backend.security import create_token
+
+
+def test_registry_aggregates_thread_shards_and_renders():
+    registry = Registry()
+    hits = Counter("t_hits_total", "Hits.", ["route"], registry=registry)
+    latency = Histogram("t_latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+
+    def work():
+        for _ in range(100):
+            hits.labels(route="/a").inc()
+            latency.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    text = registry.render()
+    assert 't_hits_total{route="/a"} 400.0' in text
+    assert 't_latency_seconds_bucket{le="0.1"} 0' in text
+    assert 't_latency_seconds_bucket{le="1.0"} 400' in text
+    assert 't_latency_seconds_count 400' in text
+
+
+def test_registry_merges_worker_snapshots():
+    registry = Registry()
+    hits = Counter("t_hits_total", "Hits.", registry=registry)
+    peak = Gauge("t_peak", "Peak.", registry=registry, multiprocess_mode="max")
+    hits.inc(2)
+    peak.set(3)
+    mine = registry.snapshot()
+    other = {"t_hits_total": {"samples": [[[], 5.0]]}, "t_peak": {"samples": [[[], 7.0]]}}
+    text = registry.render([mine, other])
+    assert "t_hits_total 7.0" in text
+    assert "t_peak 7.0" in text
+
+
+def test_metrics_endpoint_exposes_payment_metrics(client, user_client):
+    headers = {"Authorization": f"Bearer {create_token(user_client.id, user_client.email)}"}
+    assert client.get("/api/payments/transactions", headers=headers).status_code == 200
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert "# TYPE taskup_transactions_list_size histogram" in resp.text
+    assert "taskup_log_records_dropped_total" in resp.text
+
+
+def test_exited_workers_keep_counter_totals_but_not_gauges(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "_MULTIPROC_DIR", str(tmp_path))
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    dead_snapshot = tmp_path / f"metrics-{exited.pid}.json"
+    dead_snapshot.write_text(json.dumps({
+        "taskup_stale_writes_total": {"samples": [[["exited-worker"], 5.0]]},
+        "taskup_supabase_token_clients": {"samples": [[[], 99.0]]},
+    }))
+
+    for _ in range(2):
+        text = metrics.render_prometheus()
+        assert 'taskup_stale_writes_total{outcome="exited-worker"} 5.0' in text
+        assert "taskup_supabase_token_clients 99.0" not in text
+    assert not dead_snapshot.exists()
+    assert {p.name for p in tmp_path.glob("metrics-*.json")} == {"metrics-archive.json", f"metrics-{os.getpid()}.json"}
@@ -0,0 +1,45 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from taskup_backend.app import create_app
+from taskup_backend.config import get_settings
+from taskup_backend.database import get_db
+from taskup_backend.profiler import SamplingProfiler
+from taskup_backend.security import create_token
+
+
+def _busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+def test_sampling_profiler_collapsed_and_speedscope():
+    profiler = SamplingProfiler(interval=0.001).start()
+    _busy(0.05)
+    profiler.stop()
+    assert "_busy (test_profiler.py" in profiler.collapsed()
+    doc = profiler.speedscope()
+    assert doc["profiles"] and doc["shared"]["frames"]
+
+
+def test_admin_profile_endpoint(client, admin_user):
+    headers = {"Authorization": f"Bearer {create_token(admin_user.id, admin_user.email, 'admin')}"}
+    resp = client.get("/api/admin/profile", params={"seconds": 0.05}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert client.get("/api/admin/profile", params={"seconds": 120}, headers=headers).status_code in (400, 422)
+
+
+def test_per_request_profile_header(tmp_path, session, monkeypatch):
+    monkeypatch.setattr(get_settings(), "profile_token", "secret")
+    monkeypatch.setattr(get_settings(), "profile_dir", str(tmp_path))
+    app = create_app()
+    app.dependency_overrides[get_db] = lambda: session
+    client = TestClient(app)
+    resp = client.get("/api/health", headers={"X-TaskUp-Profile": "secret"})
+    profile_id = resp.headers["x-profile-id"]
+    assert profile_id == resp.headers["x-correlation-id"]
+    assert (tmp_path / f"{profile_id}.collapsed").exists()
+    assert "x-profile-id" not in client.get("/api/health", headers={"X-TaskUp-Profile": "wrong"}).headers
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from fastapi.testclient import TestClient
+
+from taskup_backend.app import create_app
+from taskup_backend.config import get_settings
+from taskup_backend.database import get_db, get_replica_db
+from taskup_backend.models import Base, Task, TaskStatus, User
+from taskup_backend.read_routing import PIN_COOKIE, WRITES
+from taskup_backend.security import create_token
+
+
+@pytest.fixture
+def replica_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def routed_client(session, replica_session, monkeypatch):
+    monkeypatch.setattr(get_settings(), "database_replica_url", "sqlite://")
+    app = create_app()
+    app.dependency_overrides[get_db] = lambda: session
+    app.dependency_overrides[get_replica_db] = lambda: replica_session
+    WRITES.clear()
+    yield TestClient(app)
+    WRITES.clear()
+
+
+def _task(db, id, client_id, title):
+    db.add(Task(id=id, client_id=client_id, title=title, status=TaskStatus.open))
+    db.commit()
+
+
+def test_reads_go_to_replica_until_a_write_pins_the_caller(routed_client, session, replica_session, user_client):
+    # The replica lags: it has an older copy of the data.
+    replica_session.add(User(id=user_client.id, email=user_client.email, hashed_password="x"))
+    _task(replica_session, "t-old", user_client.id, "On replica only")
+    headers = {"Authorization": f"Bearer {create_token(user_client.id, user_client.email, 'client')}"}
+
+    assert [t["id"] for t in routed_client.get("/api/tasks", headers=headers).json()] == ["t-old"]
+
+    resp = routed_client.post("/api/tasks", json={"title": "Fresh task", "currency": "NOK"}, headers=headers)
+    assert resp.status_code == 200
+    assert PIN_COOKIE in resp.cookies
+    new_id = resp.json()["id"]
+    assert routed_client.get(f"/api/tasks/{new_id}", headers=headers).status_code == 200
+
+    # Without the cookie the user id still pins this worker's reads.
+    routed_client.cookies.clear()
+    assert new_id in [t["id"] for t in routed_client.get("/api/tasks", headers=headers).json()]
+
+    WRITES.clear()
+    assert [t["id"] for t in routed_client.get("/api/tasks", headers=headers).json()] == ["t-old"]
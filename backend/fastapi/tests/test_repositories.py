@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from taskup_backend import db as supabase_db
+from taskup_backend.models import Payment
+from taskup_backend.repositories import build_repositories
+
+
+@pytest.fixture(params=["sqlalchemy", "postgrest"])
+def repos(request, session, monkeypatch):
+    if request.param == "postgrest":
+        # No SUPABASE_URL here, so this exercises the in-memory fallback.
+        monkeypatch.setattr(supabase_db, "_client", lambda jwt=None: None)
+        monkeypatch.setitem(supabase_db._mem, "notifications", [])
+    return build_repositories(request.param, session=session)
+
+
+def _note(repos, user_id, n):
+    return repos.notifications.create(
+        {"user_id": user_id, "type": "t", "title": f"n{n}", "body": "", "is_read": False, "created_at": datetime(2024, 1, 1) + timedelta(minutes=n)}
+    )
+
+
+def test_repository_contract(repos, user_client, user_tasker):
+    created = [_note(repos, user_client.id, n) for n in range(5)]
+    other = _note(repos, user_tasker.id, 9)
+
+    mine = repos.notifications.list({"user_id": user_client.id}, order_by="created_at", desc=True)
+    assert [r["title"] for r in mine] == ["n4", "n3", "n2", "n1", "n0"]
+    assert len(repos.notifications.list({"user_id": [user_client.id, user_tasker.id]})) == 6
+
+    page = repos.notifications.page({"user_id": user_client.id}, limit=2, offset=2)
+    assert [r["title"] for r in page.items] == ["n2", "n1"] and page.has_more
+    assert not repos.notifications.page({"user_id": user_client.id}, limit=2, offset=4).has_more
+
+    found = repos.notifications.get_many([created[0]["id"], other["id"], "missing"])
+    assert set(found) == {created[0]["id"], other["id"]}
+
+    assert repos.notifications.update(other["id"], {"is_read": True})["is_read"] is True
+    assert repos.notifications.update("missing", {"is_read": True}) is None
+    assert repos.notifications.delete(other["id"]) is True
+    assert repos.notifications.get(other["id"]) is None
+
+
+def test_sqlalchemy_repositories_for_app_core(session, user_client, user_tasker, admin_user):
+    def pay(id, client_id, tasker_id):
+        session.add(Payment(id=id, task_id="t1", offer_id="o1", client_id=client_id, tasker_id=tasker_id, wallet_id=f"w-{client_id}", amount=500, stripe_payment_intent_id=f"pi-{id}"))
+
+    pay("p-mine", user_client.id, user_tasker.id)
+    pay("p-other", admin_user.id, admin_user.id)
+    session.commit()
+
+    def payments(user):
+        return build_repositories("sqlalchemy", session=session, user=user, supabase_columns=True).payments
+
+    rows = payments({"id": user_client.id, "role": "client"}).list(order_by="amount_cents")
+    assert [(r["id"], r["amount_cents"], r["payment_intent_id"]) for r in rows] == [("p-mine", 500, "pi-p-mine")]
+    assert "amount" not in rows[0]
+    assert payments({"id": user_tasker.id, "role": "tasker"}).get("p-other") is None
+    assert payments({"id": user_tasker.id, "role": "tasker"}).update("p-other", {"refund_id": "re"}) is None
+    assert {r["id"] for r in payments({"id": admin_user.id, "role": "support"}).list()} == {"p-mine", "p-other"}
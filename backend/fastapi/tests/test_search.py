@@ -0,0 +1,50 @@
+from taskup_backend.models import Task, TaskStatus
+from taskup_backend.security import create_token
+
+
+def _headers(user, role):
+    return {"Authorization": f"Bearer {create_token(user.id, user.email, role)}"}
+
+
+def _post(client, headers, **fields):
+    resp = client.post("/api/tasks", json={"currency": "NOK", **fields}, headers=headers)
+    assert resp.status_code == 200, resp.text
+    return resp.json()["id"]
+
+
+def _search(client, headers, **params):
+    resp = client.get("/api/tasks/search", params=params, headers=headers)
+    assert resp.status_code == 200, resp.text
+    return [t["id"] for t in resp.json()]
+
+
+def test_search_ranks_prefix_matches_and_combines_filters(client, session, user_client):
+    headers = _headers(user_client, "client")
+    title_hit = _post(client, headers, title="Paint the garden fence", category="painting", location="Oslo", latitude=59.91, longitude=10.75)
+    desc_hit = _post(client, headers, title="Weekend help", description="Some painting of a small fence", location="Bergen", latitude=60.39, longitude=5.32)
+    _post(client, headers, title="Assemble IKEA wardrobe", category="assembly", location="Oslo")
+
+    assert _search(client, headers, q="pain fen") == [title_hit, desc_hit]
+    assert _search(client, headers, q="wardr") != []
+    assert _search(client, headers, q="fence", lat=59.9, lng=10.7, radius_km=20) == [title_hit]
+
+    session.query(Task).filter(Task.id == desc_hit).update({"status": TaskStatus.cancelled})
+    session.commit()
+    assert _search(client, headers, q="fence", status="open") == [title_hit]
+
+    assert client.get("/api/tasks/search", params={"q": "!!"}, headers=headers).status_code == 400
+
+
+def test_search_index_follows_updates_and_deletes(client, session, user_client):
+    headers = _headers(user_client, "client")
+    task_id = _post(client, headers, title="Walk the dog")
+    assert _search(client, headers, q="dog") == [task_id]
+
+    resp = client.patch(f"/api/tasks/{task_id}", json={"title": "Feed the cat"}, headers=headers)
+    assert resp.status_code == 200
+    assert _search(client, headers, q="dog") == []
+    assert _search(client, headers, q="cat") == [task_id]
+
+    session.query(Task).filter(Task.id == task_id).delete()
+    session.commit()
+    assert _search(client, headers, q="cat") == []
@@ -0,0 +1,46 @@
+import pytest
+
+from taskup_backend import serializers
+from taskup_backend.models import Message, Offer, Task, Transaction, Wallet
+from taskup_backend.routers.messages import _serialize_message
+from taskup_backend.routers.tasks import _serialize_task
+from taskup_backend.schemas import OfferOut, TransactionOut
+from taskup_backend.security import create_token
+
+
+@pytest.fixture
+def marketplace(client, session, user_client, user_tasker):
+    wallet = session.query(Wallet).filter(Wallet.user_id == user_client.id).first()
+    wallet.available_balance = 10000
+    session.commit()
+    headers_client = {"Authorization": f"Bearer {create_token(user_client.id, user_client.email, 'client')}"}
+    headers_tasker = {"Authorization": f"Bearer {create_token(user_tasker.id, user_tasker.email, 'tasker')}"}
+    task_id = client.post("/api/tasks", json={"title": "Fix sink", "location": "Oslo", "currency": "NOK"}, headers=headers_client).json()["id"]
+    offer_id = client.post("/api/offers", json={"task_id": task_id, "amount_cents": 5000, "message": "Tomorrow"}, headers=headers_tasker).json()["id"]
+    client.post(f"/api/tasks/{task_id}/accept-offer", json={"offer_id": offer_id}, headers=headers_client)
+    client.post("/api/messages", json={"task_id": task_id, "sender_id": user_client.id, "recipient_id": user_tasker.id, "body": "Hi"}, headers=headers_client)
+    return task_id, headers_client
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_fast_list_serializers_match_pydantic_models(client, session, marketplace, use_orjson, monkeypatch):
+    if not use_orjson:
+        monkeypatch.setattr(serializers, "orjson", None)
+    task_id, headers = marketplace
+
+    expected_tasks = [_serialize_task(t).model_dump(mode="json") for t in session.query(Task).all()]
+    assert client.get("/api/tasks", headers=headers).json() == expected_tasks
+    assert client.get("/api/tasks/my", headers=headers).json() == expected_tasks
+
+    expected_offers = [
+        OfferOut(id=o.id, task_id=o.task_id, tasker_id=o.tasker_id, amount_cents=o.amount, currency=o.currency, message=o.message, status=o.status, created_at=o.created_at, updated_at=o.updated_at).model_dump(mode="json")
+        for o in session.query(Offer).all()
+    ]
+    assert client.get("/api/offers", params={"task_id": task_id}, headers=headers).json() == expected_offers
+
+    expected_messages = [_serialize_message(m).model_dump(mode="json") for m in session.query(Message).all()]
+    assert client.get("/api/messages", params={"task_id": task_id}, headers=headers).json() == expected_messages
+
+    expected_txs = [TransactionOut.model_validate(t, from_attributes=True).model_dump(mode="json") for t in session.query(Transaction).all()]
+    assert expected_txs
+    assert client.get("/api/payments/transactions", headers=headers).json() == expected_txs
@@ -0,0 +1,42 @@
+from taskup_backend import db
+
+
+def _configure(monkeypatch, max_size=2):
+    monkeypatch.setattr(db, "_url", "https://example.supabase.co")
+    monkeypatch.setattr(db, "_anon_key", "anon-key")
+    monkeypatch.setattr(db, "_service_key", "service-key")
+    monkeypatch.setattr(db, "_service_client", None)
+    monkeypatch.setattr(db, "_token_clients", db.TokenClientCache(max_size=max_size))
+
+
+def test_clients_are_reused_per_token_and_share_one_transport(monkeypatch):
+    _configure(monkeypatch)
+
+    service = db._client()
+    assert db._client() is service
+    assert service.session.headers["authorization"] == "Bearer service-key"
+
+    alice = db._client("token-a")
+    assert db._client("token-a") is alice
+    assert alice.session.headers["authorization"] == "Bearer token-a"
+    assert alice.session.headers["apikey"] == "anon-key"
+    assert alice.session._transport is service.session._transport is db._shared_transport()
+
+    stats = db.pool_stats()
+    assert stats["token_clients"] == 1
+    assert (stats["token_client_hits"], stats["token_client_misses"]) == (1, 1)
+
+
+def test_token_cache_evicts_least_recently_used(monkeypatch):
+    _configure(monkeypatch, max_size=2)
+
+    a = db._client("token-a")
+    db._client("token-b")
+    assert db._client("token-a") is a
+    db._client("token-c")
+
+    assert db.pool_stats()["token_client_evictions"] == 1
+    assert db._client("token-a") is a
+    assert len(db._token_clients) == 2
+    assert db._client("token-b") is not None
+    assert db.pool_stats()["token_client_evictions"] == 2
@@ -0,0 +1,84 @@
+import pytest
+
+from taskup_backend import task_states
+from taskup_backend.errors import TaskUpError
+from taskup_backend.models import Dispute, Notification, Task, TaskStatus
+from taskup_backend.security import create_token
+from taskup_backend.task_states import dispatch, on, transition
+
+
+def _headers(user, role):
+    return {"Authorization": f"Bearer {create_token(user.id, user.email, role)}"}
+
+
+def _task(session, client_id, status, tasker_id=None, id="t-sm"):
+    session.add(Task(id=id, client_id=client_id, assigned_tasker_id=tasker_id, title="Paint fence", status=status))
+    session.commit()
+    return id
+
+
+def test_mark_done_is_one_conditional_write(client, session, user_client, user_tasker, query_counter):
+    task_id = _task(session, user_client.id, TaskStatus.in_progress, tasker_id=user_tasker.id)
+    headers = _headers(user_tasker, "tasker")
+
+    with query_counter() as q:
+        resp = client.post(f"/api/tasks/{task_id}/mark-done", headers=headers)
+    assert resp.json()["status"] == TaskStatus.awaiting_client_confirmation
+    # auth user lookup, guarded UPDATE ... RETURNING, batched notification insert
+    assert q.count == 3
+    note = session.query(Notification).filter(Notification.type == "task_marked_done").one()
+    assert note.user_id == user_client.id
+
+    again = client.post(f"/api/tasks/{task_id}/mark-done", headers=headers)
+    assert again.status_code == 409 and again.json()["error"]["code"] == "TASK_STATUS_CONFLICT"
+    assert client.post(f"/api/tasks/{task_id}/mark-done", headers=_headers(user_client, "tasker")).status_code == 403
+    assert client.post("/api/tasks/missing/mark-done", headers=headers).status_code == 404
+
+
+def test_every_entry_point_uses_the_transition_table(client, session, user_client):
+    task_id = _task(session, user_client.id, TaskStatus.completed)
+    headers = _headers(user_client, "client")
+
+    assert client.post(f"/api/tasks/{task_id}/dispute", params={"reason": "late"}, headers=headers).status_code == 409
+    opened = client.post("/api/disputes", json={"task_id": task_id, "reason": "late", "against_user_id": user_client.id}, headers=headers)
+    assert opened.status_code == 409
+    session.expire_all()
+    assert session.get(Task, task_id).status == TaskStatus.completed
+
+
+def test_hooks_run_once_per_batch_and_only_after_commit(session, user_client, monkeypatch):
+    calls = []
+    monkeypatch.setitem(task_states._HOOKS, "test_event", [])
+    on("test_event")(lambda db, moves: calls.append([m.task_id for m in moves]))
+    first = _task(session, user_client.id, TaskStatus.open, id="t-a")
+    second = _task(session, user_client.id, TaskStatus.open, id="t-b")
+
+    transition(session, first, TaskStatus.cancelled, "test_event")
+    session.rollback()
+    assert dispatch(session) == 0
+    assert session.get(Task, first).status == TaskStatus.open
+
+    transition(session, first, TaskStatus.assigned, "test_event")
+    transition(session, second, TaskStatus.assigned, "test_event")
+    assert transition(session, second, TaskStatus.completed, "test_event", strict=False) is None
+    with pytest.raises(TaskUpError):
+        transition(session, second, TaskStatus.completed, "test_event")
+    session.commit()
+    assert dispatch(session) == 2
+    assert calls == [[first, second]]
+
+
+def test_second_dispute_on_a_disputed_task_is_recorded(client, session, user_client, user_tasker):
+    task_id = _task(session, user_client.id, TaskStatus.in_progress, tasker_id=user_tasker.id)
+    first = client.post("/api/disputes", json={"task_id": task_id, "reason": "late", "against_user_id": user_tasker.id}, headers=_headers(user_client, "client"))
+    assert first.status_code == 200
+
+    # The tasker answers with a dispute of their own: the task stays disputed and both disputes exist.
+    second = client.post("/api/disputes", json={"task_id": task_id, "reason": "unpaid", "against_user_id": user_client.id}, headers=_headers(user_tasker, "tasker"))
+    assert second.status_code == 200
+    session.expire_all()
+    assert session.get(Task, task_id).status == TaskStatus.disputed
+    assert session.query(Dispute).filter(Dispute.task_id == task_id).count() == 2
+    assert session.query(Notification).filter(Notification.user_id == user_client.id, Notification.type == "dispute_opened").count() == 1
+    missing = client.post("/api/disputes", json={"task_id": "missing", "reason": "late", "against_user_id": user_tasker.id}, headers=_headers(user_client, "client"))
+    assert missing.status_code == 404
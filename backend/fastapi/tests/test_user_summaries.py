@@ -0,0 +1,49 @@
+from taskup_backend.models import User
+from taskup_backend.security import create_token
+from taskup_backend.user_summaries import SUMMARIES
+
+
+def _headers(user, role):
+    return {"Authorization": f"Bearer {create_token(user.id, user.email, role)}"}
+
+
+def test_expand_user_embeds_summaries_with_one_query(client, session, user_client, user_tasker, admin_user, query_counter):
+    SUMMARIES.clear()
+    headers = _headers(user_client, "client")
+    for title in ("Paint fence", "Mow lawn"):
+        assert client.post("/api/tasks", json={"title": title, "currency": "NOK"}, headers=headers).status_code == 200
+
+    plain = client.get("/api/tasks", headers=headers).json()
+    assert "client" not in plain[0]
+
+    with query_counter() as q:
+        rows = client.get("/api/tasks", params={"expand": "user"}, headers=headers).json()
+    assert set(rows[0]["client"]) == {"id", "full_name", "role", "kyc_status", "created_at"}
+    assert [(r["client"]["id"], r["client"]["full_name"], r["client"]["role"]) for r in rows] == [("u-client", "client", "client")] * 2
+    assert rows[0]["assigned_tasker"] is None
+    with query_counter() as cached:
+        assert client.get("/api/tasks", params={"expand": "user"}, headers=headers).json() == rows
+    assert cached.count == q.count - 1
+
+    session.query(User).filter(User.id == "u-client").one().full_name = "Kari"
+    session.commit()
+    assert client.get("/api/tasks", params={"expand": "user"}, headers=headers).json()[0]["client"]["full_name"] == "Kari"
+
+    # Admin endpoints update users in bulk (no ORM flush) and invalidate the entry themselves.
+    client.post("/api/admin/users/u-client/kyc", params={"kyc_status": "verified"}, headers=_headers(admin_user, "admin"))
+    assert client.get("/api/tasks", params={"expand": "user"}, headers=headers).json()[0]["client"]["kyc_status"] == "verified"
+
+    assert client.get("/api/tasks", params={"expand": "wallet"}, headers=headers).status_code == 400
+
+
+def test_expanded_summary_matches_the_detail_endpoint(client, user_client, user_tasker):
+    SUMMARIES.clear()
+    headers = _headers(user_client, "client")
+    task_id = client.post("/api/tasks", json={"title": "Paint fence", "currency": "NOK"}, headers=headers).json()["id"]
+    client.post("/api/offers", json={"task_id": task_id, "amount_cents": 5000}, headers=_headers(user_tasker, "tasker"))
+
+    detail = client.get(f"/api/tasks/{task_id}", headers=headers).json()["offers"][0]["tasker"]
+    uncached = client.get("/api/offers", params={"task_id": task_id, "expand": "user"}, headers=headers).json()[0]["tasker"]
+    cached = client.get("/api/offers", params={"task_id": task_id, "expand": "user"}, headers=headers).json()[0]["tasker"]
+    assert detail["created_at"] is not None
+    assert uncached == cached == detail